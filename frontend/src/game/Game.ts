@@ -1,7 +1,14 @@
 import { InputManager } from './Input'
 import { NetworkClient } from './Network'
-import type { DecorationType, InputPayload, ServerSnapshotPayload } from './constants'
-import { INPUT_RATE_LIMIT_HZ } from './constants'
+import type {
+  DecorationState,
+  DecorationType,
+  InputPayload,
+  PlayerState,
+  ServerSnapshotDeltaPayload,
+  ServerSnapshotPayload
+} from './constants'
+import { INPUT_RATE_LIMIT_HZ, PLAYER_MAX_SPEED } from './constants'
 import { World } from './World'
 
 export type ChatMessage = {
@@ -13,6 +20,17 @@ export type ChatMessage = {
   server_time_ms: number
 }
 
+type SnapshotFrame = {
+  seq: number
+  players: Map<string, PlayerState>
+  decorations: Map<string, DecorationState>
+}
+
+// How many applied snapshots to keep around as possible delta baselines.
+const SNAPSHOT_FRAME_HISTORY = 64
+// Unacknowledged inputs kept for replay (3 s at the input rate).
+const MAX_PENDING_INPUTS = 90
+
 export type HudState = {
   roomId: string
   phase: string
@@ -30,6 +48,8 @@ export class GameEngine {
   lastTime = 0
   localPlayerId: string | null = null
   pendingInputs: InputPayload[] = []
+  // Newest input seq the server reports as simulated for the local player.
+  lastAckedInput = 0
   lastInputTime = 0
   readonly inputInterval = 1000 / INPUT_RATE_LIMIT_HZ
 
@@ -40,6 +60,8 @@ export class GameEngine {
   private cachedHud: HudState | null = null
   private hat = false
   private activeDecorationType: DecorationType = 'bell'
+  private frames: Map<number, SnapshotFrame> = new Map()
+  private farPlayers: Map<string, PlayerState> = new Map()
 
   constructor(
     container: HTMLElement,
@@ -75,10 +97,17 @@ export class GameEngine {
 
   handleMessage = (type: string, payload: any) => {
     if (type === 'welcome') {
+      // A resumed session keeps its player, its input sequence and the chat
+      // already shown; the server only sends what was missed.
+      if (!payload.resumed) {
+        if (this.localPlayerId) this.onChatClear?.()
+        this.pendingInputs = []
+        this.lastAckedInput = 0
+      }
       this.localPlayerId = payload.player_id
       this.world.localPlayerId = payload.player_id
     } else if (type === 'state.snapshot') {
-      this.onServerSnapshot(payload as ServerSnapshotPayload)
+      this.onServerSnapshot(payload as ServerSnapshotPayload | ServerSnapshotDeltaPayload)
     } else if (type === 'tree.placed') {
       if (payload && typeof payload === 'object') {
         this.world.addDecoration(payload as any)
@@ -99,20 +128,91 @@ export class GameEngine {
     }
   }
 
-  private onServerSnapshot(snapshot: ServerSnapshotPayload) {
-    this.world.updateFromSnapshot(snapshot.players, snapshot.tree?.decorations ?? [])
+  private onServerSnapshot(snapshot: ServerSnapshotPayload | ServerSnapshotDeltaPayload) {
+    const frame = this.applySnapshot(snapshot)
+    // Missing baseline: keep acking the last frame we have so the server re-bases on it.
+    if (!frame) return
+    this.network.send('state.ack', { seq: frame.seq })
+
+    if (!snapshot.interest) {
+      this.farPlayers.clear()
+    } else if (snapshot.far) {
+      this.farPlayers = new Map(
+        snapshot.far.map(([id, name, x, z]) => [id, { id, name, x, z, vx: 0, vz: 0, cosmetic: { hat: false }, placed_count: 0 }])
+      )
+    }
 
-    const local = this.localPlayerId ? snapshot.players.find((p) => p.id === this.localPlayerId) : undefined
+    const players = Array.from(frame.players.values())
+    for (const far of this.farPlayers.values()) {
+      if (!frame.players.has(far.id)) players.push(far)
+    }
+    this.world.updateFromSnapshot(players, Array.from(frame.decorations.values()))
+    this.reconcileLocal(snapshot, frame)
+
+    const local = this.localPlayerId ? frame.players.get(this.localPlayerId) : undefined
     const hud: HudState = {
       roomId: snapshot.room_id,
       phase: snapshot.phase,
-      treeDecorationCount: snapshot.tree?.decorations?.length ?? 0,
+      treeDecorationCount: frame.decorations.size,
       localPlacedCount: local?.placed_count ?? 0,
       localHat: !!local?.cosmetic?.hat
     }
     this.updateHud(hud)
   }
 
+  private reconcileLocal(snapshot: ServerSnapshotPayload | ServerSnapshotDeltaPayload, frame: SnapshotFrame) {
+    if (!this.localPlayerId) return
+    const acked = snapshot.ack[this.localPlayerId]
+    if (acked !== undefined && acked > this.lastAckedInput) this.lastAckedInput = acked
+    this.pendingInputs = this.pendingInputs.filter((p) => p.seq > this.lastAckedInput)
+
+    const server = frame.players.get(this.localPlayerId)
+    const player = this.world.players.get(this.localPlayerId)
+    if (!server || !player) return
+    // Each pending input was held until the next one was sent (or until now).
+    const now = performance.now()
+    const replay = this.pendingInputs.map((p, i) => {
+      const end = i + 1 < this.pendingInputs.length ? this.pendingInputs[i + 1].client_time_ms : now
+      return { ax: p.ax, az: p.az, dt: Math.max(0, end - p.client_time_ms) / 1000 }
+    })
+    player.reconcile(server, replay)
+  }
+
+  private applySnapshot(snapshot: ServerSnapshotPayload | ServerSnapshotDeltaPayload): SnapshotFrame | null {
+    let frame: SnapshotFrame
+    if (snapshot.keyframe) {
+      frame = {
+        seq: snapshot.seq,
+        players: new Map(snapshot.players.map((p) => [p.id, p])),
+        decorations: new Map((snapshot.tree?.decorations ?? []).map((d) => [d.id, d]))
+      }
+    } else {
+      const base = this.frames.get(snapshot.base)
+      if (!base) return null
+      const players = new Map(base.players)
+      for (const entry of snapshot.players) {
+        const prev = players.get(entry.id)
+        players.set(entry.id, prev ? { ...prev, ...entry } : (entry as PlayerState))
+      }
+      for (const id of snapshot.removed_players) players.delete(id)
+
+      let decorations = base.decorations
+      const { added, removed } = snapshot.tree
+      if (added.length > 0 || removed.length > 0) {
+        decorations = new Map(base.decorations)
+        for (const d of added) decorations.set(d.id, d)
+        for (const id of removed) decorations.delete(id)
+      }
+      frame = { seq: snapshot.seq, players, decorations }
+    }
+
+    this.frames.set(frame.seq, frame)
+    for (const seq of this.frames.keys()) {
+      if (seq <= frame.seq - SNAPSHOT_FRAME_HISTORY) this.frames.delete(seq)
+    }
+    return frame
+  }
+
   private updateHud(hud: HudState) {
     if (!this.onHud) return
     const s = JSON.stringify(hud)
@@ -147,7 +247,7 @@ export class GameEngine {
     const rotatedAxis = { x: rx, z: rz }
 
     const player = this.world.players.get(this.localPlayerId)
-    if (player) player.applyInput(dt, rotatedAxis, 3.5)
+    if (player) player.applyInput(dt, rotatedAxis, PLAYER_MAX_SPEED)
 
     if (time - this.lastInputTime >= this.inputInterval) {
       this.input.seq++
@@ -158,6 +258,7 @@ export class GameEngine {
         client_time_ms: Math.floor(time)
       }
       this.pendingInputs.push(payload)
+      if (this.pendingInputs.length > MAX_PENDING_INPUTS) this.pendingInputs.shift()
       this.network.send('input.move', payload)
       this.lastInputTime = time
     }
@@ -1,4 +1,5 @@
-import { WS_URL } from './constants'
+import { WIRE_PROTOCOL, WS_URL } from './constants'
+import { PROTOCOL_BIN1, WireDecoder, encodeInputMove, encodeStateAck } from './Wire'
 
 type MessageHandler = (type: string, payload: any) => void
 
@@ -8,21 +9,75 @@ export class NetworkClient {
   private reconnectAttempts = 0
   private maxReconnectAttempts = 5
   private isDisposed = false
+  // Set once the server's welcome confirms the binary protocol.
+  private decoder: WireDecoder | null = null
+  // Server URL to use; a sharded server may redirect a room to another worker.
+  private url = WS_URL
+  private redirected = false
+  // Redirects followed since the last welcome, to stop a redirect loop.
+  private redirects = 0
+  // From the last welcome; lets a reconnect pick up the same player if the
+  // server still holds it. lastChatId tells it which chat we already have.
+  private resumeToken = ''
+  private lastChatId: string | null = null
 
   connect(name: string, roomId: string) {
     this.isDisposed = false
     if (this.ws) this.ws.close()
 
-    this.ws = new WebSocket(WS_URL)
+    this.ws = new WebSocket(this.url)
+    this.ws.binaryType = 'arraybuffer'
+    // Kept until the welcome: a resumed session goes on using the same handles.
+    const previousDecoder = this.decoder
+    this.decoder = null
 
     this.ws.onopen = () => {
       this.reconnectAttempts = 0
-      this.send('hello', { name, room_id: roomId })
+      const hello: Record<string, unknown> = { name, room_id: roomId, protocol: WIRE_PROTOCOL }
+      if (this.resumeToken) {
+        hello.resume_token = this.resumeToken
+        hello.last_chat_id = this.lastChatId
+      }
+      this.send('hello', hello)
     }
 
     this.ws.onmessage = (event) => {
       try {
+        if (event.data instanceof ArrayBuffer) {
+          const snapshot = this.decoder?.decodeSnapshot(event.data)
+          if (snapshot) this.emit('state.snapshot', snapshot)
+          return
+        }
         const data = JSON.parse(event.data)
+        if (data.type === 'event.redirect') {
+          if (typeof data.payload?.url === 'string' && data.payload.url && this.redirects < 3) {
+            this.url = data.payload.url
+            this.redirected = true
+            this.redirects++
+            this.resumeToken = ''
+          }
+          return
+        }
+        if (data.type === 'ping') {
+          // The server measures RTT and our clock offset from the reply.
+          this.send('pong', { id: data.payload?.id, client_time_ms: Date.now() })
+          return
+        }
+        if (data.type === 'welcome') {
+          this.redirects = 0
+          const p = data.payload
+          this.resumeToken = typeof p.resume_token === 'string' ? p.resume_token : ''
+          if (p.protocol !== PROTOCOL_BIN1 || !p.wire) this.decoder = null
+          else if (p.resumed && previousDecoder) this.decoder = previousDecoder
+          else this.decoder = new WireDecoder(p.wire, p.room_id, p.phase)
+        } else if (data.type === 'chat.message') {
+          this.lastChatId = data.payload?.id ?? this.lastChatId
+        } else if (data.type === 'chat.history') {
+          const msgs = data.payload?.messages
+          if (Array.isArray(msgs) && msgs.length) this.lastChatId = msgs[msgs.length - 1]?.id ?? this.lastChatId
+        } else if (data.type === 'chat.cleared') {
+          this.lastChatId = null
+        }
         this.emit(data.type, data.payload)
       } catch (e) {
         console.error('Failed to parse message:', event.data)
@@ -31,6 +86,11 @@ export class NetworkClient {
 
     this.ws.onclose = () => {
       if (this.isDisposed) return
+      if (this.redirected) {
+        this.redirected = false
+        this.connect(name, roomId)
+        return
+      }
       if (this.reconnectAttempts < this.maxReconnectAttempts) {
         const attempt = this.reconnectAttempts + 1
         setTimeout(() => {
@@ -43,6 +103,14 @@ export class NetworkClient {
 
   send(type: string, payload: any) {
     if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+      if (this.decoder && type === 'input.move') {
+        this.ws.send(encodeInputMove(payload))
+        return
+      }
+      if (this.decoder && type === 'state.ack') {
+        this.ws.send(encodeStateAck(payload.seq))
+        return
+      }
       this.ws.send(JSON.stringify({ type, payload }))
     }
   }
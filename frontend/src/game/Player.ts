@@ -1,6 +1,17 @@
 import * as THREE from 'three'
 import { FBXLoader } from 'three/examples/jsm/loaders/FBXLoader.js'
 import { clone as skeletonClone } from 'three/examples/jsm/utils/SkeletonUtils.js'
+import { PLAYER_MAX_ACCEL, PLAYER_MAX_SPEED, WORLD_MAX_X, WORLD_MAX_Z, WORLD_MIN_X, WORLD_MIN_Z } from './constants'
+
+// One input replayed during reconciliation: the axis and how long it was held.
+export type ReplayInput = { ax: number; az: number; dt: number }
+
+// Corrections larger than this snap instead of blending in.
+const MAX_BLEND_ERROR = 2.0
+// Longest slice used when replaying an input, matching the server tick.
+const REPLAY_STEP = 0.05
+
+const clamp = (v: number, lo: number, hi: number) => Math.min(hi, Math.max(lo, v))
 
 export class Player {
   private static usagiTemplatePromise: Promise<{ model: THREE.Group; clips: THREE.AnimationClip[]; height: number }> | null = null
@@ -78,6 +89,10 @@ export class Player {
   targetZ = 0
   hat = false
   placedCount = 0
+  // Drawn position minus simulated position after a server correction.
+  // It decays each frame so corrections blend in instead of snapping.
+  private correctionX = 0
+  private correctionZ = 0
 
   group: THREE.Group
   private fallbackBody: THREE.Mesh
@@ -198,20 +213,53 @@ export class Player {
     this.targetZ = z
   }
 
-  applyInput(dt: number, axis: { x: number; z: number }, maxSpeed: number = 3.5) {
-    const targetVx = axis.x * maxSpeed
-    const targetVz = axis.z * maxSpeed
-    
-    // Inertia/Acceleration logic: Smoothly interpolate current velocity to target velocity
-    const accelFactor = 8.0 // Responsiveness
-    const lerp = Math.min(1, dt * accelFactor)
-    
-    this.vx += (targetVx - this.vx) * lerp
-    this.vz += (targetVz - this.vz) * lerp
+  applyInput(dt: number, axis: { x: number; z: number }, maxSpeed: number = PLAYER_MAX_SPEED) {
+    this.simulate(dt, axis.x, axis.z, maxSpeed)
+    this.updateMesh()
+  }
+
+  // Reset to the server's state for the last simulated input, then replay
+  // the inputs the server has not simulated yet.
+  reconcile(server: { x: number; z: number; vx: number; vz: number }, replay: ReplayInput[]) {
+    const drawnX = this.x + this.correctionX
+    const drawnZ = this.z + this.correctionZ
+    this.x = server.x
+    this.z = server.z
+    this.vx = server.vx
+    this.vz = server.vz
+    for (const input of replay) {
+      let left = input.dt
+      while (left > 0) {
+        const step = Math.min(REPLAY_STEP, left)
+        this.simulate(step, input.ax, input.az)
+        left -= step
+      }
+    }
+    this.correctionX = drawnX - this.x
+    this.correctionZ = drawnZ - this.z
+    if (Math.hypot(this.correctionX, this.correctionZ) > MAX_BLEND_ERROR) {
+      this.correctionX = 0
+      this.correctionZ = 0
+    }
+    this.updateMesh()
+  }
 
+  // Same integration and clamping as the server's physics step.
+  private simulate(dt: number, ax: number, az: number, maxSpeed: number = PLAYER_MAX_SPEED) {
+    const maxDv = PLAYER_MAX_ACCEL * dt
+    this.vx += clamp(ax * maxSpeed - this.vx, -maxDv, maxDv)
+    this.vz += clamp(az * maxSpeed - this.vz, -maxDv, maxDv)
     this.x += this.vx * dt
     this.z += this.vz * dt
-    this.updateMesh()
+
+    this.vx = clamp(this.vx, -maxSpeed, maxSpeed)
+    this.vz = clamp(this.vz, -maxSpeed, maxSpeed)
+    const x = clamp(this.x, WORLD_MIN_X, WORLD_MAX_X)
+    const z = clamp(this.z, WORLD_MIN_Z, WORLD_MAX_Z)
+    if (x !== this.x) this.vx = 0
+    if (z !== this.z) this.vz = 0
+    this.x = x
+    this.z = z
   }
 
   update(dt: number) {
@@ -229,13 +277,18 @@ export class Player {
       this.vx = dx * 5.0 
       this.vz = dz * 5.0
       
+      this.updateMesh()
+    } else if (this.correctionX !== 0 || this.correctionZ !== 0) {
+      const decay = Math.exp(-dt * 10)
+      this.correctionX = Math.abs(this.correctionX) < 1e-3 ? 0 : this.correctionX * decay
+      this.correctionZ = Math.abs(this.correctionZ) < 1e-3 ? 0 : this.correctionZ * decay
       this.updateMesh()
     }
     this.updateAnimation(dt)
   }
 
   updateMesh() {
-    this.group.position.set(this.x, 0, this.z)
+    this.group.position.set(this.x + this.correctionX, 0, this.z + this.correctionZ)
   }
 
   private updateAnimation(dt: number) {
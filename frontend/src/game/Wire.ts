@@ -0,0 +1,227 @@
+import type {
+  DecorationState,
+  DecorationType,
+  FarPlayerRow,
+  InputPayload,
+  ServerSnapshotDeltaPayload,
+  ServerSnapshotPayload,
+} from './constants'
+
+// Binary "bin1" codec, mirror of python/app/game/wire.py.
+export const PROTOCOL_BIN1 = 'bin1'
+
+const TAG_SNAPSHOT = 0x01
+const TAG_INPUT_MOVE = 0x10
+const TAG_STATE_ACK = 0x11
+
+const FLAG_KEYFRAME = 0x01
+const FLAG_INTEREST = 0x02
+const FLAG_FAR = 0x04
+
+const ENTRY_IDENTITY = 0x01
+const ENTRY_NAME = 0x02
+const ENTRY_POS = 0x04
+const ENTRY_VEL = 0x08
+const ENTRY_YAW = 0x10
+const ENTRY_HAT = 0x20
+const ENTRY_PLACED = 0x40
+
+const DECORATION_TYPES: DecorationType[] = ['bell', 'mini_hat', 'tinsel']
+const TWO_PI = Math.PI * 2
+const HEIGHT_MAX = 2
+
+export interface WireParams {
+  min_x: number
+  max_x: number
+  min_z: number
+  max_z: number
+  max_speed: number
+}
+
+const utf8 = new TextDecoder()
+
+class Reader {
+  private pos = 0
+  private view: DataView
+  private bytes: Uint8Array
+
+  constructor(buffer: ArrayBuffer) {
+    this.view = new DataView(buffer)
+    this.bytes = new Uint8Array(buffer)
+  }
+
+  u8() {
+    const v = this.view.getUint8(this.pos)
+    this.pos += 1
+    return v
+  }
+
+  u16() {
+    const v = this.view.getUint16(this.pos, true)
+    this.pos += 2
+    return v
+  }
+
+  i16() {
+    const v = this.view.getInt16(this.pos, true)
+    this.pos += 2
+    return v
+  }
+
+  u32() {
+    const v = this.view.getUint32(this.pos, true)
+    this.pos += 4
+    return v
+  }
+
+  f64() {
+    const v = this.view.getFloat64(this.pos, true)
+    this.pos += 8
+    return v
+  }
+
+  name() {
+    const n = this.u8()
+    const s = utf8.decode(this.bytes.subarray(this.pos, this.pos + n))
+    this.pos += n
+    return s
+  }
+
+  id() {
+    if (this.u8() !== 0) return this.name()
+    let s = ''
+    for (let i = 0; i < 16; i++) s += this.bytes[this.pos + i].toString(16).padStart(2, '0')
+    this.pos += 16
+    return s
+  }
+}
+
+const fromU16 = (q: number, lo: number, hi: number) => lo + ((hi - lo) * q) / 65535
+const fromI16 = (q: number, limit: number) => (q * limit) / 32767
+const toI16 = (v: number, limit: number) => Math.round(Math.max(-1, Math.min(1, v / limit)) * 32767)
+
+export class WireDecoder {
+  // Player handle -> id, learned from the entries that introduce each player.
+  private ids = new Map<number, string>()
+
+  constructor(
+    private params: WireParams,
+    private roomId: string,
+    private phase: string,
+  ) {}
+
+  decodeSnapshot(buffer: ArrayBuffer): ServerSnapshotPayload | ServerSnapshotDeltaPayload | null {
+    const r = new Reader(buffer)
+    const q = this.params
+    if (r.u8() !== TAG_SNAPSHOT) return null
+    const flags = r.u8()
+    const seq = r.u32()
+    const base = r.u32()
+    const serverTimeMs = r.f64()
+
+    const removedPlayers: string[] = []
+    for (let n = r.u16(); n > 0; n--) {
+      const id = this.ids.get(r.u16())
+      if (id) removedPlayers.push(id)
+    }
+
+    const players: any[] = []
+    for (let n = r.u16(); n > 0; n--) {
+      const handle = r.u16()
+      const mask = r.u8()
+      const entry: any = {}
+      if (mask & ENTRY_IDENTITY) this.ids.set(handle, r.id())
+      if (mask & ENTRY_NAME) entry.name = r.name()
+      if (mask & ENTRY_POS) {
+        entry.x = fromU16(r.u16(), q.min_x, q.max_x)
+        entry.z = fromU16(r.u16(), q.min_z, q.max_z)
+      }
+      if (mask & ENTRY_VEL) {
+        entry.vx = fromI16(r.i16(), q.max_speed)
+        entry.vz = fromI16(r.i16(), q.max_speed)
+      }
+      if (mask & ENTRY_YAW) entry.yaw = fromI16(r.i16(), Math.PI)
+      if (mask & ENTRY_HAT) entry.cosmetic = { hat: r.u8() !== 0 }
+      if (mask & ENTRY_PLACED) entry.placed_count = r.u16()
+      const id = this.ids.get(handle)
+      if (id) {
+        entry.id = id
+        players.push(entry)
+      }
+    }
+
+    const ack: Record<string, number> = {}
+    for (let n = r.u16(); n > 0; n--) {
+      const id = this.ids.get(r.u16())
+      const s = r.u32()
+      if (id) ack[id] = s
+    }
+
+    const added: DecorationState[] = []
+    for (let n = r.u16(); n > 0; n--) {
+      const id = r.id()
+      const code = r.u8()
+      const angle = fromU16(r.u16(), 0, TWO_PI)
+      const height = fromU16(r.u16(), 0, HEIGHT_MAX)
+      const placedBy = r.id()
+      const placedMs = r.f64()
+      added.push({ id, type: DECORATION_TYPES[code] ?? 'bell', angle, height, placed_by: placedBy, placed_ms: placedMs })
+    }
+    const removedDecos: string[] = []
+    for (let n = r.u16(); n > 0; n--) removedDecos.push(r.id())
+
+    let far: FarPlayerRow[] | undefined
+    if (flags & FLAG_FAR) {
+      far = []
+      for (let n = r.u16(); n > 0; n--) {
+        const handle = r.u16()
+        const id = r.id()
+        this.ids.set(handle, id)
+        const name = r.name()
+        const x = fromU16(r.u16(), q.min_x, q.max_x)
+        const z = fromU16(r.u16(), q.min_z, q.max_z)
+        far.push([id, name, x, z])
+      }
+    }
+
+    const common = {
+      server_time_ms: serverTimeMs,
+      seq,
+      ack,
+      room_id: this.roomId,
+      phase: this.phase,
+      ...(flags & FLAG_INTEREST ? { interest: true } : {}),
+      ...(far ? { far } : {}),
+    }
+    if (flags & FLAG_KEYFRAME) {
+      return { ...common, keyframe: true, players, tree: { decorations: added } }
+    }
+    return {
+      ...common,
+      keyframe: false,
+      base,
+      players,
+      removed_players: removedPlayers,
+      tree: { added, removed: removedDecos },
+    }
+  }
+}
+
+export function encodeInputMove(p: InputPayload): ArrayBuffer {
+  const buf = new ArrayBuffer(13)
+  const v = new DataView(buf)
+  v.setUint8(0, TAG_INPUT_MOVE)
+  v.setUint32(1, p.seq >>> 0, true)
+  v.setInt16(5, toI16(p.ax, 1), true)
+  v.setInt16(7, toI16(p.az, 1), true)
+  v.setUint32(9, p.client_time_ms >>> 0, true)
+  return buf
+}
+
+export function encodeStateAck(seq: number): ArrayBuffer {
+  const buf = new ArrayBuffer(5)
+  const v = new DataView(buf)
+  v.setUint8(0, TAG_STATE_ACK)
+  v.setUint32(1, seq >>> 0, true)
+  return buf
+}
@@ -188,15 +188,12 @@ export class World {
       }
       p.isLocal = isLocal
       p.name = ps.name
-      p.vx = ps.vx
-      p.vz = ps.vz
       p.placedCount = ps.placed_count
       p.setHat(!!ps.cosmetic?.hat)
-      if (isLocal) {
-        p.x = ps.x
-        p.z = ps.z
-        p.updateMesh()
-      } else {
+      // The local player is moved by GameEngine's reconciliation instead.
+      if (!isLocal) {
+        p.vx = ps.vx
+        p.vz = ps.vz
         p.setTargetPosition(ps.x, ps.z)
       }
     }
@@ -2,6 +2,7 @@ export const SERVER_TICK_HZ = 20
 export const SNAPSHOT_HZ = 15
 export const INPUT_RATE_LIMIT_HZ = 30
 export const PLAYER_MAX_SPEED = 3.5
+export const PLAYER_MAX_ACCEL = 25.0
 
 export const WORLD_MIN_X = -14.0
 export const WORLD_MAX_X = 14.0
@@ -10,6 +11,9 @@ export const WORLD_MAX_Z = 14.0
 
 export const WS_PATH = '/ws'
 export const WS_URL = (window.location.protocol === 'https:' ? 'wss:' : 'ws:') + '//' + window.location.host + WS_PATH
+// Snapshots are JSON unless the page is opened with ?wire=bin1: the binary
+// protocol is several times smaller but costs the server more CPU to encode.
+export const WIRE_PROTOCOL = new URLSearchParams(window.location.search).get('wire') === 'bin1' ? 'bin1' : 'json'
 
 export type DecorationType = 'bell' | 'mini_hat' | 'tinsel'
 
@@ -33,13 +37,35 @@ export interface PlayerState {
   placed_count: number
 }
 
+// [id, name, x, z] of a player outside the local area of interest.
+export type FarPlayerRow = [string, string, number, number]
+
 export interface ServerSnapshotPayload {
   server_time_ms: number
+  seq: number
+  keyframe: true
   players: PlayerState[]
   ack: Record<string, number>
   room_id: string
   phase: string
   tree: { decorations: DecorationState[] }
+  interest?: boolean
+  far?: FarPlayerRow[]
+}
+
+export interface ServerSnapshotDeltaPayload {
+  server_time_ms: number
+  seq: number
+  keyframe: false
+  base: number
+  players: (Partial<PlayerState> & { id: string })[]
+  removed_players: string[]
+  ack: Record<string, number>
+  room_id: string
+  phase: string
+  tree: { added: DecorationState[]; removed: string[] }
+  interest?: boolean
+  far?: FarPlayerRow[]
 }
 
 export interface InputPayload {
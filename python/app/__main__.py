@@ -1,12 +1,54 @@
 from __future__ import annotations
 
+import argparse
+import os
+import subprocess
+import sys
+
 import uvicorn
 
 
+def _run_workers(count: int, host: str, base_port: int) -> None:
+    """Run ``count`` single-worker servers on consecutive ports as one sharded deployment."""
+    procs = []
+    for i in range(count):
+        env = dict(os.environ)
+        env.update(
+            SHARD_COUNT=str(count),
+            SHARD_INDEX=str(i),
+            SHARD_BASE_PORT=str(base_port),
+        )
+        cmd = [sys.executable, "-m", "app", "--host", host, "--port", str(base_port + i)]
+        procs.append(subprocess.Popen(cmd, env=env))
+    try:
+        for p in procs:
+            p.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.terminate()
+        for p in procs:
+            p.wait()
+
+
 def main() -> None:
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=False)
+    parser = argparse.ArgumentParser(prog="python -m app")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="sharded worker processes on consecutive ports")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        from app.config import settings
+
+        if settings.storage_backend in ("memory", "sqlite") or not settings.redis_url:
+            parser.error("--workers > 1 needs Redis for room leases (STORAGE_BACKEND=external with REDIS_URL set)")
+        _run_workers(args.workers, args.host, args.port)
+        return
+    uvicorn.run("app.main:app", host=args.host, port=args.port, reload=False)
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def _dumps(message: dict[str, Any]) -> tuple[str, int]:
+    if orjson is not None:
+        raw = orjson.dumps(message)
+        return raw.decode("utf-8"), len(raw)
+    # ASCII-only output keeps len() equal to the number of bytes on the wire.
+    text = json.dumps(message, separators=(",", ":"))
+    return text, len(text)
+
+
+@dataclass(frozen=True, slots=True)
+class Frame:
+    """A pre-encoded websocket message: text frames are str, binary frames bytes."""
+
+    data: str | bytes
+    size: int
+
+
+@dataclass(slots=True)
+class EncodeStats:
+    messages: int = 0
+    bytes_sent: int = 0
+    encode_ns: int = 0
+    tick_bytes_sent: int = 0
+    tick_encode_ns: int = 0
+    last_tick_bytes_sent: int = 0
+    last_tick_encode_ns: int = 0
+
+    def begin_tick(self) -> None:
+        self.tick_bytes_sent = 0
+        self.tick_encode_ns = 0
+
+    def end_tick(self) -> None:
+        self.last_tick_bytes_sent = self.tick_bytes_sent
+        self.last_tick_encode_ns = self.tick_encode_ns
+
+    def record_sent(self, size: int, recipients: int) -> None:
+        total = size * recipients
+        self.bytes_sent += total
+        self.tick_bytes_sent += total
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "bytes_sent": self.bytes_sent,
+            "encode_ms": self.encode_ns / 1e6,
+            "last_tick_bytes_sent": self.last_tick_bytes_sent,
+            "last_tick_encode_ms": self.last_tick_encode_ns / 1e6,
+        }
+
+
+def encode_message(message: dict[str, Any], stats: EncodeStats | None = None) -> Frame:
+    """Serialize a message once so the same frame can be sent to many sockets."""
+    if stats is None:
+        return Frame(*_dumps(message))
+    t0 = time.perf_counter_ns()
+    frame = Frame(*_dumps(message))
+    elapsed = time.perf_counter_ns() - t0
+    stats.messages += 1
+    stats.encode_ns += elapsed
+    stats.tick_encode_ns += elapsed
+    return frame
+
+
+def encode_binary(encoder: Callable[..., bytes], *args: Any, stats: EncodeStats | None = None) -> Frame:
+    """Wrap a binary encoder so its time and output size are tracked like JSON frames."""
+    t0 = time.perf_counter_ns()
+    data = encoder(*args)
+    if stats is not None:
+        elapsed = time.perf_counter_ns() - t0
+        stats.messages += 1
+        stats.encode_ns += elapsed
+        stats.tick_encode_ns += elapsed
+    return Frame(data, len(data))
+
+
+async def send_frame(ws: Any, frame: Frame) -> None:
+    if isinstance(frame.data, bytes):
+        await ws.send_bytes(frame.data)
+    else:
+        await ws.send_text(frame.data)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from app.game.room import Room
+
+# Shedding steps, each including the ones before it.
+NORMAL = 0
+SHED_SNAPSHOTS = 1
+SHED_TICKS = 2
+REFUSE = 3
+LEVEL_NAMES = ("normal", "snapshot_rate", "tick_rate", "refuse")
+
+
+class Overloaded(Exception):
+    """The worker is shedding load and does not take new rooms or players."""
+
+    code = "server_busy"
+
+    def __init__(self) -> None:
+        super().__init__("server overloaded")
+
+
+def _now_ms() -> int:
+    return int(time.monotonic() * 1000)
+
+
+@dataclass(slots=True)
+class LoadGovernor:
+    """Sheds work when ticking no longer fits in the scheduler's step.
+
+    Load is the CPU time spent ticking rooms as a share of each step (or
+    the loop's lag behind the step clock, if larger), so rooms waiting on
+    slow storage do not count as load. It is smoothed over about a
+    second; while it stays above ``high`` for ``hold_ms`` the governor
+    escalates one level: first every client is held at
+    ``snapshot_min_hz``, then the rooms that make up the costlier half of
+    the tick work tick every other step, then new rooms and joins are
+    refused. It steps back down one level at a time
+    once load has stayed below ``low`` for ``hold_ms``.
+    """
+
+    enabled: bool = True
+    high: float = 0.8
+    low: float = 0.5
+    hold_ms: int = 2000
+    level: int = NORMAL
+    load: float = 0.0
+    escalations: int = 0
+    refused: int = 0
+    _over_since_ms: int = 0
+    _under_since_ms: int = 0
+    _applied_ms: int = 0
+
+    @classmethod
+    def from_settings(cls) -> LoadGovernor:
+        return cls(
+            enabled=settings.governor_enabled,
+            high=settings.governor_high,
+            low=settings.governor_low,
+            hold_ms=settings.governor_hold_ms,
+        )
+
+    @property
+    def refusing(self) -> bool:
+        return self.level >= REFUSE
+
+    def admit(self) -> None:
+        """Raise Overloaded instead of taking on a new room or player."""
+        if self.refusing:
+            self.refused += 1
+            raise Overloaded()
+
+    def update(self, step_s: float, busy_s: float, behind_s: float, rooms: Iterable[Room]) -> None:
+        """Fold one scheduler step into the load estimate and re-apply limits when they change."""
+        if not self.enabled:
+            return
+        sample = max(busy_s, behind_s) / step_s
+        self.load += 0.1 * (sample - self.load)
+        now_ms = _now_ms()
+        level = self.level
+        if self.load > self.high:
+            self._under_since_ms = 0
+            if self._over_since_ms == 0:
+                self._over_since_ms = now_ms
+            elif now_ms - self._over_since_ms >= self.hold_ms and level < REFUSE:
+                level += 1
+                self._over_since_ms = now_ms
+                self.escalations += 1
+        elif self.load < self.low:
+            self._over_since_ms = 0
+            if self._under_since_ms == 0:
+                self._under_since_ms = now_ms
+            elif now_ms - self._under_since_ms >= self.hold_ms and level > NORMAL:
+                level -= 1
+                self._under_since_ms = now_ms
+        else:
+            self._over_since_ms = self._under_since_ms = 0
+        if level != self.level:
+            print(f"[GOVERNOR] {LEVEL_NAMES[self.level]} -> {LEVEL_NAMES[level]} (load {self.load:.2f})")
+            self.level = level
+        elif level == NORMAL or now_ms - self._applied_ms < self.hold_ms:
+            return
+        # Also re-applied every hold period so new rooms pick up the limits
+        # and the throttled set follows whichever rooms are busiest now.
+        self._applied_ms = now_ms
+        self.apply(list(rooms))
+
+    def apply(self, rooms: list[Room]) -> None:
+        snapshot_cap = float(max(1, settings.snapshot_min_hz)) if self.level >= SHED_SNAPSHOTS else 0.0
+        throttled: set[str] = set()
+        if self.level >= SHED_TICKS:
+            total = sum(r.tick_stats.recent_ms for r in rooms)
+            spent = 0.0
+            for room in sorted(rooms, key=lambda r: r.tick_stats.recent_ms, reverse=True):
+                if spent >= total / 2.0:
+                    break
+                throttled.add(room.room_id)
+                spent += room.tick_stats.recent_ms
+        for room in rooms:
+            room.set_load_limits(snapshot_cap, 2 if room.room_id in throttled else 1)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import heapq
+import math
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.config import settings
+
+
+# Indices of x and z in a SnapshotFrame player state tuple.
+_X = 1
+_Z = 3
+
+
+@dataclass(slots=True)
+class SpatialGrid:
+    """Uniform grid over the world bounds used to pick each viewer's area of interest.
+
+    A viewer sees every player in its own cell and, from the cells within
+    ``radius`` of it (a square block of ``(2 * radius + 1) ** 2`` cells), the
+    ones nearest the cell's centre until ``max_visible`` is reached. Viewers
+    in the same cell therefore share one visible set, and a crowded block
+    does not grow it.
+    """
+
+    min_x: float
+    min_z: float
+    cell_size: float
+    cols: int
+    rows: int
+    radius: int = 1
+    # 0 lifts the cap.
+    max_visible: int = 0
+    _aoi: dict[int, tuple[int, ...]] = field(default_factory=dict)
+
+    @staticmethod
+    def from_settings() -> "SpatialGrid":
+        size = max(0.5, settings.interest_cell_size)
+        cols = max(1, math.ceil((settings.world_max_x - settings.world_min_x) / size))
+        rows = max(1, math.ceil((settings.world_max_z - settings.world_min_z) / size))
+        return SpatialGrid(
+            min_x=settings.world_min_x,
+            min_z=settings.world_min_z,
+            cell_size=size,
+            cols=cols,
+            rows=rows,
+            radius=max(0, settings.interest_radius_cells),
+            max_visible=max(0, settings.interest_max_visible),
+        )
+
+    def cell_of(self, x: float, z: float) -> int:
+        cx = int((x - self.min_x) / self.cell_size)
+        cz = int((z - self.min_z) / self.cell_size)
+        cx = 0 if cx < 0 else self.cols - 1 if cx >= self.cols else cx
+        cz = 0 if cz < 0 else self.rows - 1 if cz >= self.rows else cz
+        return cz * self.cols + cx
+
+    def cell_of_state(self, state: tuple[Any, ...]) -> int:
+        return self.cell_of(state[_X], state[_Z])
+
+    def aoi_cells(self, cell: int) -> tuple[int, ...]:
+        cells = self._aoi.get(cell)
+        if cells is None:
+            cz, cx = divmod(cell, self.cols)
+            r = self.radius
+            cells = tuple(
+                z * self.cols + x
+                for z in range(max(0, cz - r), min(self.rows, cz + r + 1))
+                for x in range(max(0, cx - r), min(self.cols, cx + r + 1))
+            )
+            self._aoi[cell] = cells
+        return cells
+
+    def index(self, players: dict[str, tuple[Any, ...]]) -> dict[int, list[str]]:
+        cells: dict[int, list[str]] = {}
+        for pid, state in players.items():
+            cell = self.cell_of(state[_X], state[_Z])
+            bucket = cells.get(cell)
+            if bucket is None:
+                cells[cell] = [pid]
+            else:
+                bucket.append(pid)
+        return cells
+
+    def visible(self, index: dict[int, list[str]], cell: int, players: dict[str, tuple[Any, ...]]) -> set[str]:
+        """Players seen from ``cell``; ``players`` are the states ``index`` was built from."""
+        seen = set(index.get(cell, ()))
+        others = [pid for c in self.aoi_cells(cell) if c != cell for pid in index.get(c, ())]
+        room = self.max_visible - len(seen)
+        if self.max_visible <= 0 or len(others) <= room:
+            seen.update(others)
+        elif room > 0:
+            cz, cx = divmod(cell, self.cols)
+            x0 = self.min_x + (cx + 0.5) * self.cell_size
+            z0 = self.min_z + (cz + 0.5) * self.cell_size
+
+            def dist_sq(pid: str) -> float:
+                state = players[pid]
+                dx = state[_X] - x0
+                dz = state[_Z] - z0
+                return dx * dx + dz * dz
+
+            seen.update(heapq.nsmallest(room, others, key=dist_sq))
+        return seen
@@ -0,0 +1,264 @@
+"""Append-only binary journal of what each room was asked to do.
+
+With ``JOURNAL_DIR`` set, every room writes ``<room_id>-<start_ms>.journal``
+there: joins, leaves, accepted ``input.move``, accepted placements and chat
+lines, each stamped with the number of ticks the room had completed. Feeding
+the same records back through a room (``python -m benchmarks.replay``)
+reproduces the simulation without sockets.
+
+Records are appended to an in-memory buffer on the hot path and written by a
+background task every ``flush_ms``, off the event loop thread. Layout, all
+integers little-endian::
+
+    header: b"XJNL"  u8 version  f64 start_ms  str room_id
+    record: u8 kind  varint tick delta  body
+
+    JOIN   u16 handle  str player_id  str name  u8 bin1
+    LEAVE  u16 handle
+    MOVE   u16 handle  u32 seq  f64 ax  f64 az
+    STOP   u16 handle                                 socket dropped, queue cleared
+    PLACE  u16 handle  u8 type  f64 angle  f64 height
+    CHAT   u16 handle  u16 length + utf-8 text
+    DT     f64 dt                                     dt of the ticks that follow
+    END                                               room closed
+
+``str`` is a u8 length and utf-8 bytes. The tick delta is an unsigned LEB128
+varint counted from the previous record, so a busy room spends one byte on it.
+Axes, angles and heights are stored exactly as the room received them, so a
+replay follows the live room bit for bit. Version 1 journals, which stored
+axes as ``i16`` and placements as ``f32``, still read but replay only
+approximately.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import struct
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from app.game.wire import DECORATION_TYPES
+
+MAGIC = b"XJNL"
+VERSION = 2
+
+JOIN = 0x01
+LEAVE = 0x02
+MOVE = 0x03
+STOP = 0x04
+PLACE = 0x05
+CHAT = 0x06
+DT = 0x07
+END = 0x08
+
+KIND_NAMES = {JOIN: "join", LEAVE: "leave", MOVE: "move", STOP: "stop", PLACE: "place", CHAT: "chat", DT: "dt", END: "end"}
+
+_HEADER = struct.Struct("<4sBd")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_F64 = struct.Struct("<d")
+_MOVE = struct.Struct("<HIdd")
+_PLACE = struct.Struct("<HBdd")
+_MOVE_V1 = struct.Struct("<HIhh")
+_PLACE_V1 = struct.Struct("<HBff")
+_DECORATION_CODE = {t: i for i, t in enumerate(DECORATION_TYPES)}
+
+
+def _pack_str(value: str) -> bytes:
+    raw = value.encode("utf-8")[:255]
+    return _U8.pack(len(raw)) + raw
+
+
+@dataclass(slots=True)
+class RoomJournal:
+    path: str
+    flush_ms: int = 1000
+    records: int = 0
+    bytes_written: int = 0
+    failed: int = 0
+    _buf: bytearray = field(default_factory=bytearray)
+    _tick: int = 0
+    _dt: float = 0.0
+    _wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    _task: asyncio.Task[None] | None = None
+    _closed: bool = False
+
+    @classmethod
+    def create(cls, directory: str, room_id: str, start_ms: int, flush_ms: int = 1000) -> RoomJournal:
+        os.makedirs(directory, exist_ok=True)
+        journal = cls(path=os.path.join(directory, f"{room_id}-{start_ms}.journal"), flush_ms=flush_ms)
+        journal._buf += _HEADER.pack(MAGIC, VERSION, float(start_ms)) + _pack_str(room_id)
+        return journal
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self, tick: int) -> None:
+        """Write END at ``tick``, the room's completed tick count, and flush."""
+        if self._closed:
+            return
+        self._begin(END, tick)
+        self._closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        else:
+            await self._flush()
+
+    def _begin(self, kind: int, tick: int) -> bytearray:
+        delta = max(0, tick - self._tick)
+        self._tick = max(self._tick, tick)
+        buf = self._buf
+        buf.append(kind)
+        while delta >= 0x80:
+            buf.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        buf.append(delta)
+        self.records += 1
+        return buf
+
+    def join(self, tick: int, handle: int, player_id: str, name: str, protocol: str) -> None:
+        self._begin(JOIN, tick).extend(
+            _U16.pack(handle) + _pack_str(player_id) + _pack_str(name) + _U8.pack(protocol == "bin1")
+        )
+
+    def leave(self, tick: int, handle: int) -> None:
+        self._begin(LEAVE, tick).extend(_U16.pack(handle))
+
+    def move(self, tick: int, handle: int, seq: int, ax: float, az: float) -> None:
+        self._begin(MOVE, tick).extend(_MOVE.pack(handle, seq & 0xFFFFFFFF, ax, az))
+
+    def stop(self, tick: int, handle: int) -> None:
+        self._begin(STOP, tick).extend(_U16.pack(handle))
+
+    def place(self, tick: int, handle: int, deco_type: str, angle: float, height: float) -> None:
+        self._begin(PLACE, tick).extend(_PLACE.pack(handle, _DECORATION_CODE.get(deco_type, 255), angle, height))
+
+    def chat(self, tick: int, handle: int, text: str) -> None:
+        raw = text.encode("utf-8")[:0xFFFF]
+        self._begin(CHAT, tick).extend(_U16.pack(handle) + _U16.pack(len(raw)) + raw)
+
+    def tick_dt(self, tick: int, dt: float) -> None:
+        """Note the tick length, only when it changes."""
+        if dt != self._dt:
+            self._dt = dt
+            self._begin(DT, tick).extend(_F64.pack(dt))
+
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_ms / 1000.0)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._flush()
+        await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._buf:
+            return
+        data = bytes(self._buf)
+        self._buf.clear()
+        try:
+            await asyncio.to_thread(_append, self.path, data)
+            self.bytes_written += len(data)
+        except Exception as e:
+            self.failed += 1
+            print(f"[JOURNAL ERROR] {self.path}: {e}")
+
+
+def _append(path: str, data: bytes) -> None:
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+@dataclass(slots=True)
+class JournalHeader:
+    room_id: str
+    start_ms: int
+
+
+def read_journal(data: bytes) -> tuple[JournalHeader, Iterator[tuple[int, int, dict[str, Any]]]]:
+    """Parse a journal into its header and ``(tick, kind, fields)`` records.
+
+    Ticks are absolute. A truncated final record (the process died mid-write)
+    ends the iteration quietly.
+    """
+    if len(data) < _HEADER.size or data[:4] != MAGIC:
+        raise ValueError("not a room journal")
+    _, version, start_ms = _HEADER.unpack_from(data, 0)
+    if version == VERSION:
+        move_struct, place_struct, axis_scale = _MOVE, _PLACE, 1.0
+    elif version == 1:
+        move_struct, place_struct, axis_scale = _MOVE_V1, _PLACE_V1, 32767.0
+    else:
+        raise ValueError(f"unsupported journal version {version}")
+    pos = _HEADER.size
+
+    def text(width: struct.Struct) -> str:
+        nonlocal pos
+        (n,) = width.unpack_from(data, pos)
+        pos += width.size
+        raw = data[pos : pos + n]
+        if len(raw) != n:
+            raise struct.error("truncated string")
+        pos += n
+        return raw.decode("utf-8", errors="replace")
+
+    room_id = text(_U8)
+
+    def records() -> Iterator[tuple[int, int, dict[str, Any]]]:
+        nonlocal pos
+        tick = 0
+        while pos < len(data):
+            start = pos
+            try:
+                kind = data[pos]
+                pos += 1
+                delta = shift = 0
+                while True:
+                    b = data[pos]
+                    pos += 1
+                    delta |= (b & 0x7F) << shift
+                    shift += 7
+                    if b < 0x80:
+                        break
+                tick += delta
+                fields: dict[str, Any] = {}
+                if kind == JOIN:
+                    (fields["handle"],) = _U16.unpack_from(data, pos)
+                    pos += _U16.size
+                    fields["player_id"] = text(_U8)
+                    fields["name"] = text(_U8)
+                    (bin1,) = _U8.unpack_from(data, pos)
+                    pos += _U8.size
+                    fields["protocol"] = "bin1" if bin1 else "json"
+                elif kind in (LEAVE, STOP):
+                    (fields["handle"],) = _U16.unpack_from(data, pos)
+                    pos += _U16.size
+                elif kind == MOVE:
+                    handle, seq, ax, az = move_struct.unpack_from(data, pos)
+                    pos += move_struct.size
+                    fields.update(handle=handle, seq=seq, ax=ax / axis_scale, az=az / axis_scale)
+                elif kind == PLACE:
+                    handle, code, angle, height = place_struct.unpack_from(data, pos)
+                    pos += place_struct.size
+                    deco_type = DECORATION_TYPES[code] if code < len(DECORATION_TYPES) else ""
+                    fields.update(handle=handle, type=deco_type, angle=angle, height=height)
+                elif kind == CHAT:
+                    (fields["handle"],) = _U16.unpack_from(data, pos)
+                    pos += _U16.size
+                    fields["text"] = text(_U16)
+                elif kind == DT:
+                    (fields["dt"],) = _F64.unpack_from(data, pos)
+                    pos += _F64.size
+                elif kind != END:
+                    raise ValueError(f"unknown journal record {kind:#x} at byte {start}")
+            except (IndexError, struct.error):
+                return
+            yield tick, kind, fields
+
+    return JournalHeader(room_id=room_id, start_ms=int(start_ms)), records()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from app.game.encoding import Frame, send_frame
+from app.metrics import metrics
+
+
+def _now_ms() -> int:
+    return int(time.monotonic() * 1000)
+
+
+@dataclass(slots=True)
+class Outbox:
+    """Bounded outbound queue drained by one writer task per connection.
+
+    Reliable frames (chat, tree.placed, ...) are delivered in order. Snapshots
+    live in a single slot: a newer snapshot replaces one that has not been
+    written yet, so a slow socket only ever falls one snapshot behind.
+    """
+
+    ws: Any
+    max_messages: int = 64
+    overflow_grace_ms: int = 3000
+    on_closed: Callable[[], None] | None = None
+    dropped_snapshots: int = 0
+    sent_frames: int = 0
+    sent_bytes: int = 0
+    overflowed: bool = False
+    _reliable: deque[tuple[Frame, float]] = field(default_factory=deque)
+    _snapshot: Frame | None = None
+    _snapshot_at: float = 0.0
+    _over_limit_since_ms: int = 0
+    _wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    _task: asyncio.Task[None] | None = None
+    _closed: bool = False
+
+    @property
+    def depth(self) -> int:
+        return len(self._reliable) + (1 if self._snapshot is not None else 0)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def close(self) -> None:
+        self._closed = True
+        self._reliable.clear()
+        self._snapshot = None
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._wakeup.set()
+
+    def push(self, frame: Frame) -> None:
+        if self._closed:
+            return
+        self._reliable.append((frame, time.perf_counter() if metrics.enabled else 0.0))
+        self._check_limit()
+        self._wakeup.set()
+
+    def push_snapshot(self, frame: Frame) -> None:
+        if self._closed:
+            return
+        if self._snapshot is not None:
+            self.dropped_snapshots += 1
+        self._snapshot = frame
+        self._snapshot_at = time.perf_counter() if metrics.enabled else 0.0
+        self._check_limit()
+        self._wakeup.set()
+
+    def _check_limit(self) -> None:
+        if self.depth <= self.max_messages:
+            self._over_limit_since_ms = 0
+            return
+        now = _now_ms()
+        if self._over_limit_since_ms == 0:
+            self._over_limit_since_ms = now
+            return
+        # Reliable frames cannot be dropped, so a client that stays behind is cut off.
+        if now - self._over_limit_since_ms >= self.overflow_grace_ms or self.depth > self.max_messages * 4:
+            self.overflowed = True
+            self._fail()
+
+    def _fail(self) -> None:
+        if self._closed:
+            return
+        self.close()
+        asyncio.create_task(self._close_ws())
+        if self.on_closed is not None:
+            self.on_closed()
+
+    async def _close_ws(self) -> None:
+        try:
+            await self.ws.close(code=1013)
+        except Exception:
+            pass
+
+    async def _run(self) -> None:
+        while not self._closed:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while not self._closed:
+                if self._reliable:
+                    frame, queued_at = self._reliable.popleft()
+                    kind = "reliable"
+                elif self._snapshot is not None:
+                    frame, queued_at = self._snapshot, self._snapshot_at
+                    self._snapshot = None
+                    kind = "snapshot"
+                else:
+                    break
+                if metrics.enabled and queued_at:
+                    metrics.observe(
+                        "send_queue_seconds",
+                        time.perf_counter() - queued_at,
+                        (("kind", kind),),
+                        help="Time a frame waits in a connection's outbox before it is written.",
+                    )
+                try:
+                    await send_frame(self.ws, frame)
+                except Exception:
+                    self._fail()
+                    return
+                self.sent_frames += 1
+                self.sent_bytes += frame.size
+                if self.depth <= self.max_messages:
+                    self._over_limit_since_ms = 0
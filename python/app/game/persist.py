@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+
+@dataclass(slots=True)
+class PersistStats:
+    flushes: int = 0
+    failures: int = 0
+    # Changes that were folded into a later write instead of getting their own.
+    coalesced: int = 0
+    last_flush_ms: float = 0.0
+    max_flush_ms: float = 0.0
+    total_flush_ms: float = 0.0
+
+    def record(self, duration_ms: float) -> None:
+        self.flushes += 1
+        self.last_flush_ms = duration_ms
+        self.total_flush_ms += duration_ms
+        if duration_ms > self.max_flush_ms:
+            self.max_flush_ms = duration_ms
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "coalesced": self.coalesced,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms,
+            "avg_flush_ms": self.total_flush_ms / self.flushes if self.flushes else 0.0,
+        }
+
+
+@dataclass(slots=True)
+class WriteBehind:
+    """Coalesces changes to one piece of state and writes it in the background.
+
+    ``mark_dirty()`` only records that a write is owed. The first change
+    after a flush arms a timer; the write runs once ``delay_ms`` has passed
+    or ``max_pending`` changes have piled up, whichever comes first, so a
+    burst of changes costs one write of the latest state. A failed write
+    keeps the changes pending and is retried on the next timer.
+    """
+
+    write: Callable[[], Awaitable[None]]
+    delay_ms: int = 500
+    max_pending: int = 32
+    name: str = ""
+    stats: PersistStats = field(default_factory=PersistStats)
+    _pending: int = 0
+    _task: asyncio.Task[None] | None = None
+    _due: asyncio.Event = field(default_factory=asyncio.Event)
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    _closed: bool = False
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def mark_dirty(self) -> None:
+        self._pending += 1
+        if self._pending > 1:
+            self.stats.coalesced += 1
+        if self._pending >= max(1, self.max_pending):
+            self._due.set()
+        if self._task is None and not self._closed:
+            self._task = asyncio.create_task(self._run())
+
+    async def flush(self) -> None:
+        """Write now if anything is pending."""
+        async with self._lock:
+            if self._pending == 0:
+                return
+            pending = self._pending
+            self._pending = 0
+            self._due.clear()
+            t0 = time.perf_counter()
+            try:
+                await self.write()
+            except Exception as e:
+                self._pending += pending
+                self.stats.failures += 1
+                print(f"[PERSIST ERROR] {self.name}: {e}")
+                return
+            self.stats.record((time.perf_counter() - t0) * 1000.0)
+
+    async def close(self) -> None:
+        """Stop the timer and write whatever is still pending."""
+        self._closed = True
+        self._due.set()
+        task = self._task
+        if task is not None and task is not asyncio.current_task():
+            await task
+        await self.flush()
+
+    async def _run(self) -> None:
+        try:
+            while self._pending and not self._closed:
+                try:
+                    await asyncio.wait_for(self._due.wait(), timeout=max(0, self.delay_ms) / 1000.0)
+                except asyncio.TimeoutError:
+                    pass
+                await self.flush()
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Protocol
+
+from app.game.anti_cheat import MoveConstraints, apply_move_constraints
+from app.game.types import PlayerRuntime, clamp
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+
+class PhysicsEngine(Protocol):
+    def add(self, runtime: PlayerRuntime) -> None: ...
+
+    def remove(self, player_id: str) -> None: ...
+
+    def set_axis(self, runtime: PlayerRuntime, ax: float, az: float) -> None: ...
+
+    def step(self, dt: float, c: MoveConstraints) -> bool:
+        """Advance every player by ``dt``; returns True if anyone is moving or steering."""
+        ...
+
+
+@dataclass(slots=True)
+class ScalarPhysics:
+    """Reference implementation: one player at a time with Python floats."""
+
+    _runtimes: dict[str, PlayerRuntime] = field(default_factory=dict)
+
+    def add(self, runtime: PlayerRuntime) -> None:
+        self._runtimes[runtime.player_id] = runtime
+
+    def remove(self, player_id: str) -> None:
+        self._runtimes.pop(player_id, None)
+
+    def set_axis(self, runtime: PlayerRuntime, ax: float, az: float) -> None:
+        runtime.cheat_flags["last_axis"] = (ax, az)
+
+    def step(self, dt: float, c: MoveConstraints) -> bool:
+        moving = False
+        max_dv = c.max_accel * dt
+        for rt in self._runtimes.values():
+            kin = rt.kin
+            axis = rt.cheat_flags.get("last_axis", (0.0, 0.0))
+            ax, az = float(axis[0]), float(axis[1])
+            target_vx = ax * c.max_speed
+            target_vz = az * c.max_speed
+            kin.vx += clamp(target_vx - kin.vx, -max_dv, max_dv)
+            kin.vz += clamp(target_vz - kin.vz, -max_dv, max_dv)
+            kin.x += kin.vx * dt
+            kin.z += kin.vz * dt
+
+            x, z, vx, vz, flags = apply_move_constraints(kin.x, kin.z, kin.vx, kin.vz, c)
+            kin.x = x
+            kin.z = z
+            kin.vx = vx
+            kin.vz = vz
+            if flags:
+                rt.cheat_flags.update(flags)
+            if ax or az or vx or vz:
+                moving = True
+        return moving
+
+
+class VectorPhysics:
+    """Keeps x, z, vx, vz and the input axis of all players in contiguous arrays.
+
+    Rows ``[0, count)`` are live; removing a player moves the last row into
+    the freed slot. After each step the results are written back to the
+    players' ``PlayerKinematic`` so snapshot building is unchanged.
+    """
+
+    __slots__ = ("_state", "_count", "_slot_of", "_runtimes")
+
+    # Row layout of the state array.
+    X, Z, VX, VZ, AX, AZ = range(6)
+
+    def __init__(self, capacity: int = 16) -> None:
+        if np is None:
+            raise RuntimeError("numpy is not installed")
+        self._state = np.zeros((6, max(1, capacity)), dtype=np.float64)
+        self._count = 0
+        self._slot_of: dict[str, int] = {}
+        self._runtimes: list[PlayerRuntime] = []
+
+    def add(self, runtime: PlayerRuntime) -> None:
+        if runtime.player_id in self._slot_of:
+            return
+        if self._count == self._state.shape[1]:
+            grown = np.zeros((6, self._state.shape[1] * 2), dtype=np.float64)
+            grown[:, : self._count] = self._state[:, : self._count]
+            self._state = grown
+        i = self._count
+        kin = runtime.kin
+        axis = runtime.cheat_flags.get("last_axis", (0.0, 0.0))
+        self._state[:, i] = (kin.x, kin.z, kin.vx, kin.vz, float(axis[0]), float(axis[1]))
+        self._slot_of[runtime.player_id] = i
+        self._runtimes.append(runtime)
+        self._count += 1
+
+    def remove(self, player_id: str) -> None:
+        i = self._slot_of.pop(player_id, None)
+        if i is None:
+            return
+        last = self._count - 1
+        if i != last:
+            self._state[:, i] = self._state[:, last]
+            moved = self._runtimes[last]
+            self._runtimes[i] = moved
+            self._slot_of[moved.player_id] = i
+        self._runtimes.pop()
+        self._count = last
+
+    def set_axis(self, runtime: PlayerRuntime, ax: float, az: float) -> None:
+        runtime.cheat_flags["last_axis"] = (ax, az)
+        i = self._slot_of.get(runtime.player_id)
+        if i is not None:
+            self._state[self.AX, i] = ax
+            self._state[self.AZ, i] = az
+
+    def step(self, dt: float, c: MoveConstraints) -> bool:
+        n = self._count
+        if n == 0:
+            return False
+        s = self._state[:, :n]
+        x, z, vx, vz, ax, az = s
+        max_dv = c.max_accel * dt
+        vx += np.clip(ax * c.max_speed - vx, -max_dv, max_dv)
+        vz += np.clip(az * c.max_speed - vz, -max_dv, max_dv)
+        x += vx * dt
+        z += vz * dt
+
+        max_v = float(max(0.0, c.max_speed))
+        vx2 = np.clip(vx, -max_v, max_v)
+        vz2 = np.clip(vz, -max_v, max_v)
+        speed_clamped = (vx2 != vx) | (vz2 != vz)
+        x2 = np.clip(x, c.min_x, c.max_x)
+        z2 = np.clip(z, c.min_z, c.max_z)
+        x_clamped = x2 != x
+        z_clamped = z2 != z
+        vx2[x_clamped] = 0.0
+        vz2[z_clamped] = 0.0
+        x[:] = x2
+        z[:] = z2
+        vx[:] = vx2
+        vz[:] = vz2
+
+        for i in np.flatnonzero(speed_clamped | x_clamped | z_clamped).tolist():
+            flags: dict[str, Any] = {}
+            if speed_clamped[i]:
+                flags["speed_clamped"] = True
+            if x_clamped[i]:
+                flags["x_clamped"] = True
+            if z_clamped[i]:
+                flags["z_clamped"] = True
+            self._runtimes[i].cheat_flags.update(flags)
+
+        for rt, x_i, z_i, vx_i, vz_i in zip(self._runtimes, x.tolist(), z.tolist(), vx.tolist(), vz.tolist()):
+            kin = rt.kin
+            kin.x = x_i
+            kin.z = z_i
+            kin.vx = vx_i
+            kin.vz = vz_i
+
+        return bool(np.any(ax) or np.any(az) or np.any(vx) or np.any(vz))
+
+
+def make_physics(engine: str, runtimes: list[PlayerRuntime] | None = None) -> PhysicsEngine:
+    """Build the named engine ("scalar" or "numpy"), falling back to scalar without numpy."""
+    physics: PhysicsEngine
+    if engine == "numpy" and np is not None:
+        physics = VectorPhysics(capacity=max(16, len(runtimes or ())))
+    else:
+        physics = ScalarPhysics()
+    for rt in runtimes or ():
+        physics.add(rt)
+    return physics
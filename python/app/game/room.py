@@ -2,18 +2,42 @@ from __future__ import annotations
 
 import asyncio
 import math
+import secrets
 import time
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, Callable
 from uuid import uuid4
 
 from fastapi import WebSocket
 
 from app.config import settings
-from app.game.anti_cheat import MoveConstraints, apply_move_constraints
+from app.game.anti_cheat import MoveConstraints
+from app.game.encoding import EncodeStats, Frame, encode_binary, encode_message, send_frame
+from app.game.interest import SpatialGrid
+from app.game.journal import RoomJournal
+from app.game.outbox import Outbox
+from app.game.persist import WriteBehind
+from app.game.physics import PhysicsEngine, ScalarPhysics, make_physics
+from app.game.scheduler import RoomTickStats
+from app.game.snapshot import (
+    SnapshotFrame,
+    SnapshotHistory,
+    build_delta_payload,
+    build_keyframe_payload,
+    decoration_dict,
+    far_summary,
+)
 from app.game.types import Decoration, DecorationType, PlayerRuntime, clamp
-from app.storage.mysql_repo import MySqlRepo
-from app.storage.redis_store import RedisStore
+from app.game.wire import PROTOCOL_BIN1, PROTOCOL_JSON, Quantizer, encode_snapshot
+from app.metrics import metrics
+from app.storage.base import CacheStore, Repo
+from app.storage.chat_log import ChatLogWriter
+from app.storage.migrate import migrate_room
+
+
+# Matches the length of the Redis chat list.
+CHAT_HISTORY_SIZE = 50
 
 
 def _now_ms() -> int:
@@ -30,56 +54,205 @@ def _normalize_axis(ax: float, az: float) -> tuple[float, float]:
     return ax / mag, az / mag
 
 
+def _physics_engine_for(player_count: int) -> str:
+    engine = settings.physics_engine
+    if engine == "auto":
+        return "numpy" if player_count >= settings.physics_vector_min_players else "scalar"
+    return engine
+
+
+def _move_constraints() -> MoveConstraints:
+    return MoveConstraints(
+        max_speed=settings.player_max_speed,
+        max_accel=settings.player_max_accel,
+        min_x=settings.world_min_x,
+        max_x=settings.world_max_x,
+        min_z=settings.world_min_z,
+        max_z=settings.world_max_z,
+    )
+
+
 @dataclass(slots=True)
 class PlayerConn:
     ws: WebSocket
     runtime: PlayerRuntime
+    outbox: Outbox
+    handle: int = 0
+    protocol: str = PROTOCOL_JSON
     last_sent_snapshot_ms: int = 0
+    acked_snapshot_seq: int = 0
+    # Current snapshot rate for this client, adapted by Room._adapt_snapshot_rate.
+    snapshot_hz: float = field(default_factory=lambda: float(max(1, settings.snapshot_hz)))
+    adapted_ms: int = 0
+    adapted_dropped: int = 0
+    # Smoothed round trip, its mean deviation and the client clock minus
+    # ours, all from ping/pong; rtt_ms stays 0 until the first pong.
+    rtt_ms: float = 0.0
+    rtt_var_ms: float = 0.0
+    clock_offset_ms: float = 0.0
+    ping_id: int = 0
+    ping_sent_ms: int = 0
+    last_ping_ms: int = 0
     rate_tokens: float = 0.0
     rate_last_ms: int = field(default_factory=_now_ms)
+    # Accepted input.move not yet simulated, oldest first: (seq, ax, az, client_time_ms).
+    inputs: deque[tuple[int, float, float, int]] = field(
+        default_factory=lambda: deque(maxlen=max(1, settings.input_queue_max))
+    )
+    input_seq: int = 0
+    dropped_inputs: int = 0
+    # Set while the socket is gone and the player waits for a resume.
+    resume_token: str = ""
+    detached_ms: int = 0
+    expire_task: asyncio.Task[None] | None = None
 
 
 @dataclass(slots=True)
 class Room:
     room_id: str
-    redis: RedisStore
-    mysql: MySqlRepo
+    redis: CacheStore
+    mysql: Repo
+    chat_log: ChatLogWriter | None = None
+    journal: RoomJournal | None = None
+    # Wall clock in ms; the replay tool swaps in a simulated one.
+    clock: Callable[[], int] = _now_ms
     phase: str = "PLAY"
     created_ms: int = field(default_factory=_now_ms)
     players: dict[str, PlayerConn] = field(default_factory=dict)
     decorations: dict[str, Decoration] = field(default_factory=dict)
-    _tick_task: asyncio.Task[None] | None = None
+    tree_version: int = 0
+    # Ticks whose physics step has run. Journal records are stamped with it,
+    # so input arriving during a tick's tail counts towards the next tick.
+    tick_no: int = 0
+    encode_stats: EncodeStats = field(default_factory=EncodeStats)
+    tick_stats: RoomTickStats = field(default_factory=RoomTickStats)
+    mirror_writes: int = 0
+    mirror_skips: int = 0
+    empty_since_ms: int = field(default_factory=_now_ms)
+    # Limits set by the load governor: a snapshot rate ceiling (0 = none) and
+    # how many scheduler steps one tick covers.
+    snapshot_cap_hz: float = 0.0
+    tick_divisor: int = 1
+    _snapshots: SnapshotHistory = field(default_factory=lambda: SnapshotHistory(size=settings.snapshot_history))
+    _grid: SpatialGrid = field(default_factory=SpatialGrid.from_settings)
+    _quantizer: Quantizer = field(default_factory=Quantizer.from_settings)
+    # Handles stay mapped after a player leaves so later deltas can still name
+    # them in removed_players; a handle is only recycled once 1..65535 ran out.
+    _handle_of: dict[str, int] = field(default_factory=dict)
+    _resume_tokens: dict[str, str] = field(default_factory=dict)
+    _handle_owner: dict[int, str] = field(default_factory=dict)
+    _free_handles: deque[int] = field(default_factory=deque)
+    _next_handle: int = 1
+    _persisted_tree_version: int = 0
+    # Ids placed since the last tree write, in placement order.
+    _unsaved_decorations: list[str] = field(default_factory=list)
+    _mirrored: SnapshotFrame | None = None
+    _mirrored_phase: str = ""
+    _mirrored_ms: int = 0
+    _chat: deque[dict[str, Any]] = field(default_factory=lambda: deque(maxlen=CHAT_HISTORY_SIZE))
+    _chat_frame: Frame | None = None
+    _inbox: list[PlayerConn] = field(default_factory=list)
+    _moving: bool = False
+    _wake: bool = False
+    _constraints: MoveConstraints = field(default_factory=_move_constraints)
+    _physics: PhysicsEngine = field(default_factory=ScalarPhysics)
+    _physics_name: str = "scalar"
+    _start_task: asyncio.Task[None] | None = None
     _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
     _closed: bool = False
+    _tree_writer: WriteBehind = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._tree_writer = WriteBehind(
+            write=self._persist_tree_state,
+            delay_ms=settings.tree_flush_delay_ms,
+            max_pending=settings.tree_flush_max_pending,
+            name=f"tree:{self.room_id}",
+        )
 
     async def start(self) -> None:
-        if self._tick_task is not None:
-            return
-        await self._hydrate_state()
-        self._tick_task = asyncio.create_task(self._run_ticks())
+        """Hydrate the room once; every caller returns only after it has finished.
 
-    async def close(self) -> None:
+        A failed hydration is forgotten, so the next caller tries again.
+        """
+        if self._start_task is None:
+            self._start_task = asyncio.create_task(self._start())
+        task = self._start_task
+        try:
+            await asyncio.shield(task)
+        except BaseException:
+            if task.done() and self._start_task is task and (task.cancelled() or task.exception() is not None):
+                self._start_task = None
+            raise
+
+    async def _start(self) -> None:
+        await self._hydrate_state()
+        await self._load_chat_history()
+        if self.journal is not None:
+            self.journal.start()
+
+    def tick_every(self) -> int:
+        """How many scheduler steps apart this room wants to tick; 0 parks it."""
+        if not self.players:
+            return 0
+        if self._wake or self._moving:
+            return self.tick_divisor
+        return max(1, settings.idle_tick_every) * self.tick_divisor
+
+    def set_load_limits(self, snapshot_cap_hz: float, tick_divisor: int) -> None:
+        """Apply the load governor's limits; lowering the cap takes effect at once."""
+        self.snapshot_cap_hz = snapshot_cap_hz
+        self.tick_divisor = max(1, tick_divisor)
+        if snapshot_cap_hz > 0:
+            for conn in self.players.values():
+                conn.snapshot_hz = min(conn.snapshot_hz, snapshot_cap_hz)
+
+    def idle_for_ms(self, now_ms: int) -> int:
+        if self.players or self.empty_since_ms == 0:
+            return 0
+        return now_ms - self.empty_since_ms
+
+    def touch(self) -> None:
+        if not self.players:
+            self.empty_since_ms = self.clock()
+
+    async def flush(self) -> None:
+        if self.tree_version != self._persisted_tree_version and not self._tree_writer.pending:
+            self._tree_writer.mark_dirty()
+        await self._tree_writer.flush()
+
+    async def close(self, final_message: dict[str, Any] | None = None) -> None:
+        """Persist pending state and disconnect everyone, optionally sending one last message."""
         self._closed = True
-        if self._tick_task is not None:
-            self._tick_task.cancel()
+        metrics.forget("room", self.room_id)
+        await self._tree_writer.close()
+        if self.journal is not None:
+            await self.journal.close(self.tick_no)
         async with self._lock:
             conns = list(self.players.values())
             self.players.clear()
+            self._resume_tokens.clear()
+        frame = encode_message(final_message, self.encode_stats) if final_message is not None else None
         for conn in conns:
+            conn.outbox.close()
+            if conn.expire_task is not None:
+                conn.expire_task.cancel()
+            if conn.detached_ms:
+                continue
             try:
+                if frame is not None:
+                    await send_frame(conn.ws, frame)
                 await conn.ws.close()
             except Exception:
                 pass
 
     async def _hydrate_state(self) -> None:
         state = await self.redis.get_tree_state(self.room_id)
-        if state is None:
-            state = await self.mysql.get_room_state(self.room_id)
-        if not isinstance(state, dict):
-            return
-        decos = state.get("decorations")
+        decos = state.get("decorations") if isinstance(state, dict) else None
         if not isinstance(decos, list):
-            return
+            decos = await self.mysql.get_decorations(self.room_id)
+            if decos is None:
+                decos = await migrate_room(self.mysql, self.room_id)
         for d in decos:
             if not isinstance(d, dict):
                 continue
@@ -103,36 +276,265 @@ class Room:
                     placed_by=placed_by,
                     placed_ms=placed_ms,
                 )
+        self.tree_version += 1
+        self._persisted_tree_version = self.tree_version
 
-    async def add_player(self, ws: WebSocket, name: str, ip: str = "unknown") -> str:
+    async def add_player(self, ws: WebSocket, name: str, ip: str = "unknown", protocol: str = PROTOCOL_JSON) -> str:
         async with self._lock:
             if len(self.players) >= settings.max_players_per_room:
                 raise ValueError("room_full")
             player_id = uuid4().hex
+            handle = self._alloc_handle(player_id)
             runtime = PlayerRuntime(player_id=player_id, name=name, ip=ip)
-            conn = PlayerConn(ws=ws, runtime=runtime)
+            outbox = self._new_outbox(ws, player_id)
+            conn = PlayerConn(ws=ws, runtime=runtime, outbox=outbox, handle=handle, protocol=protocol)
             conn.rate_tokens = float(settings.input_rate_limit_hz)
             runtime.kin.x = float(clamp((len(self.players) - 2) * 1.2, settings.world_min_x, settings.world_max_x))
             runtime.kin.z = float(clamp(8.0, settings.world_min_z, settings.world_max_z))
             self.players[player_id] = conn
+            if self.journal is not None:
+                self.journal.join(self.tick_no, handle, player_id, name, protocol)
+            self._physics.add(runtime)
+            self._select_physics()
+            self.empty_since_ms = 0
+            self._wake = True
         await self.redis.upsert_player(self.room_id, player_id, name)
         return player_id
 
+    def start_sending(self, player_id: str) -> None:
+        """Start writing the player's outbox to its socket.
+
+        ``add_player`` and ``resume_player`` leave the outbox stopped so the
+        caller can queue ``welcome`` first: a bin1 client cannot decode a
+        snapshot before it, and ticks may queue one at any time.
+        """
+        conn = self.players.get(player_id)
+        if conn is not None:
+            conn.outbox.start()
+
     async def remove_player(self, player_id: str) -> None:
         async with self._lock:
-            self.players.pop(player_id, None)
+            conn = self.players.pop(player_id, None)
+            self._physics.remove(player_id)
+            self._select_physics()
+            if not self.players:
+                self.empty_since_ms = self.clock()
+            if conn is not None and self.journal is not None:
+                self.journal.leave(self.tick_no, conn.handle)
+        if conn is None:
+            return
+        self._free_handles.append(conn.handle)
+        self._resume_tokens.pop(conn.resume_token, None)
+        if conn.expire_task is not None and conn.expire_task is not asyncio.current_task():
+            conn.expire_task.cancel()
+        self._wake = True
+        conn.outbox.close()
         await self.redis.remove_player(self.room_id, player_id)
 
+    def issue_resume_token(self, player_id: str) -> str:
+        """Give the player a fresh resume token, invalidating the previous one."""
+        conn = self.players.get(player_id)
+        if conn is None or settings.session_resume_grace_ms <= 0:
+            return ""
+        self._resume_tokens.pop(conn.resume_token, None)
+        conn.resume_token = secrets.token_urlsafe(24)
+        self._resume_tokens[conn.resume_token] = player_id
+        return conn.resume_token
+
+    async def detach_player(self, player_id: str, ws: WebSocket) -> None:
+        """Handle ``ws`` going away.
+
+        The player stays in the room, standing still, for
+        ``session_resume_grace_ms`` so the client can come back with its
+        resume token; after that it is removed. Calls for a socket the player
+        has already moved off are ignored.
+        """
+        async with self._lock:
+            conn = self.players.get(player_id)
+            if conn is None or conn.ws is not ws or conn.detached_ms:
+                return
+            if conn.resume_token and settings.session_resume_grace_ms > 0 and not self._closed:
+                conn.outbox.close()
+                conn.detached_ms = self.clock()
+                self._halt(conn)
+                conn.expire_task = asyncio.create_task(self._expire_detached(player_id, conn))
+                self._wake = True
+                return
+        await self.remove_player(player_id)
+
+    def halt_player(self, player_id: str) -> None:
+        """Drop a player's queued inputs and stop it steering."""
+        conn = self.players.get(player_id)
+        if conn is not None:
+            self._halt(conn)
+
+    def _halt(self, conn: PlayerConn) -> None:
+        conn.inputs.clear()
+        self._physics.set_axis(conn.runtime, 0.0, 0.0)
+        if self.journal is not None:
+            self.journal.stop(self.tick_no, conn.handle)
+
+    async def _expire_detached(self, player_id: str, conn: PlayerConn) -> None:
+        await asyncio.sleep(settings.session_resume_grace_ms / 1000.0)
+        if self.players.get(player_id) is conn and conn.detached_ms:
+            await self.remove_player(player_id)
+
+    async def resume_player(self, token: str, ws: WebSocket, protocol: str = PROTOCOL_JSON) -> str | None:
+        """Move the player holding ``token`` onto ``ws`` and return its id, or None.
+
+        Identity, position, handle and the acked snapshot are kept, so the
+        next snapshot is a delta against what the client last acknowledged
+        (a keyframe if that baseline has left the history). A socket still
+        attached to the player is closed. As with ``add_player``, nothing is
+        written to ``ws`` until ``start_sending``.
+        """
+        async with self._lock:
+            player_id = self._resume_tokens.pop(token, None)
+            conn = self.players.get(player_id) if player_id is not None else None
+            if player_id is None or conn is None:
+                return None
+            old_ws = None if conn.detached_ms else conn.ws
+            conn.outbox.close()
+            if conn.expire_task is not None:
+                conn.expire_task.cancel()
+                conn.expire_task = None
+            conn.ws = ws
+            conn.outbox = self._new_outbox(ws, player_id)
+            conn.protocol = protocol
+            conn.resume_token = ""
+            conn.detached_ms = 0
+            conn.last_sent_snapshot_ms = 0
+            conn.ping_sent_ms = 0
+            conn.last_ping_ms = 0
+            conn.adapted_dropped = 0
+            self._wake = True
+        if old_ws is not None:
+            try:
+                await old_ws.close()
+            except Exception:
+                pass
+        return player_id
+
+    def _new_outbox(self, ws: WebSocket, player_id: str) -> Outbox:
+        return Outbox(
+            ws=ws,
+            max_messages=settings.outbox_max_messages,
+            overflow_grace_ms=settings.outbox_overflow_grace_ms,
+            on_closed=lambda: self._drop_player_soon(player_id, ws),
+        )
+
+    def _alloc_handle(self, player_id: str) -> int:
+        if self._next_handle <= 0xFFFF:
+            handle = self._next_handle
+            self._next_handle += 1
+        elif self._free_handles:
+            handle = self._free_handles.popleft()
+            self._handle_of.pop(self._handle_owner.get(handle, ""), None)
+        else:
+            raise ValueError("room_full")
+        self._handle_of[player_id] = handle
+        self._handle_owner[handle] = player_id
+        return handle
+
+    def player_handle(self, player_id: str) -> int:
+        return self._handle_of.get(player_id, 0)
+
+    @property
+    def latest_snapshot_seq(self) -> int:
+        latest = self._snapshots.latest
+        return 0 if latest is None else latest.seq
+
+    def wire_params(self) -> dict[str, float]:
+        return self._quantizer.as_dict()
+
+    def _select_physics(self) -> None:
+        name = _physics_engine_for(len(self.players))
+        if name != self._physics_name:
+            self._physics = make_physics(name, [c.runtime for c in self.players.values()])
+            self._physics_name = name
+
+    def _drop_player_soon(self, player_id: str, ws: WebSocket) -> None:
+        if player_id in self.players:
+            asyncio.create_task(self.detach_player(player_id, ws))
+
+    async def send_to(self, player_id: str, message: dict[str, Any]) -> None:
+        conn = self.players.get(player_id)
+        if conn is None:
+            return
+        frame = encode_message(message, self.encode_stats)
+        self.encode_stats.record_sent(frame.size, 1)
+        conn.outbox.push(frame)
+
+    def send_queue_stats(self) -> dict[str, int]:
+        conns = list(self.players.values())
+        return {
+            "connections": len(conns),
+            "queued_frames": sum(c.outbox.depth for c in conns),
+            "max_depth": max((c.outbox.depth for c in conns), default=0),
+            "dropped_snapshots": sum(c.outbox.dropped_snapshots for c in conns),
+        }
+
+    def dropped_inputs(self) -> int:
+        return sum(c.dropped_inputs for c in self.players.values())
+
+    def persist_stats(self) -> dict[str, Any]:
+        return {**self._tree_writer.stats.as_dict(), "pending": self._tree_writer.pending}
+
     async def set_name(self, player_id: str, name: str) -> None:
         async with self._lock:
             conn = self.players.get(player_id)
             if conn is None:
                 return
             conn.runtime.name = name
+            self._wake = True
         await self.redis.upsert_player(self.room_id, player_id, name)
 
-    async def get_chat_history(self) -> list[dict[str, Any]]:
-        return await self.redis.get_chat_history(self.room_id)
+    async def _load_chat_history(self) -> None:
+        messages = await self.redis.get_chat_history(self.room_id)
+        if not messages:
+            messages = await self.mysql.get_recent_chat(self.room_id, CHAT_HISTORY_SIZE)
+        self._chat.clear()
+        self._chat.extend(messages)
+        self._chat_frame = None
+
+    def get_chat_history(self) -> list[dict[str, Any]]:
+        return list(self._chat)
+
+    def send_chat_since(self, player_id: str, last_chat_id: Any) -> None:
+        """Queue the chat a resumed player missed after ``last_chat_id``.
+
+        Falls back to the whole history when the id is unknown, which means
+        it has already scrolled out of it.
+        """
+        conn = self.players.get(player_id)
+        if conn is None:
+            return
+        messages = list(self._chat)
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].get("id") == last_chat_id:
+                messages = messages[i + 1 :]
+                break
+        else:
+            self.send_chat_history(player_id)
+            return
+        if not messages:
+            return
+        frame = encode_message({"type": "chat.history", "payload": {"messages": messages}}, self.encode_stats)
+        self.encode_stats.record_sent(frame.size, 1)
+        conn.outbox.push(frame)
+
+    def send_chat_history(self, player_id: str) -> None:
+        """Queue the recent chat for a joining player; the frame is encoded once per change."""
+        conn = self.players.get(player_id)
+        if conn is None or not self._chat:
+            return
+        frame = self._chat_frame
+        if frame is None:
+            frame = self._chat_frame = encode_message(
+                {"type": "chat.history", "payload": {"messages": list(self._chat)}}, self.encode_stats
+            )
+        self.encode_stats.record_sent(frame.size, 1)
+        conn.outbox.push(frame)
 
     async def send_chat(self, player_id: str, payload: dict[str, Any]) -> None:
         text = payload.get("text")
@@ -143,7 +545,7 @@ class Room:
             return
         if len(text) > 120:
             text = text[:120]
-        now_ms = _now_ms()
+        now_ms = self.clock()
         async with self._lock:
             conn = self.players.get(player_id)
             if conn is None:
@@ -157,19 +559,32 @@ class Room:
                 "server_time_ms": now_ms,
             }
             player_ip = conn.runtime.ip
+            if self.journal is not None:
+                self.journal.chat(self.tick_no, conn.handle, text)
 
-        await self.redis.push_chat_message(self.room_id, msg)
+        self._chat.append(msg)
+        self._chat_frame = None
         await self._broadcast({"type": "chat.message", "payload": msg})
-        await self.mysql.insert_chat_message(
-            room_id=self.room_id,
-            player_id=msg["player_id"],
-            player_name=msg["name"],
-            player_ip=player_ip,
-            message=msg["text"],
-            created_ms=msg["server_time_ms"],
-        )
+        row = {
+            "room_id": self.room_id,
+            "player_id": msg["player_id"],
+            "player_name": msg["name"],
+            "player_ip": player_ip,
+            "message": msg["text"],
+            "created_ms": msg["server_time_ms"],
+        }
+        await self.redis.push_chat_message(self.room_id, msg)
+        if self.chat_log is not None:
+            self.chat_log.submit(**row)
+        else:
+            await self.mysql.insert_chat_message(**row)
 
     async def clear_chat(self) -> None:
+        if self.chat_log is not None:
+            # Queued rows must land before the delete or they would survive it.
+            await self.chat_log.flush()
+        self._chat.clear()
+        self._chat_frame = None
         await self.redis.delete_chat_history(self.room_id)
         await self.mysql.delete_chat_history(self.room_id)
         await self._broadcast({"type": "chat.cleared", "payload": {}})
@@ -183,6 +598,7 @@ class Room:
             if conn is None:
                 return
             conn.runtime.cosmetic.hat = hat
+            self._wake = True
 
     async def place_decoration(self, player_id: str, payload: dict[str, Any]) -> None:
         deco_type = payload.get("type")
@@ -198,7 +614,7 @@ class Room:
             return
         angle = float(angle % (math.pi * 2.0))
         height = float(clamp(height, 0.12, 1.28))
-        now_ms = _now_ms()
+        now_ms = self.clock()
 
         async with self._lock:
             conn = self.players.get(player_id)
@@ -220,17 +636,15 @@ class Room:
                 placed_ms=now_ms,
             )
             conn.runtime.placed_count += 1
+            self.tree_version += 1
+            if self.journal is not None:
+                self.journal.place(self.tick_no, conn.handle, deco_type, angle, height)
+            self._wake = True
+            self._unsaved_decorations.append(deco_id)
+            deco_dict = decoration_dict(self.decorations[deco_id])
 
-        deco_dict = {
-            "id": deco_id,
-            "type": deco_type,
-            "angle": angle,
-            "height": height,
-            "placed_by": conn.runtime.player_id,
-            "placed_ms": now_ms,
-        }
         await self._broadcast({"type": "tree.placed", "payload": deco_dict})
-        await self._persist_tree_state()
+        self._tree_writer.mark_dirty()
 
     async def submit_move_input(self, player_id: str, payload: dict[str, Any]) -> None:
         seq = int(payload.get("seq", 0))
@@ -238,22 +652,49 @@ class Room:
         az = float(payload.get("az", 0.0))
         client_time_ms = int(payload.get("client_time_ms", 0))
 
-        async with self._lock:
-            conn = self.players.get(player_id)
-            if conn is None:
-                return
-            if not self._rate_allow(conn):
-                conn.runtime.cheat_flags["rate_limited"] = True
-                return
-            if seq <= conn.runtime.last_input_seq:
-                return
-            conn.runtime.last_input_seq = seq
-            conn.runtime.last_input_client_time_ms = client_time_ms
-            ax2, az2 = _normalize_axis(ax, az)
-            conn.runtime.cheat_flags["last_axis"] = (ax2, az2)
+        # No lock: nothing below awaits, so the queue update cannot interleave
+        # with a tick. The tick replays the queued inputs when it drains _inbox.
+        conn = self.players.get(player_id)
+        if conn is None:
+            return
+        if not self._rate_allow(conn):
+            conn.runtime.cheat_flags["rate_limited"] = True
+            return
+        self._queue_input(conn, seq, ax, az, client_time_ms)
+
+    def queue_move_input(self, player_id: str, seq: int, ax: float, az: float, client_time_ms: int = 0) -> None:
+        """Queue an input without the rate limit, as the replay tool does."""
+        conn = self.players.get(player_id)
+        if conn is not None:
+            self._queue_input(conn, seq, ax, az, client_time_ms)
+
+    def _queue_input(self, conn: PlayerConn, seq: int, ax: float, az: float, client_time_ms: int) -> None:
+        if seq <= conn.input_seq:
+            return
+        conn.input_seq = seq
+        ax2, az2 = _normalize_axis(ax, az)
+        if not conn.inputs:
+            self._inbox.append(conn)
+        elif len(conn.inputs) == conn.inputs.maxlen:
+            conn.dropped_inputs += 1
+        conn.inputs.append((seq, ax2, az2, client_time_ms))
+        if ax2 or az2:
+            self._wake = True
+        if self.journal is not None:
+            self.journal.move(self.tick_no, conn.handle, seq, ax2, az2)
+
+    def ack_snapshot(self, player_id: str, seq: int) -> None:
+        conn = self.players.get(player_id)
+        if conn is None:
+            return
+        latest = self._snapshots.latest
+        if latest is None or seq > latest.seq:
+            return
+        if seq > conn.acked_snapshot_seq:
+            conn.acked_snapshot_seq = seq
 
     def _rate_allow(self, conn: PlayerConn) -> bool:
-        now = _now_ms()
+        now = self.clock()
         dt_ms = max(0, now - conn.rate_last_ms)
         conn.rate_last_ms = now
         refill_per_ms = settings.input_rate_limit_hz / 1000.0
@@ -263,140 +704,292 @@ class Room:
         conn.rate_tokens -= 1.0
         return True
 
-    async def _run_ticks(self) -> None:
-        tick_dt = 1.0 / max(1, settings.server_tick_hz)
-        snapshot_interval_ms = int(1000 / max(1, settings.snapshot_hz))
-        constraints = MoveConstraints(
-            max_speed=settings.player_max_speed,
-            max_accel=settings.player_max_accel,
-            min_x=settings.world_min_x,
-            max_x=settings.world_max_x,
-            min_z=settings.world_min_z,
-            max_z=settings.world_max_z,
-        )
-
-        last_tick = time.perf_counter()
-        while not self._closed:
-            now = time.perf_counter()
-            elapsed = now - last_tick
-            if elapsed < tick_dt:
-                await asyncio.sleep(tick_dt - elapsed)
-                continue
-            last_tick = now
-            try:
-                await self._tick(constraints, tick_dt, snapshot_interval_ms)
-            except Exception as e:
-                print(f"[ROOM ERROR] {self.room_id}: {e}")
-
-    async def _tick(self, constraints: MoveConstraints, dt: float, snapshot_interval_ms: int) -> None:
-        now_ms = _now_ms()
+    async def tick(self, dt: float) -> None:
+        if self._closed:
+            return
+        dt *= self.tick_divisor
+        if self.journal is not None:
+            self.journal.tick_dt(self.tick_no, dt)
+        await self._tick(self._constraints, dt)
+
+    def _step_with_inputs(self, dt: float, constraints: MoveConstraints) -> bool:
+        """Advance physics by ``dt``, giving each queued input its share of the step.
+
+        The step is split into as many equal sub-steps as the longest queue
+        holds (capped at ``input_max_substeps``). A player with fewer inputs
+        spreads them evenly over the sub-steps; with more, neighbouring inputs
+        are merged so that the newest one always runs last. ``last_input_seq``
+        ends at the newest input that was actually simulated.
+        """
+        inbox, self._inbox = self._inbox, []
+        queues: list[tuple[PlayerConn, list[tuple[int, float, float, int]]]] = []
+        for conn in inbox:
+            if conn.inputs and self.players.get(conn.runtime.player_id) is conn:
+                queues.append((conn, list(conn.inputs)))
+            conn.inputs.clear()
+        longest = max((len(q) for _, q in queues), default=1)
+        substeps = max(1, min(longest, settings.input_max_substeps))
+        sub_dt = dt / substeps
+
+        moving = False
+        for i in range(substeps):
+            for conn, queue in queues:
+                j = ((i + 1) * len(queue) - 1) // substeps
+                if i > 0 and j == (i * len(queue) - 1) // substeps:
+                    continue
+                seq, ax, az, client_time_ms = queue[j]
+                rt = conn.runtime
+                rt.last_input_seq = seq
+                rt.last_input_client_time_ms = client_time_ms
+                self._physics.set_axis(rt, ax, az)
+            moving = self._physics.step(sub_dt, constraints)
+        return moving
+
+    async def _tick(self, constraints: MoveConstraints, dt: float) -> None:
+        now_ms = self.clock()
+        t_start = time.perf_counter()
         async with self._lock:
             conns = list(self.players.values())
+            self._wake = False
+            self._moving = self._step_with_inputs(dt, constraints)
+            self.tick_no += 1
 
-            for conn in conns:
-                axis = conn.runtime.cheat_flags.get("last_axis", (0.0, 0.0))
-                ax, az = float(axis[0]), float(axis[1])
-                target_vx = ax * settings.player_max_speed
-                target_vz = az * settings.player_max_speed
-                dvx = clamp(target_vx - conn.runtime.kin.vx, -settings.player_max_accel * dt, settings.player_max_accel * dt)
-                dvz = clamp(target_vz - conn.runtime.kin.vz, -settings.player_max_accel * dt, settings.player_max_accel * dt)
-                conn.runtime.kin.vx += dvx
-                conn.runtime.kin.vz += dvz
-                conn.runtime.kin.x += conn.runtime.kin.vx * dt
-                conn.runtime.kin.z += conn.runtime.kin.vz * dt
-
-                x, z, vx, vz, flags = apply_move_constraints(
-                    conn.runtime.kin.x,
-                    conn.runtime.kin.z,
-                    conn.runtime.kin.vx,
-                    conn.runtime.kin.vz,
-                    constraints,
-                )
-                conn.runtime.kin.x = x
-                conn.runtime.kin.z = z
-                conn.runtime.kin.vx = vx
-                conn.runtime.kin.vz = vz
-                if flags:
-                    conn.runtime.cheat_flags.update(flags)
-
-            snapshot_targets = [c for c in conns if now_ms - c.last_sent_snapshot_ms >= snapshot_interval_ms]
+            attached = [c for c in conns if not c.detached_ms]
+            snapshot_targets = [c for c in attached if now_ms - c.last_sent_snapshot_ms >= 1000.0 / c.snapshot_hz]
             if not snapshot_targets:
+                self._send_pings(attached, now_ms)
+                if metrics.enabled:
+                    self._observe_phases(simulate=time.perf_counter() - t_start)
                 return
 
-            players_payload = [
-                {
-                    "id": c.runtime.player_id,
-                    "name": c.runtime.name,
-                    "x": c.runtime.kin.x,
-                    "y": c.runtime.kin.y,
-                    "z": c.runtime.kin.z,
-                    "vx": c.runtime.kin.vx,
-                    "vz": c.runtime.kin.vz,
-                    "yaw": c.runtime.kin.yaw,
-                    "cosmetic": {"hat": bool(c.runtime.cosmetic.hat)},
-                    "placed_count": int(c.runtime.placed_count),
-                }
-                for c in conns
-            ]
-            ack_map = {c.runtime.player_id: c.runtime.last_input_seq for c in conns}
-            tree_payload = {
-                "decorations": [
-                    {
-                        "id": d.deco_id,
-                        "type": d.deco_type,
-                        "angle": d.angle,
-                        "height": d.height,
-                        "placed_by": d.placed_by,
-                        "placed_ms": d.placed_ms,
-                    }
-                    for d in self.decorations.values()
-                ]
-            }
-            msg = {
-                "type": "state.snapshot",
-                "payload": {
-                    "server_time_ms": now_ms,
-                    "room_id": self.room_id,
-                    "phase": self.phase,
-                    "players": players_payload,
-                    "ack": ack_map,
-                    "tree": tree_payload,
-                },
+            frame = self._snapshots.capture(now_ms, (c.runtime for c in conns), self.decorations, self.tree_version)
+            for c in snapshot_targets:
+                # Advance by one interval rather than to now so that ticks
+                # that do not divide the interval still average out to the
+                # client's rate; never let the schedule fall more than one
+                # interval behind.
+                interval = 1000.0 / c.snapshot_hz
+                c.last_sent_snapshot_ms = int(max(c.last_sent_snapshot_ms + interval, now_ms - interval))
+        t_simulated = time.perf_counter()
+
+        # Payloads only read the captured frame, so they are built after the
+        # lock is released.
+        payloads = self._build_snapshot_payloads(frame, snapshot_targets)
+        t_built = time.perf_counter()
+        stats = self.encode_stats
+        stats.begin_tick()
+        for payload, group in payloads:
+            encoded: dict[str, Frame] = {}
+            for c in group:
+                frame_ = encoded.get(c.protocol)
+                if frame_ is None:
+                    frame_ = encoded[c.protocol] = self._encode_snapshot(payload, c.protocol)
+                c.outbox.push_snapshot(frame_)
+                stats.record_sent(frame_.size, 1)
+                self._adapt_snapshot_rate(c, now_ms)
+        stats.end_tick()
+        self._send_pings(attached, now_ms)
+        t_sent = time.perf_counter()
+        await self._mirror_snapshot(frame, now_ms)
+        if metrics.enabled:
+            encode_s = stats.last_tick_encode_ns / 1e9
+            self._observe_phases(
+                simulate=t_simulated - t_start,
+                build=t_built - t_simulated,
+                encode=encode_s,
+                broadcast=max(0.0, t_sent - t_built - encode_s),
+                redis=time.perf_counter() - t_sent,
+            )
+
+    def _adapt_snapshot_rate(self, conn: PlayerConn, now_ms: int) -> None:
+        """Move a client's snapshot rate between ``snapshot_min_hz`` and ``snapshot_hz``.
+
+        The ceiling drops below ``snapshot_hz`` in proportion once the smoothed
+        RTT passes ``snapshot_rtt_high_ms``. Within it the rate climbs by a
+        tenth of ``snapshot_hz`` per period, and halves when the outbox had to
+        replace an unsent snapshot or holds a backlog. The load governor's
+        ``snapshot_cap_hz`` caps the ceiling while it is shedding.
+        """
+        if now_ms - conn.adapted_ms < settings.snapshot_adapt_ms:
+            return
+        conn.adapted_ms = now_ms
+        top = float(max(1, settings.snapshot_hz))
+        floor = float(min(top, max(1, settings.snapshot_min_hz)))
+        ceiling = top
+        if conn.rtt_ms > settings.snapshot_rtt_high_ms > 0:
+            ceiling = max(floor, top * settings.snapshot_rtt_high_ms / conn.rtt_ms)
+        if self.snapshot_cap_hz > 0:
+            ceiling = min(ceiling, self.snapshot_cap_hz)
+            floor = min(floor, ceiling)
+        dropped = conn.outbox.dropped_snapshots - conn.adapted_dropped
+        conn.adapted_dropped = conn.outbox.dropped_snapshots
+        if dropped > 0 or conn.outbox.depth > conn.outbox.max_messages // 4:
+            hz = conn.snapshot_hz * 0.5
+        else:
+            hz = conn.snapshot_hz + top / 10.0
+        conn.snapshot_hz = min(ceiling, max(floor, hz))
+
+    def _send_pings(self, conns: list[PlayerConn], now_ms: int) -> None:
+        """Queue a ``ping`` for every connection whose last one is ``ping_interval_ms`` old."""
+        interval = settings.ping_interval_ms
+        if interval <= 0:
+            return
+        for c in conns:
+            if now_ms - c.last_ping_ms < interval:
+                continue
+            c.last_ping_ms = now_ms
+            c.ping_id += 1
+            c.ping_sent_ms = now_ms
+            payload = {
+                "id": c.ping_id,
+                "server_time_ms": now_ms,
+                "rtt_ms": round(c.rtt_ms, 1),
+                "snapshot_hz": round(c.snapshot_hz, 1),
             }
+            c.outbox.push(encode_message({"type": "ping", "payload": payload}, self.encode_stats))
 
-            for c in snapshot_targets:
-                c.last_sent_snapshot_ms = now_ms
+    def record_pong(self, player_id: str, payload: dict[str, Any]) -> None:
+        """Fold a ``pong`` into the connection's RTT and clock offset estimates.
 
-        await self.redis.update_room_snapshot(self.room_id, msg["payload"])
-        await self._broadcast(msg)
+        Only the reply to the latest ping counts, and the send time comes from
+        our own record, so a client cannot fake a low RTT. Smoothing follows
+        TCP's SRTT/RTTVAR (RFC 6298).
+        """
+        conn = self.players.get(player_id)
+        if conn is None or conn.ping_sent_ms == 0 or payload.get("id") != conn.ping_id:
+            return
+        now_ms = self.clock()
+        rtt = float(max(0, now_ms - conn.ping_sent_ms))
+        client_ms = payload.get("client_time_ms")
+        offset = None
+        if isinstance(client_ms, (int, float)):
+            offset = float(client_ms) - (conn.ping_sent_ms + rtt / 2.0)
+        conn.ping_sent_ms = 0
+        if conn.rtt_ms == 0.0:
+            conn.rtt_ms = rtt
+            conn.rtt_var_ms = rtt / 2.0
+            if offset is not None:
+                conn.clock_offset_ms = offset
+        else:
+            conn.rtt_var_ms = 0.75 * conn.rtt_var_ms + 0.25 * abs(conn.rtt_ms - rtt)
+            conn.rtt_ms = 0.875 * conn.rtt_ms + 0.125 * rtt
+            if offset is not None:
+                conn.clock_offset_ms = 0.875 * conn.clock_offset_ms + 0.125 * offset
+        if metrics.enabled:
+            metrics.observe("client_rtt_seconds", rtt / 1000.0, help="Ping/pong round trip per sample.")
+
+    def _observe_phases(self, **phases: float) -> None:
+        for phase, seconds in phases.items():
+            metrics.observe(
+                "room_tick_phase_seconds",
+                seconds,
+                (("room", self.room_id), ("phase", phase)),
+                help="Time spent in each phase of a room tick.",
+            )
+
+    async def _mirror_snapshot(self, frame: SnapshotFrame, now_ms: int) -> None:
+        """Copy the room state to Redis at ``snapshot_mirror_hz``, only when it changed."""
+        if settings.snapshot_mirror_hz <= 0:
+            return
+        if now_ms - self._mirrored_ms < 1000 // settings.snapshot_mirror_hz:
+            return
+        self._mirrored_ms = now_ms
+        last = self._mirrored
+        if (
+            last is not None
+            and last.tree_version == frame.tree_version
+            and self._mirrored_phase == self.phase
+            and last.players == frame.players
+        ):
+            self.mirror_skips += 1
+            return
+        self._mirrored = frame
+        self._mirrored_phase = self.phase
+        self.mirror_writes += 1
+        await self.redis.update_room_snapshot(
+            self.room_id, build_keyframe_payload(frame, self.room_id, self.phase, self.decorations)
+        )
+
+    def _encode_snapshot(self, payload: dict[str, Any], protocol: str) -> Frame:
+        if protocol != PROTOCOL_BIN1:
+            return encode_message({"type": "state.snapshot", "payload": payload}, self.encode_stats)
+        return encode_binary(encode_snapshot, payload, self._handle_of, self._quantizer, stats=self.encode_stats)
+
+    def _build_snapshot_payloads(
+        self, frame: SnapshotFrame, conns: list[PlayerConn]
+    ) -> list[tuple[dict[str, Any], list[PlayerConn]]]:
+        """Group connections that can share one snapshot payload and build it once per group.
+
+        Without interest management the group key is the acked baseline. Once
+        the room reaches ``interest_min_players`` each viewer only gets the
+        players around its own grid cell, at most ``interest_max_visible`` of
+        them, so the key also includes the cell the viewer is in now and the
+        one it was in at the baseline.
+        """
+        grid = self._grid
+        interest = len(frame.players) >= settings.interest_min_players
+        if interest:
+            frame.interest = True
+            frame.cells = grid.index(frame.players)
+        far_due = interest and frame.seq % max(1, settings.interest_far_every) == 0
+
+        groups: dict[tuple[int, int, int], list[PlayerConn]] = {}
+        bases: dict[tuple[int, int, int], SnapshotFrame | None] = {}
+        for c in conns:
+            pid = c.runtime.player_id
+            base = self._snapshots.baseline_for(c.acked_snapshot_seq)
+            cell = grid.cell_of_state(frame.players[pid]) if interest else -1
+            base_cell = -1
+            if base is not None and base.interest and pid in base.players:
+                base_cell = grid.cell_of_state(base.players[pid])
+            key = (0 if base is None else base.seq, cell, base_cell)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = group = []
+                bases[key] = base
+            group.append(c)
+
+        out: list[tuple[dict[str, Any], list[PlayerConn]]] = []
+        for key, group in groups.items():
+            _, cell, base_cell = key
+            base = bases[key]
+            visible = grid.visible(frame.cells, cell, frame.players) if frame.cells is not None and cell >= 0 else None
+            if base is None:
+                payload = build_keyframe_payload(frame, self.room_id, self.phase, self.decorations, visible)
+            else:
+                base_visible = None
+                if base.interest and base.cells is not None:
+                    base_visible = grid.visible(base.cells, base_cell, base.players) if base_cell >= 0 else set()
+                payload = build_delta_payload(
+                    frame, base, self.room_id, self.phase, self.decorations, visible, base_visible
+                )
+            if visible is not None:
+                payload["interest"] = True
+                if far_due or base is None:
+                    payload["far"] = far_summary(frame, visible)
+            out.append((payload, group))
+        return out
 
     async def _persist_tree_state(self) -> None:
+        """Append decorations placed since the last write, then refresh the cached tree."""
+        version = self.tree_version
+        batch, self._unsaved_decorations = self._unsaved_decorations, []
+        if batch:
+            try:
+                await self.mysql.append_decorations(self.room_id, [decoration_dict(self.decorations[d]) for d in batch])
+            except Exception:
+                self._unsaved_decorations[:0] = batch
+                raise
         payload = {
             "room_id": self.room_id,
-            "decorations": [
-                {
-                    "id": d.deco_id,
-                    "type": d.deco_type,
-                    "angle": d.angle,
-                    "height": d.height,
-                    "placed_by": d.placed_by,
-                    "placed_ms": d.placed_ms,
-                }
-                for d in self.decorations.values()
-            ],
+            "decorations": [decoration_dict(d) for d in self.decorations.values()],
         }
         await self.redis.set_tree_state(self.room_id, payload)
-        await self.mysql.upsert_room_state(self.room_id, payload)
+        self._persisted_tree_version = version
 
     async def _broadcast(self, message: dict[str, Any]) -> None:
-        async with self._lock:
-            conns = list(self.players.values())
-        dead: list[str] = []
+        conns = list(self.players.values())
+        frame = encode_message(message, self.encode_stats)
         for conn in conns:
-            try:
-                await conn.ws.send_json(message)
-            except Exception:
-                dead.append(conn.runtime.player_id)
-        for pid in dead:
-            await self.remove_player(pid)
-
+            conn.outbox.push(frame)
+        self.encode_stats.record_sent(frame.size, len(conns))
@@ -1,26 +1,263 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from dataclasses import dataclass, field
 
+from app.config import settings
+from app.game.governor import LoadGovernor
+from app.game.journal import RoomJournal
 from app.game.room import Room
-from app.storage.mysql_repo import MySqlRepo
-from app.storage.redis_store import RedisStore
+from app.game.scheduler import TickScheduler
+from app.game.sharding import ShardRouter, WrongShard
+from app.metrics import Labels
+from app.storage.base import CacheStore, Repo
+from app.storage.chat_log import ChatLogWriter
 
 
 @dataclass(slots=True)
 class RoomManager:
-    redis: RedisStore
-    mysql: MySqlRepo
+    redis: CacheStore
+    mysql: Repo
+    chat_log: ChatLogWriter | None = None
+    router: ShardRouter | None = None
+    scheduler: TickScheduler = field(
+        default_factory=lambda: TickScheduler(
+            tick_hz=settings.server_tick_hz,
+            phases=settings.tick_phases,
+            max_catch_up=settings.tick_max_catch_up,
+        )
+    )
+    governor: LoadGovernor = field(default_factory=LoadGovernor.from_settings)
+    evicted_rooms: int = 0
+    handed_off_rooms: int = 0
     _rooms: dict[str, Room] = field(default_factory=dict)
     _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    _claiming: dict[str, asyncio.Future[None]] = field(default_factory=dict)
+    _retiring: dict[str, asyncio.Future[None]] = field(default_factory=dict)
+    _reaper_task: asyncio.Task[None] | None = None
+    _shard_task: asyncio.Task[None] | None = None
 
-    async def get_or_create(self, room_id: str) -> Room:
+    def start(self) -> None:
+        if self.redis.batch_writes and self.redis.flush_pending not in self.scheduler.on_step:
+            self.scheduler.on_step.append(self.redis.flush_pending)
+        if self.governor.enabled and self._govern not in self.scheduler.on_step:
+            self.scheduler.on_step.append(self._govern)
+        self.scheduler.start()
+        if self._reaper_task is None:
+            self._reaper_task = asyncio.create_task(self._run_reaper())
+        if self.router is not None and self._shard_task is None:
+            self._shard_task = asyncio.create_task(self._run_shard())
+
+    async def close(self) -> None:
+        for task in (self._reaper_task, self._shard_task):
+            if task is not None:
+                task.cancel()
+        self._reaper_task = None
+        self._shard_task = None
+        await self.scheduler.close()
         async with self._lock:
-            room = self._rooms.get(room_id)
-            if room is None:
-                room = Room(room_id=room_id, redis=self.redis, mysql=self.mysql)
-                self._rooms[room_id] = room
+            rooms = list(self._rooms.values())
+            self._rooms.clear()
+        for room in rooms:
+            await room.flush()
+            await room.close()
+            await self._release(room.room_id)
+        if self.router is not None:
+            await self.router.leave()
+
+    @property
+    def room_count(self) -> int:
+        return len(self._rooms)
+
+    def metric_gauges(self) -> list[tuple[str, str, Labels, float]]:
+        """Point-in-time values for ``/metrics``, read when it is scraped."""
+        sched = self.scheduler
+        gauges: list[tuple[str, str, Labels, float]] = [
+            ("rooms", "Rooms served by this worker.", (), len(self._rooms)),
+            ("rooms_evicted", "Idle rooms evicted since start.", (), self.evicted_rooms),
+            ("rooms_handed_off", "Rooms handed to another worker since start.", (), self.handed_off_rooms),
+            ("scheduler_steps", "Fixed steps run by the tick scheduler.", (), sched.steps),
+            ("scheduler_catch_up_steps", "Steps run late to catch up.", (), sched.catch_up_steps),
+            ("scheduler_dropped_steps", "Steps skipped because the loop fell too far behind.", (), sched.dropped_steps),
+            ("scheduler_max_lag_seconds", "Furthest the scheduler has run behind a step deadline.", (), sched.max_lag_ms / 1000.0),
+            ("governor_level", "Load shedding level: 0 none, 1 snapshot rate, 2 tick rate, 3 refusing.", (), self.governor.level),
+            ("governor_load", "Smoothed share of each tick step spent ticking rooms.", (), self.governor.load),
+            ("governor_refused", "Rooms and joins refused while overloaded.", (), self.governor.refused),
+        ]
+        for room in self._rooms.values():
+            labels = (("room", room.room_id),)
+            queues = room.send_queue_stats()
+            gauges.append(("room_players", "Players connected to a room.", labels, queues["connections"]))
+            gauges.append(("room_queued_frames", "Frames waiting in a room's outboxes.", labels, queues["queued_frames"]))
+            gauges.append(("room_dropped_snapshots", "Snapshots replaced before they were sent.", labels, queues["dropped_snapshots"]))
+            gauges.append(("room_tick_overruns", "Ticks that took longer than one step.", labels, room.tick_stats.overruns))
+            gauges.append(("room_dropped_inputs", "Move inputs dropped because a player's queue was full.", labels, room.dropped_inputs()))
+            encode = room.encode_stats.as_dict()
+            gauges.append(("room_encoded_messages", "Frames encoded by a room.", labels, encode["messages"]))
+            gauges.append(("room_sent_bytes", "Bytes queued to a room's sockets.", labels, encode["bytes_sent"]))
+            gauges.append(("room_last_tick_sent_bytes", "Bytes queued to a room's sockets by its last snapshot tick.", labels, encode["last_tick_bytes_sent"]))
+            gauges.append(("room_encode_seconds", "Time a room spent encoding frames.", labels, encode["encode_ms"] / 1000.0))
+            gauges.append(("room_snapshot_mirror_writes", "Room snapshots written to the cache.", labels, room.mirror_writes))
+            gauges.append(("room_snapshot_mirror_skips", "Room snapshot mirrors skipped because nothing changed.", labels, room.mirror_skips))
+            persist = room.persist_stats()
+            gauges.append(("room_tree_flushes", "Tree state writes made by a room.", labels, persist["flushes"]))
+            gauges.append(("room_tree_flush_failures", "Tree state writes that failed and were retried.", labels, persist["failures"]))
+            gauges.append(("room_tree_coalesced", "Tree changes folded into a later write.", labels, persist["coalesced"]))
+            gauges.append(("room_tree_pending", "Tree changes waiting to be written.", labels, persist["pending"]))
+            gauges.append(("room_tree_flush_last_seconds", "Duration of a room's last tree state write.", labels, persist["last_flush_ms"] / 1000.0))
+            gauges.append(("room_tree_flush_max_seconds", "Longest tree state write of a room.", labels, persist["max_flush_ms"] / 1000.0))
+            gauges.append(("room_tree_flush_avg_seconds", "Mean tree state write duration of a room.", labels, persist["avg_flush_ms"] / 1000.0))
+        return gauges
+
+    async def _govern(self) -> None:
+        sched = self.scheduler
+        self.governor.update(sched.step_s, sched.last_busy_s, sched.last_behind_s, self._rooms.values())
+
+    async def _run_reaper(self) -> None:
+        grace_ms = max(0, settings.room_evict_after_s) * 1000
+        interval = min(5.0, max(0.5, grace_ms / 4000.0))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict_idle(grace_ms)
+            except Exception as e:
+                print(f"[ROOM EVICT ERROR] {e}")
+
+    async def evict_idle(self, grace_ms: int) -> int:
+        """Flush and drop rooms that have been empty for longer than ``grace_ms``."""
+        now_ms = int(time.time() * 1000)
+        async with self._lock:
+            idle = [r for r in self._rooms.values() if r.idle_for_ms(now_ms) > grace_ms]
+            for room in idle:
+                self._unregister(room)
+        for room in idle:
+            try:
+                await room.flush()
+                await room.close()
+                await self._release(room.room_id)
+            finally:
+                self._retired(room.room_id)
+        self.evicted_rooms += len(idle)
+        return len(idle)
+
+    def _unregister(self, room: Room) -> None:
+        """Take ``room`` off the map; until ``_retired`` a new room with its id
+        waits, so it cannot hydrate from state the old one is still writing."""
+        del self._rooms[room.room_id]
+        self.scheduler.remove(room.room_id)
+        self._retiring[room.room_id] = asyncio.get_running_loop().create_future()
+
+    def _retired(self, room_id: str) -> None:
+        done = self._retiring.pop(room_id, None)
+        if done is not None:
+            done.set_result(None)
+
+    async def _claim(self, room_id: str) -> None:
+        router = self.router
+        if router is None:
+            return
+        if not router.live:
+            await router.heartbeat()
+        target = await router.resolve(room_id)
+        if target is None and await router.claim(room_id):
+            return
+        if target is None:
+            target = await router.leases.owner(router.room_key(room_id)) or router.home_of(room_id)
+        raise WrongShard(room_id, router.url_of(target))
+
+    async def _release(self, room_id: str) -> None:
+        if self.router is None:
+            return
+        try:
+            await self.router.release(room_id)
+        except Exception as e:
+            print(f"[SHARD ERROR] release {room_id}: {e}")
+
+    async def _run_shard(self) -> None:
+        interval = self.router.lease_ttl_ms / 3000.0
+        while True:
+            try:
+                await self.rebalance()
+            except Exception as e:
+                print(f"[SHARD ERROR] {e}")
+            await asyncio.sleep(interval)
+
+    async def rebalance(self) -> int:
+        """Renew leases and hand off rooms whose home moved to another worker."""
+        router = self.router
+        if router is None:
+            return 0
+        await router.heartbeat()
+        leaving: list[tuple[Room, str]] = []
+        for room in list(self._rooms.values()):
+            home = router.home_of(room.room_id)
+            if home != router.worker_id or not await router.renew(room.room_id):
+                leaving.append((room, home))
+        moved: list[tuple[Room, str]] = []
+        async with self._lock:
+            for room, home in leaving:
+                if self._rooms.get(room.room_id) is room:
+                    self._unregister(room)
+                    moved.append((room, home))
+        for room, home in moved:
+            try:
+                await self.hand_off(room, router.url_of(home))
+            finally:
+                self._retired(room.room_id)
+        return len(moved)
+
+    async def hand_off(self, room: Room, url: str) -> None:
+        """Persist the room, point its players at ``url`` and give up the lease.
+
+        The next worker rebuilds the room from the persisted tree state when
+        the first redirected player arrives.
+        """
+        await room.flush()
+        await room.close({"type": "event.redirect", "payload": {"room_id": room.room_id, "url": url}})
+        await self._release(room.room_id)
+        self.handed_off_rooms += 1
+
+    async def get_or_create(self, room_id: str) -> Room:
+        """Local room for ``room_id``; raises WrongShard when another worker
+        serves it and Overloaded when a new room would have to be created
+        while the governor is refusing.
+
+        The lease claim is a Redis round trip, so it runs outside ``_lock``;
+        other joiners of the same room wait for it, or for an evicted room of
+        the same id to finish flushing, and then look again.
+        """
+        while True:
+            async with self._lock:
+                room = self._rooms.get(room_id)
+                if room is not None:
+                    room.touch()
+                    break
+                waiting = self._claiming.get(room_id) or self._retiring.get(room_id)
+                if waiting is None:
+                    self.governor.admit()
+                    pending = self._claiming[room_id] = asyncio.get_running_loop().create_future()
+            if waiting is not None:
+                await asyncio.shield(waiting)
+                continue
+            try:
+                await self._claim(room_id)
+                journal = None
+                if settings.journal_dir:
+                    journal = RoomJournal.create(
+                        settings.journal_dir, room_id, int(time.time() * 1000), flush_ms=settings.journal_flush_ms
+                    )
+                room = Room(
+                    room_id=room_id, redis=self.redis, mysql=self.mysql, chat_log=self.chat_log, journal=journal
+                )
+                if self.governor.level:
+                    self.governor.apply([room])
+                async with self._lock:
+                    self._rooms[room_id] = room
+            finally:
+                del self._claiming[room_id]
+                pending.set_result(None)
+            break
         await room.start()
+        self.scheduler.add(room)
         return room
-
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+from app.metrics import metrics
+
+if TYPE_CHECKING:
+    from app.game.room import Room
+
+
+@dataclass(slots=True)
+class RoomTickStats:
+    ticks: int = 0
+    overruns: int = 0
+    last_ms: float = 0.0
+    max_ms: float = 0.0
+    total_ms: float = 0.0
+    # Moving average over roughly the last five ticks.
+    recent_ms: float = 0.0
+
+    def record(self, duration_ms: float, budget_ms: float) -> None:
+        self.ticks += 1
+        self.last_ms = duration_ms
+        self.total_ms += duration_ms
+        self.recent_ms += 0.2 * (duration_ms - self.recent_ms)
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+        if duration_ms > budget_ms:
+            self.overruns += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "last_ms": self.last_ms,
+            "max_ms": self.max_ms,
+            "avg_ms": self.total_ms / self.ticks if self.ticks else 0.0,
+        }
+
+
+@dataclass(slots=True)
+class TickScheduler:
+    """Drives every room from one fixed-step clock.
+
+    Step deadlines are computed as ``origin + n * step`` so sleeping never
+    accumulates drift. When the loop falls behind, missed steps are run back
+    to back with the same fixed ``dt`` (up to ``max_catch_up`` of them) instead
+    of being folded into one longer step. Rooms are spread over ``phases``
+    evenly spaced slots inside each step so their work does not all land on
+    the same instant. Each room's ``tick_every()`` lets idle rooms run on
+    every Nth step only, and parked rooms (0) are skipped entirely.
+    Callbacks in ``on_step`` run after every room of a step has ticked;
+    ``last_busy_s`` (CPU time spent while the step's rooms ticked) and
+    ``last_behind_s`` describe the step that just ran.
+    """
+
+    tick_hz: int = 20
+    phases: int = 4
+    max_catch_up: int = 5
+    steps: int = 0
+    catch_up_steps: int = 0
+    dropped_steps: int = 0
+    max_lag_ms: float = 0.0
+    last_busy_s: float = 0.0
+    last_behind_s: float = 0.0
+    on_step: list[Callable[[], Awaitable[None]]] = field(default_factory=list)
+    _slots: list[dict[str, Room]] = field(default_factory=list)
+    _slot_of: dict[str, int] = field(default_factory=dict)
+    _task: asyncio.Task[None] | None = None
+    _closed: bool = False
+
+    @property
+    def step_s(self) -> float:
+        return 1.0 / max(1, self.tick_hz)
+
+    @property
+    def room_count(self) -> int:
+        return len(self._slot_of)
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._closed = False
+        if not self._slots:
+            self._slots = [{} for _ in range(max(1, self.phases))]
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def add(self, room: Room) -> None:
+        self.start()
+        if room.room_id in self._slot_of:
+            return
+        slot = min(range(len(self._slots)), key=lambda i: len(self._slots[i]))
+        self._slots[slot][room.room_id] = room
+        self._slot_of[room.room_id] = slot
+
+    def remove(self, room_id: str) -> None:
+        slot = self._slot_of.pop(room_id, None)
+        if slot is not None:
+            self._slots[slot].pop(room_id, None)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        step = self.step_s
+        phase_offset = step / len(self._slots)
+        next_step = loop.time()
+        while not self._closed:
+            behind = loop.time() - next_step
+            if behind > step * self.max_catch_up:
+                missed = int(behind / step)
+                self.dropped_steps += missed
+                next_step += missed * step
+            elif behind > step:
+                self.catch_up_steps += 1
+            self.max_lag_ms = max(self.max_lag_ms, max(0.0, behind) * 1000.0)
+            self.last_behind_s = max(0.0, behind)
+            busy = 0.0
+
+            for i, rooms in enumerate(self._slots):
+                deadline = next_step + i * phase_offset
+                delay = deadline - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    if metrics.enabled:
+                        # How late the loop woke us is the event-loop lag.
+                        metrics.observe(
+                            "event_loop_lag_seconds",
+                            max(0.0, loop.time() - deadline),
+                            help="Delay between a tick slot's deadline and the loop waking it.",
+                        )
+                due = [r for r in rooms.values() if self._is_due(r)]
+                if due:
+                    # CPU time, not wall time: a tick awaiting a slow cache
+                    # or database is not load the governor can shed.
+                    t0 = time.thread_time()
+                    await asyncio.gather(*(self._tick_room(r, step) for r in due))
+                    busy += time.thread_time() - t0
+            self.last_busy_s = busy
+            for callback in self.on_step:
+                try:
+                    await callback()
+                except Exception as e:
+                    print(f"[TICK HOOK ERROR] {e}")
+            self.steps += 1
+            next_step += step
+
+    def _is_due(self, room: Room) -> bool:
+        every = room.tick_every()
+        return every > 0 and self.steps % every == 0
+
+    async def _tick_room(self, room: Room, dt: float) -> None:
+        t0 = time.perf_counter()
+        try:
+            await room.tick(dt)
+        except Exception as e:
+            print(f"[ROOM ERROR] {room.room_id}: {e}")
+        room.tick_stats.record((time.perf_counter() - t0) * 1000.0, dt * 1000.0)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+from dataclasses import dataclass, field
+
+from app.config import settings
+from app.storage.leases import LeaseStore
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class WrongShard(Exception):
+    """The room is served by another worker; the client should reconnect to ``url``."""
+
+    def __init__(self, room_id: str, url: str) -> None:
+        super().__init__(f"room {room_id} is served at {url}")
+        self.room_id = room_id
+        self.url = url
+
+
+@dataclass(slots=True)
+class HashRing:
+    """Consistent hash ring with ``vnodes`` points per worker."""
+
+    vnodes: int = 64
+    _points: list[int] = field(default_factory=list)
+    _owners: list[str] = field(default_factory=list)
+
+    @staticmethod
+    def of(workers: list[str], vnodes: int = 64) -> "HashRing":
+        ring = HashRing(vnodes=vnodes)
+        points = sorted((_hash(f"{w}#{i}"), w) for w in workers for i in range(vnodes))
+        ring._points = [p for p, _ in points]
+        ring._owners = [w for _, w in points]
+        return ring
+
+    def owner(self, key: str) -> str | None:
+        if not self._points:
+            return None
+        i = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[i]
+
+
+def worker_urls() -> dict[str, str]:
+    """Public WebSocket URL of every configured worker, keyed by worker id."""
+    count = max(1, settings.shard_count)
+    urls = list(settings.shard_urls)
+    return {
+        str(i): urls[i]
+        if i < len(urls)
+        else f"ws://{settings.shard_host}:{settings.shard_base_port + i}{settings.ws_path}"
+        for i in range(count)
+    }
+
+
+@dataclass(slots=True)
+class ShardRouter:
+    """Decides which worker serves a room.
+
+    Each live worker holds a ``shard:worker:<id>`` lease and each served room a
+    ``shard:room:<room_id>`` lease. A room's home is its owner on the hash
+    ring of live workers, but an existing room lease always wins, so a room
+    stays where it is until its holder hands it off.
+    """
+
+    worker_id: str
+    workers: dict[str, str]
+    leases: LeaseStore
+    lease_ttl_ms: int = 15000
+    live: tuple[str, ...] = ()
+    _ring: HashRing = field(default_factory=HashRing)
+
+    @staticmethod
+    def from_settings(leases: LeaseStore) -> "ShardRouter":
+        return ShardRouter(
+            worker_id=str(settings.shard_index),
+            workers=worker_urls(),
+            leases=leases,
+            lease_ttl_ms=max(1000, settings.shard_lease_ttl_ms),
+        )
+
+    @staticmethod
+    def room_key(room_id: str) -> str:
+        return f"shard:room:{room_id}"
+
+    @staticmethod
+    def worker_key(worker_id: str) -> str:
+        return f"shard:worker:{worker_id}"
+
+    def url_of(self, worker_id: str) -> str:
+        return self.workers.get(worker_id, "")
+
+    def home_of(self, room_id: str) -> str:
+        return self._ring.owner(room_id) or self.worker_id
+
+    async def heartbeat(self) -> bool:
+        """Renew this worker's lease and refresh the ring; True if membership changed."""
+        await self.leases.acquire(self.worker_key(self.worker_id), self.worker_id, self.lease_ttl_ms)
+        live = [w for w in self.workers if w == self.worker_id or await self.leases.owner(self.worker_key(w)) == w]
+        if tuple(live) == self.live:
+            return False
+        self.live = tuple(live)
+        self._ring = HashRing.of(live)
+        return True
+
+    async def resolve(self, room_id: str) -> str | None:
+        """Worker that should serve ``room_id``, or None when it is this one."""
+        holder = await self.leases.owner(self.room_key(room_id))
+        if holder is not None:
+            return None if holder == self.worker_id else holder
+        home = self.home_of(room_id)
+        return None if home == self.worker_id else home
+
+    async def claim(self, room_id: str) -> bool:
+        return await self.leases.acquire(self.room_key(room_id), self.worker_id, self.lease_ttl_ms)
+
+    async def renew(self, room_id: str) -> bool:
+        return await self.leases.renew(self.room_key(room_id), self.worker_id, self.lease_ttl_ms)
+
+    async def release(self, room_id: str) -> None:
+        await self.leases.release(self.room_key(room_id), self.worker_id)
+
+    async def leave(self) -> None:
+        await self.leases.release(self.worker_key(self.worker_id), self.worker_id)
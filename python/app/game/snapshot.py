@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Collection, Iterable
+
+from app.game.types import Decoration, PlayerRuntime
+
+
+# Order of the fields captured per player in a SnapshotFrame.
+PLAYER_FIELDS: tuple[str, ...] = ("name", "x", "y", "z", "vx", "vz", "yaw", "hat", "placed_count")
+
+# Fields that are always sent together in a delta entry (position, velocity, ...).
+_DELTA_GROUPS: tuple[tuple[int, ...], ...] = ((0,), (1, 2, 3), (4, 5), (6,), (7,), (8,))
+
+
+def player_state(runtime: PlayerRuntime) -> tuple[Any, ...]:
+    kin = runtime.kin
+    return (
+        runtime.name,
+        kin.x,
+        kin.y,
+        kin.z,
+        kin.vx,
+        kin.vz,
+        kin.yaw,
+        bool(runtime.cosmetic.hat),
+        int(runtime.placed_count),
+    )
+
+
+def decoration_dict(d: Decoration) -> dict[str, Any]:
+    return {
+        "id": d.deco_id,
+        "type": d.deco_type,
+        "angle": d.angle,
+        "height": d.height,
+        "placed_by": d.placed_by,
+        "placed_ms": d.placed_ms,
+    }
+
+
+def _player_entry(player_id: str, state: tuple[Any, ...]) -> dict[str, Any]:
+    name, x, y, z, vx, vz, yaw, hat, placed_count = state
+    return {
+        "id": player_id,
+        "name": name,
+        "x": x,
+        "y": y,
+        "z": z,
+        "vx": vx,
+        "vz": vz,
+        "yaw": yaw,
+        "cosmetic": {"hat": hat},
+        "placed_count": placed_count,
+    }
+
+
+def _player_delta_entry(player_id: str, state: tuple[Any, ...], base: tuple[Any, ...]) -> dict[str, Any] | None:
+    if state == base:
+        return None
+    entry: dict[str, Any] | None = None
+    for group in _DELTA_GROUPS:
+        if all(state[i] == base[i] for i in group):
+            continue
+        if entry is None:
+            entry = {"id": player_id}
+        for i in group:
+            key = PLAYER_FIELDS[i]
+            if key == "hat":
+                entry["cosmetic"] = {"hat": state[i]}
+            else:
+                entry[key] = state[i]
+    return entry
+
+
+@dataclass(slots=True)
+class SnapshotFrame:
+    seq: int
+    server_time_ms: int
+    players: dict[str, tuple[Any, ...]]
+    acks: dict[str, int]
+    tree_version: int
+    deco_ids: frozenset[str]
+    # Set when the frame was sent with area-of-interest filtering.
+    interest: bool = False
+    cells: dict[int, list[str]] | None = None
+
+
+@dataclass(slots=True)
+class SnapshotHistory:
+    """Ring of recently sent frames that deltas can be computed against."""
+
+    size: int = 32
+    _frames: deque[SnapshotFrame] = field(default_factory=deque)
+    _by_seq: dict[int, SnapshotFrame] = field(default_factory=dict)
+    _seq: int = 0
+
+    @property
+    def latest(self) -> SnapshotFrame | None:
+        return self._frames[-1] if self._frames else None
+
+    def get(self, seq: int) -> SnapshotFrame | None:
+        return self._by_seq.get(seq)
+
+    def capture(
+        self,
+        server_time_ms: int,
+        runtimes: Iterable[PlayerRuntime],
+        decorations: dict[str, Decoration],
+        tree_version: int,
+    ) -> SnapshotFrame:
+        players: dict[str, tuple[Any, ...]] = {}
+        acks: dict[str, int] = {}
+        for rt in runtimes:
+            players[rt.player_id] = player_state(rt)
+            acks[rt.player_id] = rt.last_input_seq
+
+        prev = self.latest
+        if prev is not None and prev.tree_version == tree_version:
+            deco_ids = prev.deco_ids
+        else:
+            deco_ids = frozenset(decorations)
+
+        self._seq += 1
+        frame = SnapshotFrame(
+            seq=self._seq,
+            server_time_ms=server_time_ms,
+            players=players,
+            acks=acks,
+            tree_version=tree_version,
+            deco_ids=deco_ids,
+        )
+        self._frames.append(frame)
+        self._by_seq[frame.seq] = frame
+        while len(self._frames) > max(1, self.size):
+            old = self._frames.popleft()
+            self._by_seq.pop(old.seq, None)
+        return frame
+
+    def baseline_for(self, acked_seq: int) -> SnapshotFrame | None:
+        """Frame a connection's next delta should be based on, or None for a keyframe."""
+        if acked_seq <= 0:
+            return None
+        return self._by_seq.get(acked_seq)
+
+
+def build_keyframe_payload(
+    frame: SnapshotFrame,
+    room_id: str,
+    phase: str,
+    decorations: dict[str, Decoration],
+    visible: Collection[str] | None = None,
+) -> dict[str, Any]:
+    """Full state; ``visible`` limits the players to a viewer's area of interest."""
+    if visible is None:
+        players = [_player_entry(pid, state) for pid, state in frame.players.items()]
+        ack = dict(frame.acks)
+    else:
+        players = [_player_entry(pid, frame.players[pid]) for pid in visible if pid in frame.players]
+        ack = {pid: frame.acks[pid] for pid in visible if pid in frame.acks}
+    return {
+        "server_time_ms": frame.server_time_ms,
+        "room_id": room_id,
+        "phase": phase,
+        "seq": frame.seq,
+        "keyframe": True,
+        "players": players,
+        "ack": ack,
+        "tree": {"decorations": [decoration_dict(d) for d in decorations.values()]},
+    }
+
+
+def build_delta_payload(
+    frame: SnapshotFrame,
+    base: SnapshotFrame,
+    room_id: str,
+    phase: str,
+    decorations: dict[str, Decoration],
+    visible: Collection[str] | None = None,
+    base_visible: Collection[str] | None = None,
+) -> dict[str, Any]:
+    """Changes since ``base``.
+
+    ``visible`` and ``base_visible`` are the players the viewer sees now and
+    saw in ``base`` (None meaning everyone). Players that just became visible
+    are sent in full; players that dropped out are listed as removed.
+    """
+    current = frame.players.keys() if visible is None else visible
+    previous = base.players.keys() if base_visible is None else base_visible
+    players: list[dict[str, Any]] = []
+    ack: dict[str, int] = {}
+    for pid in current:
+        state = frame.players.get(pid)
+        if state is None:
+            continue
+        base_state = base.players.get(pid) if pid in previous else None
+        if base_state is None:
+            players.append(_player_entry(pid, state))
+            ack[pid] = frame.acks[pid]
+            continue
+        entry = _player_delta_entry(pid, state, base_state)
+        if entry is not None:
+            players.append(entry)
+        if base.acks.get(pid) != frame.acks[pid]:
+            ack[pid] = frame.acks[pid]
+    removed_players = [pid for pid in previous if pid not in current or pid not in frame.players]
+
+    if frame.deco_ids is base.deco_ids:
+        added: list[dict[str, Any]] = []
+        removed: list[str] = []
+    else:
+        added = [decoration_dict(decorations[i]) for i in frame.deco_ids - base.deco_ids if i in decorations]
+        removed = list(base.deco_ids - frame.deco_ids)
+
+    return {
+        "server_time_ms": frame.server_time_ms,
+        "room_id": room_id,
+        "phase": phase,
+        "seq": frame.seq,
+        "keyframe": False,
+        "base": base.seq,
+        "players": players,
+        "removed_players": removed_players,
+        "ack": ack,
+        "tree": {"added": added, "removed": removed},
+    }
+
+
+def far_summary(frame: SnapshotFrame, visible: Collection[str]) -> list[list[Any]]:
+    """Coarse ``[id, name, x, z]`` rows for players outside a viewer's area of interest."""
+    return [
+        [pid, state[0], round(state[1], 2), round(state[3], 2)]
+        for pid, state in frame.players.items()
+        if pid not in visible
+    ]
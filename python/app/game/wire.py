@@ -0,0 +1,523 @@
+"""Compact binary encoding for the high-rate messages ("bin1").
+
+Only ``state.snapshot`` (server to client) and ``input.move`` / ``state.ack``
+(client to server) have a binary form; everything else stays JSON text.
+A client opts in with ``"protocol": "bin1"`` in its ``hello`` payload and the
+``welcome`` reply confirms the protocol, its player handle and the
+quantization ranges below.
+
+All integers are little-endian. Players are addressed by a per-room ``u16``
+handle instead of their 32-character id; the id travels once, in the entry
+that introduces the player. Players stay on the ground plane, so ``y`` is not
+sent and decodes as 0. Positions are ``u16`` fixed point over the world
+bounds, velocities ``i16`` over ``+-max_speed`` and yaw ``i16`` over ``+-pi``.
+
+Snapshot layout::
+
+    u8 tag (TAG_SNAPSHOT)  u8 flags  u32 seq  u32 base  f64 server_time_ms
+    u16 n  n * u16 handle                                  removed players
+    u16 n  n * player entry                                changed players
+    u16 n  n * (u16 handle, u32 input seq)                 ack
+    u16 n  n * decoration                                  added decorations
+    u16 n  n * id                                          removed decorations
+    [u16 n  n * (u16 handle, id, name, u16 x, u16 z)]      far rows, if FLAG_FAR
+
+    player entry: u16 handle, u8 mask, then per mask bit in order:
+        ENTRY_IDENTITY id | ENTRY_NAME name | ENTRY_POS u16 x, u16 z |
+        ENTRY_VEL i16 vx, i16 vz | ENTRY_YAW i16 | ENTRY_HAT u8 | ENTRY_PLACED u16
+    decoration: id, u8 type, u16 angle, u16 height, id placed_by, f64 placed_ms
+    id: u8 0 + 16 raw bytes for 32-char hex ids, else u8 1 + name
+    name: u8 length + utf-8 bytes
+
+Removed players are listed before changed players so a handle that was
+freed and reassigned within one snapshot resolves to the old id first.
+
+bin1 trades server CPU for bandwidth. Frames are about 5x (keyframes) to
+13x (deltas) smaller than JSON, but the encoder is pure Python and costs
+roughly 5-14x the CPU of the orjson path per snapshot, depending on the
+machine and snapshot shape (see ``benchmarks.wire``). Each entry is
+packed into one shared buffer and full entries use a single precompiled
+struct, so what is left is mostly per-field Python work. JSON stays the
+default; the web client only asks for bin1 when opened with ``?wire=bin1``.
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+import struct
+from dataclasses import dataclass
+from typing import Any
+
+from app.config import settings
+
+
+PROTOCOL_JSON = "json"
+PROTOCOL_BIN1 = "bin1"
+
+TAG_SNAPSHOT = 0x01
+TAG_INPUT_MOVE = 0x10
+TAG_STATE_ACK = 0x11
+
+FLAG_KEYFRAME = 0x01
+FLAG_INTEREST = 0x02
+FLAG_FAR = 0x04
+
+ENTRY_IDENTITY = 0x01
+ENTRY_NAME = 0x02
+ENTRY_POS = 0x04
+ENTRY_VEL = 0x08
+ENTRY_YAW = 0x10
+ENTRY_HAT = 0x20
+ENTRY_PLACED = 0x40
+
+DECORATION_TYPES: tuple[str, ...] = ("bell", "mini_hat", "tinsel")
+_DECORATION_CODE = {t: i for i, t in enumerate(DECORATION_TYPES)}
+
+_HEADER = struct.Struct("<BBIId")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_ENTRY_HEAD = struct.Struct("<HB")
+_U16_PAIR = struct.Struct("<HH")
+_I16_PAIR = struct.Struct("<hh")
+_I16 = struct.Struct("<h")
+_ACK = struct.Struct("<HI")
+_DECO_BODY = struct.Struct("<BHH")
+_F64 = struct.Struct("<d")
+_INPUT_MOVE = struct.Struct("<BIhhI")
+_STATE_ACK = struct.Struct("<BI")
+# Position, velocity, yaw, hat and placed count of a full player entry.
+_FULL_TAIL = struct.Struct("<HHhhhBH")
+_FULL_MASK = ENTRY_IDENTITY | ENTRY_NAME | ENTRY_POS | ENTRY_VEL | ENTRY_YAW | ENTRY_HAT | ENTRY_PLACED
+# Largest player entry: head, id as a name, name, every numeric field.
+_FULL_KEYS = frozenset(("x", "z", "vx", "vz", "yaw", "cosmetic", "placed_count"))
+_ENTRY_MAX = _ENTRY_HEAD.size + 2 + 255 + 1 + 255 + _FULL_TAIL.size
+
+_TWO_PI = math.pi * 2.0
+_HEIGHT_MAX = 2.0
+_ANGLE_SCALE = 65535 / _TWO_PI
+_HEIGHT_SCALE = 65535 / _HEIGHT_MAX
+
+
+@dataclass(frozen=True, slots=True)
+class Quantizer:
+    min_x: float
+    max_x: float
+    min_z: float
+    max_z: float
+    max_speed: float
+
+    @staticmethod
+    def from_settings() -> "Quantizer":
+        return Quantizer(
+            min_x=settings.world_min_x,
+            max_x=settings.world_max_x,
+            min_z=settings.world_min_z,
+            max_z=settings.world_max_z,
+            max_speed=max(1e-6, settings.player_max_speed),
+        )
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "min_x": self.min_x,
+            "max_x": self.max_x,
+            "min_z": self.min_z,
+            "max_z": self.max_z,
+            "max_speed": self.max_speed,
+        }
+
+
+def _u16(v: float, lo: float, hi: float) -> int:
+    span = hi - lo
+    if span <= 0:
+        return 0
+    t = (v - lo) / span
+    t = 0.0 if t < 0.0 else 1.0 if t > 1.0 else t
+    return int(round(t * 65535))
+
+
+def _from_u16(q: int, lo: float, hi: float) -> float:
+    return lo + (hi - lo) * q / 65535
+
+
+def _i16(v: float, limit: float) -> int:
+    t = v / limit
+    t = -1.0 if t < -1.0 else 1.0 if t > 1.0 else t
+    return int(round(t * 32767))
+
+
+def _from_i16(q: int, limit: float) -> float:
+    return q * limit / 32767
+
+
+def _pack_name(name: str) -> bytes:
+    raw = name.encode("utf-8")[:255]
+    return _U8.pack(len(raw)) + raw
+
+
+def _pack_id(value: str) -> bytes:
+    if len(value) == 32:
+        try:
+            return b"\x00" + bytes.fromhex(value)
+        except ValueError:
+            pass
+    return b"\x01" + _pack_name(value)
+
+
+# Ids and names repeat in every keyframe; keep their encoded bytes around.
+_cached_id = functools.lru_cache(maxsize=8192)(_pack_id)
+_cached_name = functools.lru_cache(maxsize=8192)(_pack_name)
+
+
+@functools.lru_cache(maxsize=8192)
+def _cached_identity(player_id: str, name: str) -> bytes:
+    return _pack_id(player_id) + _pack_name(name)
+
+
+class _Reader:
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.pos = 0
+
+    def unpack(self, s: struct.Struct) -> tuple[Any, ...]:
+        out = s.unpack_from(self.data, self.pos)
+        self.pos += s.size
+        return out
+
+    def name(self) -> str:
+        (n,) = self.unpack(_U8)
+        raw = self.data[self.pos : self.pos + n]
+        self.pos += n
+        return raw.decode("utf-8", errors="replace")
+
+    def id(self) -> str:
+        (kind,) = self.unpack(_U8)
+        if kind == 0:
+            raw = self.data[self.pos : self.pos + 16]
+            self.pos += 16
+            return raw.hex()
+        return self.name()
+
+
+def _grow(buf: bytearray, need: int) -> None:
+    if need > len(buf):
+        buf.extend(bytes(max(need, 2 * len(buf)) - len(buf)))
+
+
+def encode_snapshot(payload: dict[str, Any], handle_of: dict[str, int], q: Quantizer) -> bytes:
+    """Encode a keyframe or delta payload built by ``app.game.snapshot``.
+
+    Everything is packed into one buffer that grows only when a section could
+    overflow it; id and name bytes are cached across snapshots.
+    """
+    keyframe = bool(payload.get("keyframe"))
+    far = payload.get("far")
+    flags = (FLAG_KEYFRAME if keyframe else 0) | (FLAG_INTEREST if payload.get("interest") else 0)
+    if far is not None:
+        flags |= FLAG_FAR
+    players = payload["players"]
+    tree = payload.get("tree") or {}
+    added = (tree.get("decorations") if keyframe else tree.get("added")) or []
+    removed_decos = [] if keyframe else tree.get("removed") or []
+
+    min_x, min_z = q.min_x, q.min_z
+    sx = 65535 / (q.max_x - min_x) if q.max_x > min_x else 0.0
+    sz = 65535 / (q.max_z - min_z) if q.max_z > min_z else 0.0
+    sv = 32767 / q.max_speed
+    sy = 32767 / math.pi
+    pack_id = _cached_id
+    pack_name = _cached_name
+    pack_identity = _cached_identity
+
+    buf = bytearray(64 + 48 * len(players) + 8 * len(payload.get("ack", ())) + 64 * (len(added) + len(removed_decos)))
+    _HEADER.pack_into(
+        buf,
+        0,
+        TAG_SNAPSHOT,
+        flags,
+        int(payload["seq"]) & 0xFFFFFFFF,
+        int(payload.get("base") or 0) & 0xFFFFFFFF,
+        float(payload["server_time_ms"]),
+    )
+    pos = _HEADER.size
+
+    removed = [handle_of[pid] for pid in payload.get("removed_players", ()) if pid in handle_of]
+    _grow(buf, pos + 2 + 2 * len(removed))
+    _U16.pack_into(buf, pos, len(removed))
+    pos += 2
+    for h in removed:
+        _U16.pack_into(buf, pos, h)
+        pos += 2
+
+    count_at = pos
+    pos += 2
+    count = 0
+    for p in players:
+        h = handle_of.get(p["id"])
+        if h is None:
+            continue
+        count += 1
+        if pos + _ENTRY_MAX > len(buf):
+            _grow(buf, pos + _ENTRY_MAX)
+        entry_at = pos
+        pos += _ENTRY_HEAD.size
+        if "name" in p:
+            raw = pack_identity(p["id"], p["name"])
+            end = pos + len(raw)
+            buf[pos:end] = raw
+            pos = end
+            if p.keys() >= _FULL_KEYS:
+                # A full entry, as in every keyframe: one pack for all fields.
+                vx = p["x"] - min_x
+                vx = 0.0 if vx < 0.0 else vx * sx
+                vz = p["z"] - min_z
+                vz = 0.0 if vz < 0.0 else vz * sz
+                vvx = p["vx"] * sv
+                vvz = p["vz"] * sv
+                vy = p["yaw"] * sy
+                placed = int(p["placed_count"])
+                _FULL_TAIL.pack_into(
+                    buf,
+                    pos,
+                    65535 if vx > 65535 else round(vx),
+                    65535 if vz > 65535 else round(vz),
+                    -32767 if vvx < -32767 else 32767 if vvx > 32767 else round(vvx),
+                    -32767 if vvz < -32767 else 32767 if vvz > 32767 else round(vvz),
+                    -32767 if vy < -32767 else 32767 if vy > 32767 else round(vy),
+                    1 if p["cosmetic"].get("hat") else 0,
+                    placed if placed < 65535 else 65535,
+                )
+                pos += _FULL_TAIL.size
+                _ENTRY_HEAD.pack_into(buf, entry_at, h, _FULL_MASK)
+                continue
+            mask = ENTRY_IDENTITY | ENTRY_NAME
+        else:
+            mask = 0
+        if "x" in p or "z" in p:
+            mask |= ENTRY_POS
+            vx = p.get("x", 0.0) - min_x
+            vx = 0.0 if vx < 0.0 else vx * sx
+            vz = p.get("z", 0.0) - min_z
+            vz = 0.0 if vz < 0.0 else vz * sz
+            _U16_PAIR.pack_into(buf, pos, 65535 if vx > 65535 else round(vx), 65535 if vz > 65535 else round(vz))
+            pos += 4
+        if "vx" in p or "vz" in p:
+            mask |= ENTRY_VEL
+            vvx = p.get("vx", 0.0) * sv
+            vvz = p.get("vz", 0.0) * sv
+            _I16_PAIR.pack_into(
+                buf,
+                pos,
+                -32767 if vvx < -32767 else 32767 if vvx > 32767 else round(vvx),
+                -32767 if vvz < -32767 else 32767 if vvz > 32767 else round(vvz),
+            )
+            pos += 4
+        if "yaw" in p:
+            mask |= ENTRY_YAW
+            vy = p["yaw"] * sy
+            _I16.pack_into(buf, pos, -32767 if vy < -32767 else 32767 if vy > 32767 else round(vy))
+            pos += 2
+        if "cosmetic" in p:
+            mask |= ENTRY_HAT
+            buf[pos] = 1 if p["cosmetic"].get("hat") else 0
+            pos += 1
+        if "placed_count" in p:
+            mask |= ENTRY_PLACED
+            _U16.pack_into(buf, pos, min(65535, int(p["placed_count"])))
+            pos += 2
+        _ENTRY_HEAD.pack_into(buf, entry_at, h, mask)
+    _U16.pack_into(buf, count_at, count)
+
+    ack = payload.get("ack", {})
+    _grow(buf, pos + 2 + _ACK.size * len(ack))
+    count_at = pos
+    pos += 2
+    count = 0
+    for pid, seq in ack.items():
+        h = handle_of.get(pid)
+        if h is not None:
+            _ACK.pack_into(buf, pos, h, int(seq) & 0xFFFFFFFF)
+            pos += _ACK.size
+            count += 1
+    _U16.pack_into(buf, count_at, count)
+
+    _grow(buf, pos + 2)
+    _U16.pack_into(buf, pos, len(added))
+    pos += 2
+    for d in added:
+        raw = pack_id(d["id"])
+        placed_by = pack_id(d["placed_by"])
+        _grow(buf, pos + len(raw) + _DECO_BODY.size + len(placed_by) + _F64.size)
+        end = pos + len(raw)
+        buf[pos:end] = raw
+        angle = d["angle"] % _TWO_PI * _ANGLE_SCALE
+        height = d["height"] * _HEIGHT_SCALE
+        _DECO_BODY.pack_into(
+            buf,
+            end,
+            _DECORATION_CODE.get(d["type"], 0),
+            65535 if angle > 65535 else round(angle),
+            0 if height < 0 else 65535 if height > 65535 else round(height),
+        )
+        pos = end + _DECO_BODY.size
+        end = pos + len(placed_by)
+        buf[pos:end] = placed_by
+        _F64.pack_into(buf, end, float(d["placed_ms"]))
+        pos = end + _F64.size
+
+    _grow(buf, pos + 2)
+    _U16.pack_into(buf, pos, len(removed_decos))
+    pos += 2
+    for deco_id in removed_decos:
+        raw = pack_id(deco_id)
+        _grow(buf, pos + len(raw))
+        buf[pos : pos + len(raw)] = raw
+        pos += len(raw)
+
+    if far is not None:
+        rows = [row for row in far if row[0] in handle_of]
+        _grow(buf, pos + 2)
+        _U16.pack_into(buf, pos, len(rows))
+        pos += 2
+        for pid, name, x, z in rows:
+            raw = pack_id(pid) + pack_name(name)
+            _grow(buf, pos + 2 + len(raw) + 4)
+            _U16.pack_into(buf, pos, handle_of[pid])
+            pos += 2
+            buf[pos : pos + len(raw)] = raw
+            pos += len(raw)
+            _U16_PAIR.pack_into(buf, pos, _u16(x, q.min_x, q.max_x), _u16(z, q.min_z, q.max_z))
+            pos += 4
+    return bytes(memoryview(buf)[:pos])
+
+
+def decode_snapshot(data: bytes, ids: dict[int, str], q: Quantizer) -> dict[str, Any]:
+    """Inverse of ``encode_snapshot``; ``ids`` is the caller's handle->id map and is updated in place."""
+    r = _Reader(data)
+    tag, flags, seq, base, server_time_ms = r.unpack(_HEADER)
+    if tag != TAG_SNAPSHOT:
+        raise ValueError(f"not a snapshot frame: {tag}")
+    keyframe = bool(flags & FLAG_KEYFRAME)
+
+    (n,) = r.unpack(_U16)
+    removed_players = []
+    for _ in range(n):
+        (h,) = r.unpack(_U16)
+        pid = ids.get(h)
+        if pid is not None:
+            removed_players.append(pid)
+
+    (n,) = r.unpack(_U16)
+    players: list[dict[str, Any]] = []
+    for _ in range(n):
+        h, mask = r.unpack(_ENTRY_HEAD)
+        entry: dict[str, Any] = {}
+        if mask & ENTRY_IDENTITY:
+            ids[h] = r.id()
+        if mask & ENTRY_NAME:
+            entry["name"] = r.name()
+        if mask & ENTRY_POS:
+            qx, qz = r.unpack(_U16_PAIR)
+            entry["x"] = _from_u16(qx, q.min_x, q.max_x)
+            entry["y"] = 0.0
+            entry["z"] = _from_u16(qz, q.min_z, q.max_z)
+        if mask & ENTRY_VEL:
+            qvx, qvz = r.unpack(_I16_PAIR)
+            entry["vx"] = _from_i16(qvx, q.max_speed)
+            entry["vz"] = _from_i16(qvz, q.max_speed)
+        if mask & ENTRY_YAW:
+            (qy,) = r.unpack(_I16)
+            entry["yaw"] = _from_i16(qy, math.pi)
+        if mask & ENTRY_HAT:
+            (hat,) = r.unpack(_U8)
+            entry["cosmetic"] = {"hat": bool(hat)}
+        if mask & ENTRY_PLACED:
+            (entry["placed_count"],) = r.unpack(_U16)
+        pid = ids.get(h)
+        if pid is not None:
+            entry["id"] = pid
+            players.append(entry)
+
+    (n,) = r.unpack(_U16)
+    ack: dict[str, int] = {}
+    for _ in range(n):
+        h, s = r.unpack(_ACK)
+        if h in ids:
+            ack[ids[h]] = s
+
+    (n,) = r.unpack(_U16)
+    added = []
+    for _ in range(n):
+        deco_id = r.id()
+        code, qa, qh = r.unpack(_DECO_BODY)
+        placed_by = r.id()
+        (placed_ms,) = r.unpack(_F64)
+        added.append(
+            {
+                "id": deco_id,
+                "type": DECORATION_TYPES[code] if code < len(DECORATION_TYPES) else DECORATION_TYPES[0],
+                "angle": _from_u16(qa, 0.0, _TWO_PI),
+                "height": _from_u16(qh, 0.0, _HEIGHT_MAX),
+                "placed_by": placed_by,
+                "placed_ms": int(placed_ms),
+            }
+        )
+    (n,) = r.unpack(_U16)
+    removed_decos = [r.id() for _ in range(n)]
+
+    payload: dict[str, Any] = {
+        "server_time_ms": int(server_time_ms),
+        "seq": seq,
+        "keyframe": keyframe,
+        "players": players,
+        "ack": ack,
+    }
+    if keyframe:
+        payload["tree"] = {"decorations": added}
+    else:
+        payload["base"] = base
+        payload["removed_players"] = removed_players
+        payload["tree"] = {"added": added, "removed": removed_decos}
+    if flags & FLAG_INTEREST:
+        payload["interest"] = True
+    if flags & FLAG_FAR:
+        (n,) = r.unpack(_U16)
+        far = []
+        for _ in range(n):
+            (h,) = r.unpack(_U16)
+            pid = r.id()
+            ids[h] = pid
+            name = r.name()
+            qx, qz = r.unpack(_U16_PAIR)
+            far.append([pid, name, _from_u16(qx, q.min_x, q.max_x), _from_u16(qz, q.min_z, q.max_z)])
+        payload["far"] = far
+    return payload
+
+
+def encode_input_move(seq: int, ax: float, az: float, client_time_ms: int) -> bytes:
+    return _INPUT_MOVE.pack(TAG_INPUT_MOVE, seq & 0xFFFFFFFF, _i16(ax, 1.0), _i16(az, 1.0), client_time_ms & 0xFFFFFFFF)
+
+
+def encode_state_ack(seq: int) -> bytes:
+    return _STATE_ACK.pack(TAG_STATE_ACK, seq & 0xFFFFFFFF)
+
+
+def decode_client_message(data: bytes) -> tuple[str, dict[str, Any]] | None:
+    """Decode a binary client frame into the equivalent JSON ``(type, payload)``."""
+    if not data:
+        return None
+    tag = data[0]
+    if tag == TAG_INPUT_MOVE and len(data) == _INPUT_MOVE.size:
+        _, seq, qax, qaz, client_time_ms = _INPUT_MOVE.unpack(data)
+        return "input.move", {
+            "seq": seq,
+            "ax": _from_i16(qax, 1.0),
+            "az": _from_i16(qaz, 1.0),
+            "client_time_ms": client_time_ms,
+        }
+    if tag == TAG_STATE_ACK and len(data) == _STATE_ACK.size:
+        _, seq = _STATE_ACK.unpack(data)
+        return "state.ack", {"seq": seq}
+    return None
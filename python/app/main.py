@@ -2,19 +2,57 @@ from __future__ import annotations
 
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, HTTPException, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.config import settings
 from app.game.room_manager import RoomManager
+from app.game.sharding import ShardRouter
+from app.metrics import metrics
+from app.storage.base import CacheStore, Repo
+from app.storage.chat_log import ChatLogWriter
+from app.storage.leases import RedisLeases
+from app.storage.memory import MemoryCache, MemoryRepo
 from app.storage.mysql_repo import MySqlRepo
 from app.storage.redis_store import RedisStore
+from app.storage.sqlite_repo import SqliteRepo
+from app.storage.timed import TimedStore
 from app.ws import handle_ws
 
 
-redis_store = RedisStore()
-mysql_repo = MySqlRepo()
-room_manager = RoomManager(redis=redis_store, mysql=mysql_repo)
+def _create_storage() -> tuple[CacheStore, Repo]:
+    if settings.storage_backend == "memory":
+        return MemoryCache(), MemoryRepo()
+    if settings.storage_backend == "sqlite":
+        return MemoryCache(), SqliteRepo(path=settings.sqlite_path)
+    if settings.storage_backend != "external":
+        print(f"[STORAGE] unknown STORAGE_BACKEND {settings.storage_backend!r}; using external")
+    return RedisStore(batch_writes=settings.redis_batch_writes), MySqlRepo()
+
+
+redis_store, mysql_repo = _create_storage()
+# Rooms and the chat log go through timing wrappers, which only time once
+# /metrics has been scraped; lifecycle calls and leases use the stores directly.
+room_cache: CacheStore = TimedStore(redis_store, "cache") if metrics.available else redis_store
+room_repo: Repo = TimedStore(mysql_repo, "repo") if metrics.available else mysql_repo
+chat_log = ChatLogWriter(
+    repo=room_repo,
+    max_queue=settings.chat_log_queue_max,
+    max_batch=settings.chat_log_batch_max,
+    max_delay_ms=settings.chat_log_flush_ms,
+)
+shard_router: ShardRouter | None = None
+if settings.shard_count > 1:
+    # Leases are the only thing keeping two workers off the same room, so
+    # they have to live somewhere every worker can see.
+    if not isinstance(redis_store, RedisStore):
+        raise RuntimeError(
+            f"SHARD_COUNT={settings.shard_count} needs Redis for room leases; "
+            f"STORAGE_BACKEND={settings.storage_backend} has none"
+        )
+    shard_router = ShardRouter.from_settings(RedisLeases(redis_store))
+room_manager = RoomManager(redis=room_cache, mysql=room_repo, chat_log=chat_log, router=shard_router)
 
 
 @asynccontextmanager
@@ -22,7 +60,13 @@ async def lifespan(app: FastAPI):
     await redis_store.connect()
     await mysql_repo.connect()
     await mysql_repo.ensure_schema()
+    if shard_router is not None and isinstance(redis_store, RedisStore) and redis_store.client is None:
+        raise RuntimeError(f"SHARD_COUNT={settings.shard_count} needs Redis for room leases; cannot reach {settings.redis_url}")
+    chat_log.start()
+    room_manager.start()
     yield
+    await room_manager.close()
+    await chat_log.close()
     await redis_store.close()
     await mysql_repo.close()
 
@@ -43,6 +87,34 @@ async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    if not metrics.available:
+        raise HTTPException(status_code=404)
+    stats = chat_log.stats.as_dict()
+    gauges = room_manager.metric_gauges() + [
+        ("chat_log_queue_depth", "Chat rows waiting to be written.", (), chat_log.depth),
+        ("chat_log_max_depth", "Most chat rows ever waiting at once.", (), stats["max_depth"]),
+        ("chat_log_written", "Chat rows written.", (), stats["written"]),
+        ("chat_log_dropped", "Chat rows dropped because the queue was full.", (), stats["dropped"]),
+        ("chat_log_failed", "Chat rows lost to failed writes.", (), stats["failed"]),
+        ("chat_log_batches", "Multi-row chat INSERTs written.", (), stats["batches"]),
+        ("chat_log_last_batch_size", "Rows in the latest chat INSERT.", (), stats["last_batch_size"]),
+        ("chat_log_max_batch_size", "Most rows in one chat INSERT.", (), stats["max_batch_size"]),
+        ("chat_log_avg_batch_size", "Mean rows per chat INSERT.", (), stats["avg_batch_size"]),
+        ("chat_log_last_write_seconds", "Duration of the latest chat INSERT.", (), stats["last_write_ms"] / 1000.0),
+    ]
+    if isinstance(redis_store, RedisStore):
+        batch = redis_store.batch_stats()
+        gauges += [
+            ("redis_batch_flushes", "Pipelined flushes of batched snapshot writes.", (), batch["flushes"]),
+            ("redis_batch_commands", "Snapshot writes sent in batched flushes.", (), batch["commands"]),
+            ("redis_batch_coalesced", "Snapshot writes replaced by a newer one before the flush.", (), batch["coalesced"]),
+            ("redis_batch_pending", "Snapshot writes waiting for the next flush.", (), batch["pending"]),
+        ]
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
+
 @app.websocket(settings.ws_path)
 async def ws_endpoint(ws: WebSocket) -> None:
     await handle_ws(ws, room_manager)
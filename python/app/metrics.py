@@ -0,0 +1,156 @@
+"""In-process metrics rendered in the Prometheus text format.
+
+Hot paths call ``metrics.observe(...)``/``metrics.inc(...)`` only after
+checking ``metrics.enabled``, so while it is off the cost is one attribute
+read. Recording starts with the first scrape of ``/metrics``: until
+something asks for the numbers nothing is timed or counted. With
+``METRICS_ENABLED=0`` it never starts. Histograms use fixed buckets: an
+observation is one bisect and two additions.
+"""
+
+from __future__ import annotations
+
+import bisect
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from app.config import settings
+
+# 50us .. 2.5s, roughly x2.5 per bucket.
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+@dataclass(slots=True)
+class Histogram:
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+@dataclass(slots=True)
+class _Family:
+    kind: str
+    help: str
+    series: dict[Labels, Any] = field(default_factory=dict)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _le(bound: float) -> str:
+    return 'le="' + _num(bound) + '"'
+
+
+@dataclass(slots=True)
+class Registry:
+    available: bool = True
+    enabled: bool = False
+    _families: dict[str, _Family] = field(default_factory=dict)
+
+    def _family(self, name: str, kind: str, help: str) -> _Family:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = _Family(kind=kind, help=help)
+        return family
+
+    def observe(self, name: str, value: float, labels: Labels = (), help: str = "") -> None:
+        series = self._family(name, "histogram", help).series
+        hist = series.get(labels)
+        if hist is None:
+            hist = series[labels] = Histogram()
+        hist.observe(value)
+
+    def inc(self, name: str, labels: Labels = (), amount: float = 1, help: str = "") -> None:
+        series = self._family(name, "counter", help).series
+        series[labels] = series.get(labels, 0) + amount
+
+    def forget(self, label: str, value: str) -> None:
+        """Drop every series carrying ``label=value``, e.g. a closed room."""
+        for family in self._families.values():
+            for labels in [k for k in family.series if (label, value) in k]:
+                del family.series[labels]
+
+    def reset(self) -> None:
+        self._families.clear()
+
+    def render(self, gauges: Iterable[tuple[str, str, Labels, float]] = ()) -> str:
+        """Prometheus text exposition; ``gauges`` are (name, help, labels, value) read at scrape time.
+
+        The first render turns recording on, so histograms and counters cover
+        the time since the first scrape.
+        """
+        self.enabled = self.available
+        lines: list[str] = []
+        for name, family in sorted(self._families.items()):
+            if family.help:
+                lines.append(f"# HELP {name} {family.help}")
+            lines.append(f"# TYPE {name} {family.kind}")
+            for labels, value in family.series.items():
+                if family.kind == "counter":
+                    lines.append(f"{name}{_labels(labels)} {_num(value)}")
+                    continue
+                cumulative = 0
+                for bound, n in zip(value.buckets, value.counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_labels(labels, _le(bound))} {cumulative}")
+                lines.append(f"{name}_bucket{_labels(labels, _le(float('inf')))} {value.count}")
+                lines.append(f"{name}_sum{_labels(labels)} {_num(value.total)}")
+                lines.append(f"{name}_count{_labels(labels)} {value.count}")
+        # A metric's samples must be contiguous, so group gauges by name
+        # (in order of first appearance) however the caller interleaved them.
+        grouped: dict[str, tuple[str, list[str]]] = {}
+        for name, help, labels, value in gauges:
+            group = grouped.get(name)
+            if group is None:
+                group = grouped[name] = (help, [])
+            group[1].append(f"{name}{_labels(labels)} {_num(value)}")
+        for name, (help, samples) in grouped.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Registry(available=settings.metrics_enabled)
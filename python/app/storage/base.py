@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from typing import Any, Protocol
+
+
+class CacheStore(Protocol):
+    """Shared, short-lived room data: who is online, the latest snapshot,
+    a cached copy of the tree and the last chat lines. ``RedisStore`` is the
+    networked implementation, ``MemoryCache`` the in-process one."""
+
+    batch_writes: bool
+
+    async def connect(self) -> None: ...
+
+    async def close(self) -> None: ...
+
+    async def upsert_player(self, room_id: str, player_id: str, name: str) -> None: ...
+
+    async def remove_player(self, room_id: str, player_id: str) -> None: ...
+
+    async def update_room_snapshot(self, room_id: str, snapshot_payload: dict[str, Any]) -> None: ...
+
+    async def set_tree_state(self, room_id: str, tree_state: dict[str, Any]) -> None: ...
+
+    async def get_tree_state(self, room_id: str) -> dict[str, Any] | None: ...
+
+    async def push_chat_message(self, room_id: str, msg: dict[str, Any]) -> None: ...
+
+    async def delete_chat_history(self, room_id: str) -> None: ...
+
+    async def get_chat_history(self, room_id: str) -> list[dict[str, Any]]: ...
+
+    async def flush_pending(self) -> None:
+        """Send writes held back by ``batch_writes``."""
+        ...
+
+
+class Repo(Protocol):
+    """Durable room data: the tree and the chat log. ``MySqlRepo``,
+    ``SqliteRepo`` and ``MemoryRepo`` implement it.
+
+    Decorations are rows keyed by ``(room_id, deco_id)`` and only ever
+    appended; each room has a version that grows by one per row. The older
+    ``room_tree_state`` blob is kept for migration (see
+    ``app.storage.migrate``).
+    """
+
+    async def connect(self) -> None: ...
+
+    async def close(self) -> None: ...
+
+    async def ensure_schema(self) -> None: ...
+
+    async def get_decorations(self, room_id: str) -> list[dict[str, Any]] | None:
+        """The room's decorations in placement order, or None if the room has
+        no version yet (never written, or still only in the blob)."""
+        ...
+
+    async def append_decorations(self, room_id: str, decorations: list[dict[str, Any]]) -> int:
+        """Insert decorations (``decoration_dict`` shape) and return the room's
+        new version. Ids already stored are skipped, so retrying a batch is
+        safe. An empty list still creates the version row."""
+        ...
+
+    async def get_room_state(self, room_id: str) -> dict[str, Any] | None:
+        """The legacy whole-tree blob."""
+        ...
+
+    async def upsert_room_state(self, room_id: str, state: dict[str, Any]) -> None: ...
+
+    async def room_state_ids(self) -> list[str]:
+        """Rooms that have a legacy blob."""
+        ...
+
+    async def insert_chat_message(
+        self,
+        room_id: str,
+        player_id: str,
+        player_name: str,
+        player_ip: str,
+        message: str,
+        created_ms: int,
+    ) -> None: ...
+
+    async def insert_chat_messages(self, rows: list[dict[str, Any]]) -> None: ...
+
+    async def get_recent_chat(self, room_id: str, limit: int) -> list[dict[str, Any]]:
+        """Latest chat_log rows, oldest first, shaped like ``chat.message`` payloads."""
+        ...
+
+    async def delete_chat_history(self, room_id: str) -> None: ...
+
+
+def decoration_row(room_id: str, d: dict[str, Any], version: int) -> dict[str, Any]:
+    """Column values for a ``decoration_dict``-shaped decoration."""
+    return {
+        "room_id": room_id,
+        "deco_id": str(d["id"]),
+        "version": version,
+        "deco_type": str(d["type"]),
+        "angle": float(d.get("angle", 0.0)),
+        "height": float(d.get("height", 0.2)),
+        "placed_by": str(d.get("placed_by") or ""),
+        "placed_ms": int(d.get("placed_ms") or 0),
+    }
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.storage.base import Repo
+
+
+@dataclass(slots=True)
+class ChatLogStats:
+    enqueued: int = 0
+    written: int = 0
+    dropped: int = 0
+    failed: int = 0
+    batches: int = 0
+    last_batch_size: int = 0
+    max_batch_size: int = 0
+    max_depth: int = 0
+    last_write_ms: float = 0.0
+
+    def record_batch(self, size: int, duration_ms: float) -> None:
+        self.batches += 1
+        self.written += size
+        self.last_batch_size = size
+        self.last_write_ms = duration_ms
+        if size > self.max_batch_size:
+            self.max_batch_size = size
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": self.written / self.batches if self.batches else 0.0,
+            "max_depth": self.max_depth,
+            "last_write_ms": self.last_write_ms,
+        }
+
+
+@dataclass(slots=True)
+class ChatLogWriter:
+    """Buffers chat_log rows and writes them with multi-row INSERTs.
+
+    ``submit()`` never waits on the database. A background task writes a
+    batch once ``max_batch`` rows are queued or the oldest row is
+    ``max_delay_ms`` old. At most ``max_queue`` rows are held; rows beyond
+    that are dropped and counted. ``close()`` drains what is left.
+    """
+
+    repo: Repo
+    max_queue: int = 10000
+    max_batch: int = 200
+    max_delay_ms: int = 200
+    stats: ChatLogStats = field(default_factory=ChatLogStats)
+    _queue: deque[dict[str, Any]] = field(default_factory=deque)
+    _wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    _full: asyncio.Event = field(default_factory=asyncio.Event)
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    _task: asyncio.Task[None] | None = None
+    _closed: bool = False
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._closed = False
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        self._closed = True
+        self._wakeup.set()
+        self._full.set()
+        task, self._task = self._task, None
+        if task is not None:
+            await task
+        await self.flush()
+
+    def submit(
+        self,
+        room_id: str,
+        player_id: str,
+        player_name: str,
+        player_ip: str,
+        message: str,
+        created_ms: int,
+    ) -> bool:
+        if len(self._queue) >= max(1, self.max_queue):
+            self.stats.dropped += 1
+            return False
+        self._queue.append(
+            {
+                "room_id": room_id,
+                "player_id": player_id,
+                "player_name": player_name,
+                "player_ip": player_ip,
+                "message": message,
+                "created_ms": created_ms,
+            }
+        )
+        self.stats.enqueued += 1
+        depth = len(self._queue)
+        if depth > self.stats.max_depth:
+            self.stats.max_depth = depth
+        self._wakeup.set()
+        if depth >= self.max_batch:
+            self._full.set()
+        return True
+
+    async def flush(self) -> None:
+        """Write every queued row now."""
+        async with self._lock:
+            while self._queue:
+                n = min(len(self._queue), max(1, self.max_batch))
+                batch = [self._queue.popleft() for _ in range(n)]
+                t0 = time.perf_counter()
+                try:
+                    await self.repo.insert_chat_messages(batch)
+                except Exception as e:
+                    self.stats.failed += len(batch)
+                    print(f"[CHAT LOG ERROR] dropped {len(batch)} rows: {e}")
+                    continue
+                self.stats.record_batch(len(batch), (time.perf_counter() - t0) * 1000.0)
+
+    async def _run(self) -> None:
+        while not self._closed:
+            await self._wakeup.wait()
+            if len(self._queue) < self.max_batch and not self._closed:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=max(0, self.max_delay_ms) / 1000.0)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            self._full.clear()
+            await self.flush()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Protocol
+
+from app.storage.redis_store import RedisStore
+
+
+class LeaseStore(Protocol):
+    """Expiring ownership records: one owner per key until the TTL runs out."""
+
+    async def acquire(self, key: str, owner: str, ttl_ms: int) -> bool:
+        """Take the lease if it is free or already ours (which renews it)."""
+        ...
+
+    async def renew(self, key: str, owner: str, ttl_ms: int) -> bool:
+        """Extend a lease we hold; False if it expired or someone else holds it."""
+        ...
+
+    async def release(self, key: str, owner: str) -> None: ...
+
+    async def owner(self, key: str) -> str | None: ...
+
+
+# Only touch the key while it still belongs to the caller.
+_RENEW = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_ACQUIRE = """
+local holder = redis.call('get', KEYS[1])
+if not holder then
+    redis.call('set', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+if holder == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass(slots=True)
+class RedisLeases:
+    """Leases in Redis. Without a connection nothing can be acquired or
+    renewed, so a worker that loses Redis gives its rooms up rather than
+    risk two workers serving the same room."""
+
+    store: RedisStore
+
+    async def acquire(self, key: str, owner: str, ttl_ms: int) -> bool:
+        client = self.store.client
+        if client is None:
+            return False
+        return bool(await client.eval(_ACQUIRE, 1, key, owner, ttl_ms))
+
+    async def renew(self, key: str, owner: str, ttl_ms: int) -> bool:
+        client = self.store.client
+        if client is None:
+            return False
+        return bool(await client.eval(_RENEW, 1, key, owner, ttl_ms))
+
+    async def release(self, key: str, owner: str) -> None:
+        client = self.store.client
+        if client is None:
+            return
+        await client.eval(_RELEASE, 1, key, owner)
+
+    async def owner(self, key: str) -> str | None:
+        client = self.store.client
+        if client is None:
+            return None
+        return await client.get(key)
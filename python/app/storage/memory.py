@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import copy
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+# Same cap RedisStore applies to room:<id>:chat.
+CACHE_CHAT_SIZE = 50
+
+
+@dataclass(slots=True)
+class MemoryCache:
+    """In-process ``CacheStore``. Nothing is shared between processes, so it
+    only suits a single worker. Values are kept by reference; rooms always
+    hand over freshly built dicts."""
+
+    batch_writes: bool = False
+    _players: dict[str, dict[str, str]] = field(default_factory=dict)
+    _snapshots: dict[str, dict[str, Any]] = field(default_factory=dict)
+    _trees: dict[str, dict[str, Any]] = field(default_factory=dict)
+    _chat: dict[str, deque[dict[str, Any]]] = field(default_factory=dict)
+
+    @property
+    def client(self) -> Any | None:
+        return None
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def upsert_player(self, room_id: str, player_id: str, name: str) -> None:
+        self._players.setdefault(room_id, {})[player_id] = name
+
+    async def remove_player(self, room_id: str, player_id: str) -> None:
+        players = self._players.get(room_id)
+        if players is not None:
+            players.pop(player_id, None)
+            if not players:
+                del self._players[room_id]
+
+    def players(self, room_id: str) -> dict[str, str]:
+        return dict(self._players.get(room_id, {}))
+
+    async def update_room_snapshot(self, room_id: str, snapshot_payload: dict[str, Any]) -> None:
+        self._snapshots[room_id] = snapshot_payload
+
+    def snapshot(self, room_id: str) -> dict[str, Any] | None:
+        return self._snapshots.get(room_id)
+
+    async def set_tree_state(self, room_id: str, tree_state: dict[str, Any]) -> None:
+        self._trees[room_id] = tree_state
+
+    async def get_tree_state(self, room_id: str) -> dict[str, Any] | None:
+        state = self._trees.get(room_id)
+        return None if state is None else copy.deepcopy(state)
+
+    async def push_chat_message(self, room_id: str, msg: dict[str, Any]) -> None:
+        chat = self._chat.get(room_id)
+        if chat is None:
+            chat = self._chat[room_id] = deque(maxlen=CACHE_CHAT_SIZE)
+        chat.append(msg)
+
+    async def delete_chat_history(self, room_id: str) -> None:
+        self._chat.pop(room_id, None)
+
+    async def get_chat_history(self, room_id: str) -> list[dict[str, Any]]:
+        return list(self._chat.get(room_id, ()))
+
+    async def flush_pending(self) -> None:
+        pass
+
+
+@dataclass(slots=True)
+class MemoryRepo:
+    """In-process ``Repo``. Keeps at most ``max_chat_rows`` chat rows per room
+    and loses everything on restart; use ``SqliteRepo`` to keep data."""
+
+    max_chat_rows: int = 10000
+    _states: dict[str, dict[str, Any]] = field(default_factory=dict)
+    # Insertion order is placement order; the version is the row count.
+    _decorations: dict[str, dict[str, dict[str, Any]]] = field(default_factory=dict)
+    _chat: dict[str, deque[dict[str, Any]]] = field(default_factory=dict)
+    _next_id: int = 1
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def ensure_schema(self) -> None:
+        pass
+
+    async def get_decorations(self, room_id: str) -> list[dict[str, Any]] | None:
+        decorations = self._decorations.get(room_id)
+        return None if decorations is None else [dict(d) for d in decorations.values()]
+
+    async def append_decorations(self, room_id: str, decorations: list[dict[str, Any]]) -> int:
+        stored = self._decorations.setdefault(room_id, {})
+        for d in decorations:
+            deco_id = str(d["id"])
+            if deco_id not in stored:
+                stored[deco_id] = dict(d)
+        return len(stored)
+
+    async def room_state_ids(self) -> list[str]:
+        return list(self._states)
+
+    async def get_room_state(self, room_id: str) -> dict[str, Any] | None:
+        state = self._states.get(room_id)
+        return None if state is None else copy.deepcopy(state)
+
+    async def upsert_room_state(self, room_id: str, state: dict[str, Any]) -> None:
+        state = dict(state)
+        state["updated_ms"] = int(state.get("updated_ms") or 0) or int(time.time() * 1000)
+        self._states[room_id] = state
+
+    async def insert_chat_message(
+        self,
+        room_id: str,
+        player_id: str,
+        player_name: str,
+        player_ip: str,
+        message: str,
+        created_ms: int,
+    ) -> None:
+        await self.insert_chat_messages(
+            [
+                {
+                    "room_id": room_id,
+                    "player_id": player_id,
+                    "player_name": player_name,
+                    "player_ip": player_ip,
+                    "message": message,
+                    "created_ms": created_ms,
+                }
+            ]
+        )
+
+    async def insert_chat_messages(self, rows: list[dict[str, Any]]) -> None:
+        for row in rows:
+            room_id = row["room_id"]
+            chat = self._chat.get(room_id)
+            if chat is None:
+                chat = self._chat[room_id] = deque(maxlen=self.max_chat_rows)
+            chat.append({**row, "id": self._next_id})
+            self._next_id += 1
+
+    async def get_recent_chat(self, room_id: str, limit: int) -> list[dict[str, Any]]:
+        if limit <= 0:
+            return []
+        rows = sorted(self._chat.get(room_id, ()), key=lambda r: (r["created_ms"], r["id"]))
+        return [
+            {
+                "id": f"log-{row['id']}",
+                "room_id": row["room_id"],
+                "player_id": row["player_id"],
+                "name": row["player_name"],
+                "text": row["message"],
+                "server_time_ms": row["created_ms"],
+            }
+            for row in rows[-limit:]
+        ]
+
+    async def delete_chat_history(self, room_id: str) -> None:
+        self._chat.pop(room_id, None)
@@ -0,0 +1,70 @@
+"""Move trees from the ``room_tree_state`` blob into ``decoration`` rows.
+
+Rooms migrate themselves the first time they load (see
+``Room._hydrate_state``). To migrate everything up front, run from the
+``python/`` directory with the same environment as the server::
+
+    python -m app.storage.migrate
+
+Blobs are left in place, so running it twice is harmless.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from app.config import settings
+from app.storage.base import Repo
+
+
+def _valid(decorations: Any) -> list[dict[str, Any]]:
+    if not isinstance(decorations, list):
+        return []
+    return [d for d in decorations if isinstance(d, dict) and d.get("id") and d.get("type")]
+
+
+async def migrate_room(repo: Repo, room_id: str) -> list[dict[str, Any]]:
+    """Copy one room's blob into rows and return its decorations.
+
+    Rooms without a blob get an empty version row, so the blob is not looked
+    up again.
+    """
+    state = await repo.get_room_state(room_id)
+    decorations = _valid(state.get("decorations")) if isinstance(state, dict) else []
+    await repo.append_decorations(room_id, decorations)
+    return decorations
+
+
+async def migrate_all(repo: Repo) -> dict[str, int]:
+    """Migrate every room that has a blob but no version row yet."""
+    migrated = skipped = decorations = 0
+    for room_id in await repo.room_state_ids():
+        if await repo.get_decorations(room_id) is not None:
+            skipped += 1
+            continue
+        decorations += len(await migrate_room(repo, room_id))
+        migrated += 1
+    return {"migrated": migrated, "skipped": skipped, "decorations": decorations}
+
+
+async def _main() -> None:
+    if settings.storage_backend == "sqlite":
+        from app.storage.sqlite_repo import SqliteRepo
+
+        repo: Repo = SqliteRepo(path=settings.sqlite_path)
+    else:
+        from app.storage.mysql_repo import MySqlRepo
+
+        repo = MySqlRepo()
+    await repo.connect()
+    try:
+        await repo.ensure_schema()
+        result = await migrate_all(repo)
+    finally:
+        await repo.close()
+    print(f"[MIGRATE] {result['migrated']} rooms, {result['decorations']} decorations; {result['skipped']} already done")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -5,12 +5,13 @@ import json
 from dataclasses import dataclass
 from typing import Any
 
-from sqlalchemy import Integer, String, Text, BigInteger, select, text
+from sqlalchemy import Double, Index, Integer, String, Text, BigInteger, insert, select, text
 from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 from app.config import settings
+from app.storage.base import decoration_row
 
 
 class Base(DeclarativeBase):
@@ -26,6 +27,45 @@ class RoomTreeState(Base):
     updated_ms: Mapped[int] = mapped_column(BigInteger)
 
 
+class DecorationRow(Base):
+    """One placed decoration. Rows are only inserted; ``version`` is the room
+    version the row was written at, so hydration is a range scan on
+    ``(room_id, version)``."""
+
+    __tablename__ = "decoration"
+    __table_args__ = (Index("ix_decoration_room_version", "room_id", "version"),)
+
+    room_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    deco_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer)
+    deco_type: Mapped[str] = mapped_column(String(16))
+    # DOUBLE, not FLOAT: MySQL's FLOAT is 32-bit and would round the values
+    # the JSON blob and the other backends keep exactly.
+    angle: Mapped[float] = mapped_column(Double)
+    height: Mapped[float] = mapped_column(Double)
+    placed_by: Mapped[str] = mapped_column(String(64))
+    placed_ms: Mapped[int] = mapped_column(BigInteger)
+
+
+class RoomTreeVersion(Base):
+    __tablename__ = "room_tree_version"
+
+    room_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer)
+    updated_ms: Mapped[int] = mapped_column(BigInteger)
+
+
+def _decoration_dict(row: DecorationRow) -> dict[str, Any]:
+    return {
+        "id": row.deco_id,
+        "type": row.deco_type,
+        "angle": row.angle,
+        "height": row.height,
+        "placed_by": row.placed_by,
+        "placed_ms": row.placed_ms,
+    }
+
+
 class ChatLog(Base):
     __tablename__ = "chat_log"
 
@@ -70,6 +110,10 @@ class MySqlRepo:
                     await conn.execute(text("ALTER TABLE chat_log MODIFY created_ms BIGINT"))
                 except Exception:
                     pass
+                try:
+                    await conn.execute(text("ALTER TABLE decoration MODIFY angle DOUBLE NOT NULL, MODIFY height DOUBLE NOT NULL"))
+                except Exception:
+                    pass
         except Exception as e:
             if not self._is_unknown_database_error(e):
                 raise
@@ -100,6 +144,62 @@ class MySqlRepo:
         finally:
             await server_engine.dispose()
 
+    async def get_decorations(self, room_id: str) -> list[dict[str, Any]] | None:
+        if self.session_factory is None:
+            return None
+        async with self.session_factory() as session:
+            version = await session.scalar(select(RoomTreeVersion.version).where(RoomTreeVersion.room_id == room_id))
+            if version is None:
+                return None
+            rows = (
+                await session.scalars(
+                    select(DecorationRow).where(DecorationRow.room_id == room_id).order_by(DecorationRow.version)
+                )
+            ).all()
+        return [_decoration_dict(row) for row in rows]
+
+    async def append_decorations(self, room_id: str, decorations: list[dict[str, Any]]) -> int:
+        if self.session_factory is None:
+            return 0
+        ids = [str(d["id"]) for d in decorations]
+        async with self.session_factory() as session, session.begin():
+            current = await session.scalar(
+                select(RoomTreeVersion).where(RoomTreeVersion.room_id == room_id).with_for_update()
+            )
+            existing: set[str] = set()
+            if ids:
+                existing = set(
+                    await session.scalars(
+                        select(DecorationRow.deco_id).where(
+                            DecorationRow.room_id == room_id, DecorationRow.deco_id.in_(ids)
+                        )
+                    )
+                )
+            version = current.version if current is not None else 0
+            rows = []
+            for d in decorations:
+                deco_id = str(d["id"])
+                if deco_id in existing:
+                    continue
+                existing.add(deco_id)
+                version += 1
+                rows.append(decoration_row(room_id, d, version))
+            if rows:
+                await session.execute(insert(DecorationRow).values(rows))
+            now_ms = int(time.time() * 1000)
+            if current is None:
+                session.add(RoomTreeVersion(room_id=room_id, version=version, updated_ms=now_ms))
+            else:
+                current.version = version
+                current.updated_ms = now_ms
+        return version
+
+    async def room_state_ids(self) -> list[str]:
+        if self.session_factory is None:
+            return []
+        async with self.session_factory() as session:
+            return list(await session.scalars(select(RoomTreeState.room_id)))
+
     async def get_room_state(self, room_id: str) -> dict[str, Any] | None:
         if self.session_factory is None:
             return None
@@ -153,6 +253,39 @@ class MySqlRepo:
             session.add(row)
             await session.commit()
 
+    async def insert_chat_messages(self, rows: list[dict[str, Any]]) -> None:
+        """Insert many chat_log rows with one multi-row INSERT."""
+        if self.session_factory is None or not rows:
+            return
+        async with self.session_factory() as session:
+            await session.execute(insert(ChatLog).values(rows))
+            await session.commit()
+
+    async def get_recent_chat(self, room_id: str, limit: int) -> list[dict[str, Any]]:
+        """Latest chat_log rows, oldest first, shaped like ``chat.message`` payloads."""
+        if self.session_factory is None:
+            return []
+        async with self.session_factory() as session:
+            rows = (
+                await session.scalars(
+                    select(ChatLog)
+                    .where(ChatLog.room_id == room_id)
+                    .order_by(ChatLog.created_ms.desc(), ChatLog.id.desc())
+                    .limit(limit)
+                )
+            ).all()
+        return [
+            {
+                "id": f"log-{row.id}",
+                "room_id": row.room_id,
+                "player_id": row.player_id,
+                "name": row.player_name,
+                "text": row.message,
+                "server_time_ms": row.created_ms,
+            }
+            for row in reversed(rows)
+        ]
+
     async def delete_chat_history(self, room_id: str) -> None:
         if self.session_factory is None:
             return
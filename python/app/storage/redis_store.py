@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any
 
 from app.config import settings
@@ -9,7 +9,20 @@ from app.config import settings
 
 @dataclass(slots=True)
 class RedisStore:
+    # When set, room snapshot writes are held until flush_pending(), which
+    # the tick scheduler calls once per step, and go out in one pipeline.
+    # Only snapshots are batched: players, tree state and chat are read back
+    # when an evicted room is rebuilt, so those writes still go out at once.
+    batch_writes: bool = False
+    batch_flushes: int = 0
+    batch_commands: int = 0
+    batch_coalesced: int = 0
     _client: Any | None = None
+    _pending: dict[str, tuple[str, int]] = field(default_factory=dict)
+
+    @property
+    def client(self) -> Any | None:
+        return self._client
 
     async def connect(self) -> None:
         if settings.redis_url is None:
@@ -26,6 +39,10 @@ class RedisStore:
     async def close(self) -> None:
         if self._client is None:
             return
+        try:
+            await self.flush_pending()
+        except Exception as e:
+            print(f"[REDIS ERROR] {e}")
         try:
             await self._client.close()
         except Exception:
@@ -36,8 +53,10 @@ class RedisStore:
         if self._client is None:
             return
         key = f"room:{room_id}:players"
-        await self._client.hset(key, mapping={player_id: name})
-        await self._client.expire(key, 6 * 3600)
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={player_id: name})
+            pipe.expire(key, 6 * 3600)
+            await pipe.execute()
 
     async def remove_player(self, room_id: str, player_id: str) -> None:
         if self._client is None:
@@ -49,15 +68,19 @@ class RedisStore:
         if self._client is None:
             return
         key = f"room:{room_id}:snapshot"
-        await self._client.set(key, json.dumps(snapshot_payload, ensure_ascii=False))
-        await self._client.expire(key, 3600)
+        value = json.dumps(snapshot_payload, ensure_ascii=False)
+        if self.batch_writes:
+            if key in self._pending:
+                self.batch_coalesced += 1
+            self._pending[key] = (value, 3600)
+            return
+        await self._client.set(key, value, ex=3600)
 
     async def set_tree_state(self, room_id: str, tree_state: dict[str, Any]) -> None:
         if self._client is None:
             return
         key = f"room:{room_id}:tree"
-        await self._client.set(key, json.dumps(tree_state, ensure_ascii=False))
-        await self._client.expire(key, 24 * 3600)
+        await self._client.set(key, json.dumps(tree_state, ensure_ascii=False), ex=24 * 3600)
 
     async def get_tree_state(self, room_id: str) -> dict[str, Any] | None:
         if self._client is None:
@@ -78,9 +101,11 @@ class RedisStore:
         if self._client is None:
             return
         key = f"room:{room_id}:chat"
-        await self._client.lpush(key, json.dumps(msg, ensure_ascii=False))
-        await self._client.ltrim(key, 0, 49)
-        await self._client.expire(key, 6 * 3600)
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.lpush(key, json.dumps(msg, ensure_ascii=False))
+            pipe.ltrim(key, 0, 49)
+            pipe.expire(key, 6 * 3600)
+            await pipe.execute()
 
     async def delete_chat_history(self, room_id: str) -> None:
         if self._client is None:
@@ -103,3 +128,22 @@ class RedisStore:
                 msgs.append(value)
         return msgs
 
+    async def flush_pending(self) -> None:
+        """Send every held write in one non-transactional pipeline."""
+        if not self._pending or self._client is None:
+            return
+        pending, self._pending = self._pending, {}
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key, (value, ttl) in pending.items():
+                pipe.set(key, value, ex=ttl)
+            await pipe.execute()
+        self.batch_flushes += 1
+        self.batch_commands += len(pending)
+
+    def batch_stats(self) -> dict[str, int]:
+        return {
+            "flushes": self.batch_flushes,
+            "commands": self.batch_commands,
+            "coalesced": self.batch_coalesced,
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, TypeVar
+
+from app.storage.base import decoration_row
+
+T = TypeVar("T")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS room_tree_state (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        room_id VARCHAR(64) NOT NULL UNIQUE,
+        json_blob TEXT NOT NULL,
+        updated_ms BIGINT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        room_id VARCHAR(64) NOT NULL,
+        player_id VARCHAR(64) NOT NULL,
+        player_name VARCHAR(64) NOT NULL,
+        player_ip VARCHAR(64) NOT NULL,
+        message TEXT NOT NULL,
+        created_ms BIGINT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_chat_log_room_created ON chat_log (room_id, created_ms)",
+    """
+    CREATE TABLE IF NOT EXISTS decoration (
+        room_id VARCHAR(64) NOT NULL,
+        deco_id VARCHAR(64) NOT NULL,
+        version INTEGER NOT NULL,
+        deco_type VARCHAR(16) NOT NULL,
+        angle FLOAT NOT NULL,
+        height FLOAT NOT NULL,
+        placed_by VARCHAR(64) NOT NULL,
+        placed_ms BIGINT NOT NULL,
+        PRIMARY KEY (room_id, deco_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_decoration_room_version ON decoration (room_id, version)",
+    """
+    CREATE TABLE IF NOT EXISTS room_tree_version (
+        room_id VARCHAR(64) NOT NULL PRIMARY KEY,
+        version INTEGER NOT NULL,
+        updated_ms BIGINT NOT NULL
+    )
+    """,
+)
+
+_CHAT_COLUMNS = ("room_id", "player_id", "player_name", "player_ip", "message", "created_ms")
+_DECORATION_COLUMNS = ("room_id", "deco_id", "version", "deco_type", "angle", "height", "placed_by", "placed_ms")
+
+
+@dataclass(slots=True)
+class SqliteRepo:
+    """``Repo`` on a local SQLite file in WAL mode, for single-node deployments.
+
+    Uses the standard library driver. One worker thread owns the connection,
+    so calls are serialized and never block the event loop. Tables match the
+    MySQL schema.
+    """
+
+    path: str = "christmas.db"
+    _conn: sqlite3.Connection | None = None
+    _executor: ThreadPoolExecutor | None = None
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        conn = self._conn
+        assert conn is not None and self._executor is not None
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, conn)
+
+    async def connect(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+        def open_db() -> sqlite3.Connection:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL with synchronous=NORMAL only syncs at checkpoints; a crash can
+            # lose the last commits but never corrupts the file.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            return conn
+
+        self._conn = await asyncio.get_running_loop().run_in_executor(self._executor, open_db)
+
+    async def close(self) -> None:
+        if self._conn is None:
+            return
+        await self._run(lambda conn: conn.close())
+        self._conn = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def ensure_schema(self) -> None:
+        if self._conn is None:
+            return
+
+        def create(conn: sqlite3.Connection) -> None:
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+
+        await self._run(create)
+
+    async def get_decorations(self, room_id: str) -> list[dict[str, Any]] | None:
+        if self._conn is None:
+            return None
+
+        def load(conn: sqlite3.Connection) -> list[tuple[Any, ...]] | None:
+            if conn.execute("SELECT 1 FROM room_tree_version WHERE room_id = ?", (room_id,)).fetchone() is None:
+                return None
+            return conn.execute(
+                "SELECT deco_id, deco_type, angle, height, placed_by, placed_ms FROM decoration "
+                "WHERE room_id = ? ORDER BY version",
+                (room_id,),
+            ).fetchall()
+
+        rows = await self._run(load)
+        if rows is None:
+            return None
+        return [
+            {"id": deco_id, "type": deco_type, "angle": angle, "height": height, "placed_by": by, "placed_ms": ms}
+            for deco_id, deco_type, angle, height, by, ms in rows
+        ]
+
+    async def append_decorations(self, room_id: str, decorations: list[dict[str, Any]]) -> int:
+        if self._conn is None:
+            return 0
+        now_ms = int(time.time() * 1000)
+
+        def append(conn: sqlite3.Connection) -> int:
+            with conn:
+                # IMMEDIATE takes the write lock up front so the version read
+                # below cannot race another writer.
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT version FROM room_tree_version WHERE room_id = ?", (room_id,)).fetchone()
+                version = row[0] if row is not None else 0
+                values = []
+                seen: set[str] = set()
+                for d in decorations:
+                    deco = decoration_row(room_id, d, version + 1)
+                    if deco["deco_id"] in seen:
+                        continue
+                    seen.add(deco["deco_id"])
+                    exists = conn.execute(
+                        "SELECT 1 FROM decoration WHERE room_id = ? AND deco_id = ?", (room_id, deco["deco_id"])
+                    ).fetchone()
+                    if exists is not None:
+                        continue
+                    version += 1
+                    values.append(tuple(deco[c] for c in _DECORATION_COLUMNS))
+                if values:
+                    conn.executemany(
+                        f"INSERT INTO decoration ({', '.join(_DECORATION_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(_DECORATION_COLUMNS))})",
+                        values,
+                    )
+                conn.execute(
+                    "INSERT INTO room_tree_version (room_id, version, updated_ms) VALUES (?, ?, ?) "
+                    "ON CONFLICT(room_id) DO UPDATE SET version = excluded.version, updated_ms = excluded.updated_ms",
+                    (room_id, version, now_ms),
+                )
+            return version
+
+        return await self._run(append)
+
+    async def room_state_ids(self) -> list[str]:
+        if self._conn is None:
+            return []
+        rows = await self._run(lambda conn: conn.execute("SELECT room_id FROM room_tree_state").fetchall())
+        return [row[0] for row in rows]
+
+    async def get_room_state(self, room_id: str) -> dict[str, Any] | None:
+        if self._conn is None:
+            return None
+        row = await self._run(
+            lambda conn: conn.execute("SELECT json_blob FROM room_tree_state WHERE room_id = ?", (room_id,)).fetchone()
+        )
+        if row is None:
+            return None
+        try:
+            value = json.loads(row[0])
+        except Exception:
+            return None
+        if not isinstance(value, dict):
+            return None
+        return value
+
+    async def upsert_room_state(self, room_id: str, state: dict[str, Any]) -> None:
+        if self._conn is None:
+            return
+        blob = json.dumps(state, ensure_ascii=False)
+        updated_ms = int(state.get("updated_ms") or 0) or int(time.time() * 1000)
+        await self._run(
+            lambda conn: conn.execute(
+                "INSERT INTO room_tree_state (room_id, json_blob, updated_ms) VALUES (?, ?, ?) "
+                "ON CONFLICT(room_id) DO UPDATE SET json_blob = excluded.json_blob, updated_ms = excluded.updated_ms",
+                (room_id, blob, updated_ms),
+            )
+        )
+
+    async def insert_chat_message(
+        self,
+        room_id: str,
+        player_id: str,
+        player_name: str,
+        player_ip: str,
+        message: str,
+        created_ms: int,
+    ) -> None:
+        await self.insert_chat_messages(
+            [
+                {
+                    "room_id": room_id,
+                    "player_id": player_id,
+                    "player_name": player_name,
+                    "player_ip": player_ip,
+                    "message": message,
+                    "created_ms": created_ms,
+                }
+            ]
+        )
+
+    async def insert_chat_messages(self, rows: list[dict[str, Any]]) -> None:
+        """Insert many chat_log rows in one transaction."""
+        if self._conn is None or not rows:
+            return
+        values = [tuple(row[c] for c in _CHAT_COLUMNS) for row in rows]
+
+        def insert(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    f"INSERT INTO chat_log ({', '.join(_CHAT_COLUMNS)}) VALUES ({', '.join('?' * len(_CHAT_COLUMNS))})",
+                    values,
+                )
+
+        await self._run(insert)
+
+    async def get_recent_chat(self, room_id: str, limit: int) -> list[dict[str, Any]]:
+        if self._conn is None:
+            return []
+        rows = await self._run(
+            lambda conn: conn.execute(
+                "SELECT id, room_id, player_id, player_name, message, created_ms FROM chat_log "
+                "WHERE room_id = ? ORDER BY created_ms DESC, id DESC LIMIT ?",
+                (room_id, limit),
+            ).fetchall()
+        )
+        return [
+            {
+                "id": f"log-{row_id}",
+                "room_id": rid,
+                "player_id": player_id,
+                "name": name,
+                "text": message,
+                "server_time_ms": created_ms,
+            }
+            for row_id, rid, player_id, name, message, created_ms in reversed(rows)
+        ]
+
+    async def delete_chat_history(self, room_id: str) -> None:
+        if self._conn is None:
+            return
+        await self._run(lambda conn: conn.execute("DELETE FROM chat_log WHERE room_id = ?", (room_id,)))
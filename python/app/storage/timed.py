@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import time
+from typing import Any
+
+from app.metrics import metrics
+
+
+class TimedStore:
+    """Wraps a ``CacheStore`` or ``Repo`` and records each async call's latency
+    as ``storage_call_seconds{store=..., op=...}``. Everything else, plain
+    attributes included, passes through to the wrapped store."""
+
+    def __init__(self, inner: Any, store: str) -> None:
+        self._inner = inner
+        self._store = store
+        self._wrapped: dict[str, Any] = {}
+
+    @property
+    def inner(self) -> Any:
+        return self._inner
+
+    def __getattr__(self, name: str) -> Any:
+        wrapped = self._wrapped.get(name)
+        if wrapped is not None:
+            return wrapped
+        attr = getattr(self._inner, name)
+        if name.startswith("_") or not inspect.iscoroutinefunction(attr):
+            return attr
+        labels = (("store", self._store), ("op", name))
+
+        @functools.wraps(attr)
+        async def timed(*args: Any, **kwargs: Any) -> Any:
+            if not metrics.enabled:
+                return await attr(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return await attr(*args, **kwargs)
+            finally:
+                metrics.observe(
+                    "storage_call_seconds",
+                    time.perf_counter() - t0,
+                    labels,
+                    help="Latency of storage calls made by rooms and the chat log writer.",
+                )
+
+        # Cached so the same bound callable comes back every time, which keeps
+        # identity checks such as ``flush_pending in on_step`` working.
+        self._wrapped[name] = timed
+        return timed
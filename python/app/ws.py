@@ -3,9 +3,13 @@ from __future__ import annotations
 import json
 from typing import Any
 
-from fastapi import WebSocket
+from fastapi import WebSocket, WebSocketDisconnect
 
+from app.game.governor import Overloaded
 from app.game.room_manager import RoomManager
+from app.game.sharding import WrongShard
+from app.game.wire import PROTOCOL_BIN1, PROTOCOL_JSON, decode_client_message
+from app.metrics import metrics
 
 
 def _sanitize_name(name: Any) -> str:
@@ -34,6 +38,24 @@ def _sanitize_room_id(room_id: Any) -> str:
     return "".join(safe) or "public"
 
 
+# Label values for message counts; anything else is counted as "other".
+_MESSAGE_TYPES = frozenset(
+    ("set_name", "input.move", "state.ack", "pong", "player.cosmetic", "tree.place", "chat.send", "chat.clear")
+)
+
+
+async def _receive(ws: WebSocket) -> Any:
+    """Next client message as a dict; binary frames are decoded with the bin1 codec."""
+    message = await ws.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    data = message.get("bytes")
+    if data is not None:
+        decoded = decode_client_message(data)
+        return None if decoded is None else {"type": decoded[0], "payload": decoded[1]}
+    return json.loads(message.get("text") or "null")
+
+
 async def handle_ws(ws: WebSocket, rooms: RoomManager) -> None:
     await ws.accept()
     player_id: str | None = None
@@ -48,37 +70,74 @@ async def handle_ws(ws: WebSocket, rooms: RoomManager) -> None:
         payload = msg.get("payload") or {}
         name = _sanitize_name(payload.get("name"))
         room_id = _sanitize_room_id(payload.get("room_id"))
+        protocol = PROTOCOL_BIN1 if payload.get("protocol") == PROTOCOL_BIN1 else PROTOCOL_JSON
         
         client_host = ws.client.host if ws.client else "unknown"
         
-        room = await rooms.get_or_create(room_id)
-        player_id = await room.add_player(ws, name=name, ip=client_host)
+        try:
+            room = await rooms.get_or_create(room_id)
+            resume_token = payload.get("resume_token")
+            if isinstance(resume_token, str) and resume_token:
+                player_id = await room.resume_player(resume_token, ws, protocol=protocol)
+            resumed = player_id is not None
+            if player_id is None:
+                # Resumes go through even while overloaded; new players do not.
+                rooms.governor.admit()
+                player_id = await room.add_player(ws, name=name, ip=client_host, protocol=protocol)
+        except WrongShard as e:
+            await ws.send_json({"type": "event.redirect", "payload": {"room_id": room_id, "url": e.url}})
+            await ws.close()
+            return
+        except Overloaded as e:
+            await ws.send_json({"type": "event.error", "payload": {"code": e.code}})
+            await ws.close(code=1013)
+            return
 
-        await ws.send_json(
+        await room.send_to(
+            player_id,
             {
                 "type": "welcome",
                 "payload": {
                     "player_id": player_id,
                     "room_id": room_id,
                     "phase": room.phase,
+                    "protocol": protocol,
+                    "handle": room.player_handle(player_id),
+                    "wire": room.wire_params(),
+                    "resumed": resumed,
+                    "resume_token": room.issue_resume_token(player_id),
                 },
-            }
+            },
         )
 
-        chat_history = await room.get_chat_history()
-        if chat_history:
-            await ws.send_json({"type": "chat.history", "payload": {"messages": chat_history}})
+        if resumed:
+            room.send_chat_since(player_id, payload.get("last_chat_id"))
+        else:
+            room.send_chat_history(player_id)
+        room.start_sending(player_id)
 
         while True:
-            data = await ws.receive_json()
+            data = await _receive(ws)
             if not isinstance(data, dict):
                 continue
             t = data.get("type")
             payload2 = data.get("payload") or {}
+            if metrics.enabled:
+                metrics.inc(
+                    "ws_messages_received_total",
+                    (("type", t if t in _MESSAGE_TYPES else "other"),),
+                    help="Client messages received, by type.",
+                )
             if t == "set_name":
                 await room.set_name(player_id, _sanitize_name(payload2.get("name")))
             elif t == "input.move":
                 await room.submit_move_input(player_id, payload2)
+            elif t == "state.ack":
+                seq = payload2.get("seq")
+                if isinstance(seq, int):
+                    room.ack_snapshot(player_id, seq)
+            elif t == "pong":
+                room.record_pong(player_id, payload2)
             elif t == "player.cosmetic":
                 await room.set_cosmetic(player_id, payload2)
             elif t == "tree.place":
@@ -90,12 +149,12 @@ async def handle_ws(ws: WebSocket, rooms: RoomManager) -> None:
                 if password == "20251225":
                     await room.clear_chat()
                 else:
-                    await ws.send_json({"type": "event.notice", "payload": {"code": "wrong_password", "message": "管理员密码错误"}})
+                    await room.send_to(player_id, {"type": "event.notice", "payload": {"code": "wrong_password", "message": "管理员密码错误"}})
             else:
-                await ws.send_json({"type": "event.notice", "payload": {"code": "unknown_type", "type": t}})
+                await room.send_to(player_id, {"type": "event.notice", "payload": {"code": "unknown_type", "type": t}})
     except Exception as e:
         print(f"[WS ERROR] {e}")
     finally:
         if room is not None and player_id is not None:
-            await room.remove_player(player_id)
+            await room.detach_player(player_id, ws)
 
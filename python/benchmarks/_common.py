@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable
+
+
+class NullSocket:
+    """Stands in for a WebSocket: accepts every frame and only counts bytes."""
+
+    def __init__(self) -> None:
+        self.client = None
+        self.frames = 0
+        self.bytes = 0
+
+    async def send_text(self, data: str) -> None:
+        self.frames += 1
+        self.bytes += len(data)
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.frames += 1
+        self.bytes += len(data)
+
+    async def send_json(self, data: Any) -> None:
+        self.frames += 1
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        pass
+
+
+def measure(fn: Callable[[], Any], iterations: int, warmup: int = 10) -> dict[str, float]:
+    """Time ``fn`` ``iterations`` times and summarize per-call latency."""
+    for _ in range(warmup):
+        fn()
+    samples: list[float] = []
+    t_total = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    total = time.perf_counter() - t_total
+    return summarize(samples, total)
+
+
+async def measure_async(
+    fn: Callable[[], Awaitable[Any]],
+    iterations: int,
+    warmup: int = 10,
+    between: Callable[[], Awaitable[Any]] | None = None,
+) -> dict[str, float]:
+    """Like ``measure`` for coroutines. ``between`` runs untimed after every
+    call (to drain outboxes, reset state, ...), so ops/s counts only the
+    timed calls."""
+    for _ in range(warmup):
+        await fn()
+        if between is not None:
+            await between()
+    samples: list[float] = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - t0)
+        if between is not None:
+            await between()
+    return summarize(samples, sum(samples))
+
+
+def percentiles_us(samples: list[float]) -> dict[str, float]:
+    """p50/p99/max of ``samples`` (in seconds) as microseconds."""
+    samples = sorted(samples)
+    n = len(samples)
+    if n == 0:
+        return {"p50_us": 0.0, "p99_us": 0.0, "max_us": 0.0}
+    return {
+        "p50_us": samples[n // 2] * 1e6,
+        "p99_us": samples[min(n - 1, int(n * 0.99))] * 1e6,
+        "max_us": samples[-1] * 1e6,
+    }
+
+
+def summarize(samples: list[float], total_s: float) -> dict[str, float]:
+    samples = sorted(samples)
+    n = len(samples)
+    if n == 0:
+        return {"n": 0, "ops_per_s": 0.0, "p50_us": 0.0, "p99_us": 0.0, "mean_us": 0.0}
+    return {
+        "n": n,
+        "ops_per_s": n / total_s if total_s > 0 else 0.0,
+        "p50_us": samples[n // 2] * 1e6,
+        "p99_us": samples[min(n - 1, int(n * 0.99))] * 1e6,
+        "mean_us": statistics.fmean(samples) * 1e6,
+    }
+
+
+def emit(name: str, params: dict[str, Any], result: dict[str, Any]) -> None:
+    """Print one result as a JSON line so runs can be diffed between commits."""
+    line = {"bench": name, **params, **{k: round(v, 3) if isinstance(v, float) else v for k, v in result.items()}}
+    sys.stdout.write(json.dumps(line, sort_keys=True) + "\n")
+    sys.stdout.flush()
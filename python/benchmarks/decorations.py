@@ -0,0 +1,127 @@
+"""Write amplification of the tree blob versus appended decoration rows.
+
+Places ``--count`` decorations one at a time and writes after each, which is
+the write-behind worst case (one placement per flush). ``blob`` rewrites
+the whole ``room_tree_state`` JSON each time and ``rows`` appends one
+``decoration`` row. Bytes are the payload handed to the database per write,
+so they leave out index and page overhead. Also reports the cost of loading
+the finished tree both ways.
+
+Run from the ``python/`` directory::
+
+    python -m benchmarks.decorations
+    MYSQL_DSN=mysql+aiomysql://... python -m benchmarks.decorations --backend mysql
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any
+
+from app.storage.base import Repo, decoration_row
+from benchmarks._common import emit, percentiles_us
+
+
+def _decorations(n: int, seed: int) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"{rng.getrandbits(128):032x}",
+            "type": rng.choice(("bell", "mini_hat", "tinsel")),
+            "angle": rng.uniform(0.0, 6.28),
+            "height": rng.uniform(0.12, 1.28),
+            "placed_by": f"{rng.getrandbits(128):032x}",
+            "placed_ms": 1_700_000_000_000 + i,
+        }
+        for i in range(n)
+    ]
+
+
+async def _blob(repo: Repo, room_id: str, decos: list[dict[str, Any]]) -> dict[str, float]:
+    writes: list[float] = []
+    total = 0
+    for i in range(1, len(decos) + 1):
+        state = {"room_id": room_id, "decorations": decos[:i]}
+        total += len(json.dumps(state, ensure_ascii=False))
+        t0 = time.perf_counter()
+        await repo.upsert_room_state(room_id, state)
+        writes.append(time.perf_counter() - t0)
+    loads: list[float] = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        state = await repo.get_room_state(room_id)
+        loads.append(time.perf_counter() - t0)
+    assert state is not None and len(state["decorations"]) == len(decos)
+    return _result(writes, total, len(decos), loads)
+
+
+async def _rows(repo: Repo, room_id: str, decos: list[dict[str, Any]]) -> dict[str, float]:
+    writes: list[float] = []
+    total = 0
+    for i, d in enumerate(decos, 1):
+        total += len(json.dumps(decoration_row(room_id, d, i), ensure_ascii=False))
+        t0 = time.perf_counter()
+        await repo.append_decorations(room_id, [d])
+        writes.append(time.perf_counter() - t0)
+    loads: list[float] = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        rows = await repo.get_decorations(room_id)
+        loads.append(time.perf_counter() - t0)
+    assert rows is not None and len(rows) == len(decos)
+    return _result(writes, total, len(decos), loads)
+
+
+def _result(writes: list[float], total_bytes: int, n: int, loads: list[float]) -> dict[str, float]:
+    result: dict[str, float] = {
+        "bytes_total": total_bytes,
+        "bytes_per_placement": total_bytes / n,
+        "write_total_ms": sum(writes) * 1000.0,
+    }
+    result.update({f"write_{k}": v for k, v in percentiles_us(writes).items()})
+    result.update({f"load_{k}": v for k, v in percentiles_us(loads).items()})
+    return result
+
+
+async def _run(backend: str, count: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        if backend == "mysql":
+            from app.storage.mysql_repo import MySqlRepo
+
+            repo: Repo = MySqlRepo()
+        elif backend == "memory":
+            from app.storage.memory import MemoryRepo
+
+            repo = MemoryRepo()
+        else:
+            from app.storage.sqlite_repo import SqliteRepo
+
+            repo = SqliteRepo(path=os.path.join(tmp, "bench.db"))
+        await repo.connect()
+        await repo.ensure_schema()
+        try:
+            decos = _decorations(count, seed=1)
+            suffix = f"{random.getrandbits(32):08x}"
+            for strategy, fn in (("blob", _blob), ("rows", _rows)):
+                result = await fn(repo, f"bench-{strategy}-{suffix}", decos)
+                emit("tree.persist", {"backend": backend, "strategy": strategy, "decorations": count}, result)
+        finally:
+            await repo.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["sqlite", "mysql", "memory"], default="sqlite")
+    parser.add_argument("--count", type=int, default=300)
+    args = parser.parse_args()
+    asyncio.run(_run(args.backend, args.count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Measure room lock traffic while players stream ``input.move`` at the rate limit.
+
+Every player sends inputs at ``input_rate_limit_hz`` while the room ticks at
+``server_tick_hz``. The room lock is swapped for one that records how long
+each acquire waited and how long the lock was then held.
+
+Run from the ``python/`` directory::
+
+    python -m benchmarks.inputs
+    python -m benchmarks.inputs --players 12 100 --seconds 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+
+from app.config import settings
+from app.game.room import Room
+from app.storage.memory import MemoryCache, MemoryRepo
+from benchmarks._common import NullSocket, emit, percentiles_us
+
+
+class TimedLock(asyncio.Lock):
+    def __init__(self) -> None:
+        super().__init__()
+        self.waits: list[float] = []
+        self.holds: list[float] = []
+        self._acquired_at = 0.0
+
+    async def acquire(self) -> bool:
+        t0 = time.perf_counter()
+        await super().acquire()
+        self._acquired_at = time.perf_counter()
+        self.waits.append(self._acquired_at - t0)
+        return True
+
+    def release(self) -> None:
+        self.holds.append(time.perf_counter() - self._acquired_at)
+        super().release()
+
+
+async def _run(players: int, seconds: float) -> dict[str, float]:
+    room = Room(room_id="bench", redis=MemoryCache(), mysql=MemoryRepo())
+    ids = [await room.add_player(NullSocket(), f"p{i}") for i in range(players)]
+    for player_id in ids:
+        room.start_sending(player_id)
+    lock = TimedLock()
+    room._lock = lock
+    submits: list[float] = []
+    ticks: list[float] = []
+    deadline = time.perf_counter() + seconds
+
+    async def player(pid: str) -> None:
+        rng = random.Random(pid)
+        period = 1.0 / max(1, settings.input_rate_limit_hz)
+        seq = 0
+        await asyncio.sleep(rng.uniform(0.0, period))
+        while time.perf_counter() < deadline:
+            seq += 1
+            payload = {"seq": seq, "ax": rng.uniform(-1, 1), "az": rng.uniform(-1, 1), "client_time_ms": seq}
+            t0 = time.perf_counter()
+            await room.submit_move_input(pid, payload)
+            submits.append(time.perf_counter() - t0)
+            await asyncio.sleep(period)
+
+    async def ticker() -> None:
+        dt = 1.0 / max(1, settings.server_tick_hz)
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            await room.tick(dt)
+            ticks.append(time.perf_counter() - t0)
+            await asyncio.sleep(dt)
+
+    await asyncio.gather(ticker(), *(player(pid) for pid in ids))
+    await room.close()
+
+    result: dict[str, float] = {
+        "inputs": len(submits),
+        "ticks": len(ticks),
+        "lock_acquires": len(lock.waits),
+        "lock_wait_total_ms": sum(lock.waits) * 1000.0,
+        "lock_hold_total_ms": sum(lock.holds) * 1000.0,
+    }
+    result.update({f"lock_wait_{k}": v for k, v in percentiles_us(lock.waits).items()})
+    result.update({f"lock_hold_{k}": v for k, v in percentiles_us(lock.holds).items()})
+    result.update({f"submit_{k}": v for k, v in percentiles_us(submits).items()})
+    result.update({f"tick_{k}": v for k, v in percentiles_us(ticks).items()})
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, nargs="+", default=[12, 100])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    for n in args.players:
+        result = asyncio.run(_run(n, args.seconds))
+        emit("room.inputs", {"players": n, "seconds": args.seconds}, result)
+
+
+if __name__ == "__main__":
+    main()
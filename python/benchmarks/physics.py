@@ -0,0 +1,90 @@
+"""Compare the scalar and NumPy physics steps.
+
+Run from the ``python/`` directory::
+
+    python -m benchmarks.physics
+    python -m benchmarks.physics --players 12 100 1000 --iterations 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+
+from app.config import settings
+from app.game.anti_cheat import MoveConstraints
+from app.game.physics import ScalarPhysics, VectorPhysics, np
+from app.game.types import PlayerRuntime
+from benchmarks._common import emit, measure
+
+
+def _constraints() -> MoveConstraints:
+    return MoveConstraints(
+        max_speed=settings.player_max_speed,
+        max_accel=settings.player_max_accel,
+        min_x=settings.world_min_x,
+        max_x=settings.world_max_x,
+        min_z=settings.world_min_z,
+        max_z=settings.world_max_z,
+    )
+
+
+def _players(n: int, seed: int) -> list[PlayerRuntime]:
+    rng = random.Random(seed)
+    players = []
+    for i in range(n):
+        rt = PlayerRuntime(player_id=f"p{i}", name=f"p{i}")
+        rt.kin.x = rng.uniform(settings.world_min_x, settings.world_max_x)
+        rt.kin.z = rng.uniform(settings.world_min_z, settings.world_max_z)
+        players.append(rt)
+    return players
+
+
+def _load(engine, players: list[PlayerRuntime], seed: int) -> None:
+    rng = random.Random(seed)
+    for rt in players:
+        engine.add(rt)
+        engine.set_axis(rt, rng.uniform(-1.0, 1.0), rng.uniform(-1.0, 1.0))
+
+
+def _check_equivalent(n: int, steps: int, dt: float, c: MoveConstraints) -> None:
+    scalar_players = _players(n, seed=n)
+    vector_players = _players(n, seed=n)
+    scalar, vector = ScalarPhysics(), VectorPhysics()
+    _load(scalar, scalar_players, seed=n + 1)
+    _load(vector, vector_players, seed=n + 1)
+    for _ in range(steps):
+        scalar.step(dt, c)
+        vector.step(dt, c)
+    for a, b in zip(scalar_players, vector_players):
+        if (a.kin.x, a.kin.z, a.kin.vx, a.kin.vz) != (b.kin.x, b.kin.z, b.kin.vx, b.kin.vz):
+            raise SystemExit(f"engines diverged for {a.player_id}")
+        if a.cheat_flags != b.cheat_flags:
+            raise SystemExit(f"clamp flags differ for {a.player_id}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, nargs="+", default=[12, 100, 1000])
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    dt = 1.0 / max(1, settings.server_tick_hz)
+    c = _constraints()
+    engines = [("scalar", ScalarPhysics)]
+    if np is not None:
+        engines.append(("numpy", VectorPhysics))
+
+    for n in args.players:
+        if np is not None:
+            _check_equivalent(n, steps=200, dt=dt, c=c)
+        for name, factory in engines:
+            engine = factory()
+            _load(engine, _players(n, seed=n), seed=n + 1)
+            result = measure(lambda: engine.step(dt, c), args.iterations)
+            result["players_per_s"] = result["ops_per_s"] * n
+            emit("physics.step", {"engine": name, "players": n}, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Replay a room journal headlessly, as fast as the room can tick.
+
+Reads a journal written with ``JOURNAL_DIR`` set (see ``app.game.journal``)
+and feeds it through a fresh ``Room``: joins, leaves, inputs, placements and
+chat are applied between the same ticks they arrived between, ticks use the
+recorded ``dt`` and the room's clock advances by ``dt`` per tick instead of
+following the wall clock. Sockets are ``NullSocket``s that ack every
+snapshot straight away, and storage is in memory, so the tree starts empty
+whatever the room held when the journal began.
+
+Each run prints tick cost and a digest of the final positions and tree. The
+digest does not depend on timing, and version 2 journals keep inputs and
+placements at full precision, so ``--expect`` turns a replay into a
+regression check (version 1 journals replay only approximately)::
+
+    python -m benchmarks.replay journals/public-1700000000000.journal --runs 3
+    python -m benchmarks.replay journals/public-1700000000000.journal --expect 3f2a...
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import time
+from typing import Any
+
+from app.game.journal import CHAT, DT, END, JOIN, LEAVE, MOVE, PLACE, STOP, JournalHeader, read_journal
+from app.game.room import Room
+from app.storage.memory import MemoryCache, MemoryRepo
+from benchmarks._common import NullSocket, emit, percentiles_us
+
+
+def _digest(room: Room, handles: dict[int, str]) -> str:
+    h = hashlib.sha1()
+    for handle in sorted(handles):
+        conn = room.players.get(handles[handle])
+        if conn is None:
+            continue
+        kin = conn.runtime.kin
+        h.update(f"{handle}:{kin.x:.6f}:{kin.z:.6f}:{conn.runtime.placed_count};".encode())
+    for d in sorted(room.decorations.values(), key=lambda d: (d.angle, d.height, d.deco_type)):
+        h.update(f"{d.deco_type}:{d.angle:.6f}:{d.height:.6f};".encode())
+    h.update(f"ticks={room.tick_no}".encode())
+    return h.hexdigest()[:16]
+
+
+async def _replay(header: JournalHeader, records: list[tuple[int, int, dict[str, Any]]]) -> dict[str, Any]:
+    now_ms = [header.start_ms]
+    room = Room(room_id=header.room_id, redis=MemoryCache(), mysql=MemoryRepo(), clock=lambda: now_ms[0])
+    await room.start()
+    handles: dict[int, str] = {}
+    dt = 0.05
+    tick_s: list[float] = []
+    t_total = time.perf_counter()
+
+    async def run_tick() -> None:
+        now_ms[0] += int(round(dt * 1000))
+        t0 = time.perf_counter()
+        await room.tick(dt)
+        tick_s.append(time.perf_counter() - t0)
+        seq = room.latest_snapshot_seq
+        for player_id in list(room.players):
+            room.ack_snapshot(player_id, seq)
+        # Let the outbox writers drain into their NullSockets.
+        await asyncio.sleep(0)
+
+    for tick, kind, f in records:
+        while room.tick_no < tick:
+            await run_tick()
+        player_id = handles.get(f.get("handle", -1), "")
+        if kind == DT:
+            dt = f["dt"]
+        elif kind == JOIN:
+            player_id = handles[f["handle"]] = await room.add_player(NullSocket(), f["name"], protocol=f["protocol"])
+            room.start_sending(player_id)
+        elif kind == LEAVE:
+            await room.remove_player(player_id)
+        elif kind == MOVE:
+            room.queue_move_input(player_id, f["seq"], f["ax"], f["az"], now_ms[0])
+        elif kind == STOP:
+            room.halt_player(player_id)
+        elif kind == PLACE:
+            await room.place_decoration(player_id, {"type": f["type"], "slot": {"angle": f["angle"], "height": f["height"]}})
+        elif kind == CHAT:
+            await room.send_chat(player_id, {"text": f["text"]})
+        elif kind == END:
+            break
+    total = time.perf_counter() - t_total
+    digest = _digest(room, handles)
+    await room.close()
+    result: dict[str, Any] = {
+        "ticks": room.tick_no,
+        "events": len(records),
+        "wall_ms": total * 1000.0,
+        "ticks_per_s": room.tick_no / total if total > 0 else 0.0,
+        "tick_mean_us": sum(tick_s) / len(tick_s) * 1e6 if tick_s else 0.0,
+        "digest": digest,
+    }
+    result.update({f"tick_{k}": v for k, v in percentiles_us(tick_s).items()})
+    return result
+
+
+async def _run(path: str, runs: int, expect: str) -> int:
+    with open(path, "rb") as f:
+        header, records = read_journal(f.read())
+    events = list(records)
+    status = 0
+    for i in range(runs):
+        result = await _replay(header, events)
+        emit("replay", {"journal": os.path.basename(path), "room": header.room_id, "run": i}, result)
+        if expect and result["digest"] != expect:
+            print(f"[REPLAY] digest {result['digest']} != expected {expect}", file=sys.stderr)
+            status = 1
+    return status
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("journal")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--expect", default="", help="fail unless every run ends with this digest")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_run(args.journal, args.runs, args.expect)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Micro-benchmarks for the room hot paths.
+
+Every case runs against NullSockets and in-memory storage with fixed seeds,
+and the room clock is simulated, so results depend only on the code and the
+machine. Each case prints one JSON line per parameter set (ops/s, p50/p99 in
+microseconds); pipe two runs into files and diff them to compare commits.
+
+    tick       ``Room.tick`` with every player steering and acking, by
+               player and decoration count. Also reports memory per tick
+               from a second, traced pass: the peak allocated above the
+               starting point, and the net change in allocated blocks
+               (non-zero means the tick keeps something).
+    broadcast  ``Room._broadcast`` of one chat message to every player.
+    inputs     ``submit_move_input`` from every player at once while the
+               room ticks.
+    place      ``place_decoration`` into a tree that refills from empty
+               to ``tree_max_decorations``.
+    hydrate    ``Room._hydrate_state`` for a 300-decoration tree read from
+               the cache, from decoration rows, or migrated from the
+               legacy blob.
+    sanitize   ``ws._sanitize_room_id`` and ``ws._sanitize_name``.
+
+Run from the ``python/`` directory::
+
+    python -m benchmarks.room
+    python -m benchmarks.room --only tick hydrate --iterations 500
+"""
+
+from __future__ import annotations
+
+import os
+
+# Rooms above the production cap are the point of the larger cases.
+os.environ.setdefault("MAX_PLAYERS_PER_ROOM", "100000")
+
+import argparse
+import asyncio
+import gc
+import itertools
+import math
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+from app.config import settings
+from app.game.room import Room
+from app.game.snapshot import decoration_dict
+from app.game.types import Decoration
+from app.storage.memory import MemoryCache, MemoryRepo
+from app.ws import _sanitize_name, _sanitize_room_id
+from benchmarks._common import NullSocket, emit, measure, measure_async, percentiles_us
+
+CASES = ("tick", "broadcast", "inputs", "place", "hydrate", "sanitize")
+
+
+def _decorations(n: int, seed: int) -> list[Decoration]:
+    rng = random.Random(seed)
+    return [
+        Decoration(
+            deco_id=f"{rng.getrandbits(128):032x}",
+            deco_type=rng.choice(("bell", "mini_hat", "tinsel")),
+            angle=rng.uniform(0.0, math.tau),
+            height=rng.uniform(0.12, 1.28),
+            placed_by=f"{rng.getrandbits(128):032x}",
+            placed_ms=1_700_000_000_000 + i,
+        )
+        for i in range(n)
+    ]
+
+
+class _Bench:
+    """A room on a simulated clock with ``players`` connected players."""
+
+    def __init__(self, players: int, decorations: int = 0, seed: int = 1) -> None:
+        self.now_ms = int(time.time() * 1000)
+        self.room = Room(room_id="bench", redis=MemoryCache(), mysql=MemoryRepo(), clock=lambda: self.now_ms)
+        self.players = players
+        self.decorations = decorations
+        self.rng = random.Random(seed)
+        self.ids: list[str] = []
+        self.heading: list[float] = []
+        self.seq = 0
+        self.dt = 1.0 / max(1, settings.server_tick_hz)
+
+    async def setup(self) -> _Bench:
+        room = self.room
+        await room.start()
+        for d in _decorations(self.decorations, seed=2):
+            room.decorations[d.deco_id] = d
+        room.tree_version += 1
+        self.ids = [await room.add_player(NullSocket(), f"p{i}") for i in range(self.players)]
+        for player_id in self.ids:
+            room.start_sending(player_id)
+        self.heading = [self.rng.uniform(0.0, math.tau) for _ in self.ids]
+        # Spread the players out before measuring.
+        for _ in range(40):
+            await self.between_ticks()
+            await room.tick(self.dt)
+        return self
+
+    async def drain(self) -> None:
+        # Outbox writers only need one loop pass to empty into a NullSocket.
+        await asyncio.sleep(0)
+
+    async def between_ticks(self) -> None:
+        await self.drain()
+        room = self.room
+        seq = room.latest_snapshot_seq
+        for pid in self.ids:
+            room.ack_snapshot(pid, seq)
+        self.now_ms += int(self.dt * 1000)
+        self.seq += 1
+        for i, pid in enumerate(self.ids):
+            self.heading[i] += self.rng.uniform(-0.3, 0.3)
+            room.queue_move_input(pid, self.seq, math.cos(self.heading[i]), math.sin(self.heading[i]), self.now_ms)
+
+    async def close(self) -> None:
+        await self.room.close()
+
+
+async def _tick(players: int, decorations: int, iterations: int) -> dict[str, Any]:
+    bench = await _Bench(players, decorations).setup()
+    room = bench.room
+    result: dict[str, Any] = await measure_async(lambda: room.tick(bench.dt), iterations, between=bench.between_ticks)
+
+    peaks: list[float] = []
+    blocks = 0
+    tracemalloc.start()
+    for _ in range(max(10, iterations // 4)):
+        await bench.between_ticks()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        before = sys.getallocatedblocks()
+        await room.tick(bench.dt)
+        blocks += sys.getallocatedblocks() - before
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    peaks.sort()
+    result["alloc_peak_kib_p50"] = peaks[len(peaks) // 2] / 1024.0
+    result["alloc_peak_kib_max"] = peaks[-1] / 1024.0
+    result["alloc_net_blocks_per_tick"] = blocks / len(peaks)
+    result["last_tick_bytes_sent"] = room.encode_stats.last_tick_bytes_sent
+    await bench.close()
+    return result
+
+
+async def _broadcast(players: int, iterations: int) -> dict[str, Any]:
+    bench = await _Bench(players).setup()
+    room = bench.room
+    msg = {
+        "type": "chat.message",
+        "payload": {
+            "id": "0" * 32,
+            "room_id": room.room_id,
+            "player_id": bench.ids[0],
+            "name": "p0",
+            "text": "Merry Christmas!",
+            "server_time_ms": bench.now_ms,
+        },
+    }
+    result = await measure_async(lambda: room._broadcast(msg), iterations, between=bench.drain)
+    await bench.close()
+    return result
+
+
+async def _inputs(players: int, iterations: int) -> dict[str, Any]:
+    bench = await _Bench(players).setup()
+    room = bench.room
+    rng = random.Random(3)
+    period_ms = 1000.0 / max(1, settings.input_rate_limit_hz)
+    submits: list[float] = []
+    ticks: list[float] = []
+    seqs = {pid: 10_000 for pid in bench.ids}
+
+    async def submit(pid: str) -> None:
+        seqs[pid] += 1
+        payload = {"seq": seqs[pid], "ax": rng.uniform(-1, 1), "az": rng.uniform(-1, 1), "client_time_ms": seqs[pid]}
+        t0 = time.perf_counter()
+        await room.submit_move_input(pid, payload)
+        submits.append(time.perf_counter() - t0)
+
+    async def tick() -> None:
+        t0 = time.perf_counter()
+        await room.tick(bench.dt)
+        ticks.append(time.perf_counter() - t0)
+
+    limited = 0
+    for _ in range(iterations):
+        # One round is one input per player, spaced so the rate limit never bites.
+        bench.now_ms += int(math.ceil(period_ms))
+        await asyncio.gather(tick(), *(submit(pid) for pid in bench.ids))
+        await bench.drain()
+    for conn in room.players.values():
+        limited += 1 if conn.runtime.cheat_flags.get("rate_limited") else 0
+    total = sum(submits)
+    result: dict[str, Any] = {
+        "inputs": len(submits),
+        "ops_per_s": len(submits) / total if total > 0 else 0.0,
+        "rate_limited_players": limited,
+    }
+    result.update(percentiles_us(submits))
+    result.update({f"tick_{k}": v for k, v in percentiles_us(ticks).items()})
+    await bench.close()
+    return result
+
+
+async def _place(players: int, iterations: int) -> dict[str, Any]:
+    bench = await _Bench(players).setup()
+    room = bench.room
+    placer = room.players[bench.ids[0]].runtime
+    rng = random.Random(4)
+    types = ("bell", "mini_hat", "tinsel")
+
+    async def place() -> None:
+        payload = {"type": rng.choice(types), "slot": {"angle": rng.uniform(0.0, math.tau), "height": rng.uniform(0.12, 1.28)}}
+        await room.place_decoration(bench.ids[0], payload)
+
+    async def between() -> None:
+        placer.kin.x = settings.tree_center_x
+        placer.kin.z = settings.tree_center_z + 1.0
+        if len(room.decorations) >= settings.tree_max_decorations:
+            room.decorations.clear()
+        await bench.drain()
+
+    await between()
+    result = await measure_async(place, iterations, between=between)
+    result["placed"] = placer.placed_count
+    await bench.close()
+    return result
+
+
+async def _hydrate(source: str, decorations: int, iterations: int) -> dict[str, Any]:
+    decos = [decoration_dict(d) for d in _decorations(decorations, seed=5)]
+
+    async def fresh() -> Room:
+        cache, repo = MemoryCache(), MemoryRepo()
+        if source == "cache":
+            await cache.set_tree_state("bench", {"room_id": "bench", "decorations": decos})
+        elif source == "rows":
+            await repo.append_decorations("bench", decos)
+        else:
+            await repo.upsert_room_state("bench", {"room_id": "bench", "decorations": decos})
+        return Room(room_id="bench", redis=cache, mysql=repo)
+
+    rooms = [await fresh()]
+
+    async def hydrate() -> None:
+        await rooms[0]._hydrate_state()
+
+    async def between() -> None:
+        assert len(rooms[0].decorations) == decorations
+        rooms[0] = await fresh()
+
+    return await measure_async(hydrate, iterations, between=between)
+
+
+def _sanitize(iterations: int) -> list[tuple[str, dict[str, Any]]]:
+    room_ids = itertools.cycle(["public", "  my-room_42  ", "x" * 64, "房间🎄/../a b", None, 123, ""])
+    names = itertools.cycle(["Alice", "  圣诞老人  ", "n" * 40, "🎅" * 20, None, 7, "   "])
+    return [
+        ("room_id", measure(lambda: _sanitize_room_id(next(room_ids)), iterations, warmup=100)),
+        ("name", measure(lambda: _sanitize_name(next(names)), iterations, warmup=100)),
+    ]
+
+
+async def _run(only: list[str], iterations: int) -> None:
+    def run(name: str, params: dict[str, Any], result: dict[str, Any]) -> None:
+        emit(f"room.{name}", {"iterations": iterations, **params}, result)
+        gc.collect()
+
+    if "tick" in only:
+        for players in (12, 50, 200):
+            for decorations in (0, 300):
+                run("tick", {"players": players, "decorations": decorations}, await _tick(players, decorations, iterations))
+    if "broadcast" in only:
+        for players in (12, 50, 200):
+            run("broadcast", {"players": players}, await _broadcast(players, iterations))
+    if "inputs" in only:
+        for players in (12, 200):
+            run("inputs", {"players": players}, await _inputs(players, iterations))
+    if "place" in only:
+        run("place", {"players": 12}, await _place(12, iterations))
+    if "hydrate" in only:
+        for source in ("cache", "rows", "blob"):
+            run("hydrate", {"source": source, "decorations": 300}, await _hydrate(source, 300, iterations))
+    if "sanitize" in only:
+        for fn, result in _sanitize(iterations * 100):
+            emit("ws.sanitize", {"fn": fn, "iterations": iterations * 100}, result)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(_run(args.only, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Headless bot swarm that drives a running server over the real WebSocket protocol.
+
+Each bot says hello, streams ``input.move`` at ``--input-hz``, acks every
+snapshot, answers pings, and now and then sends ``tree.place`` and ``chat.send``. At the
+end one JSON line reports snapshot inter-arrival jitter, input-to-ack
+latency, traffic per second and, when the server pid is known, server CPU.
+
+Run from the ``python/`` directory against a local server::
+
+    python -m app &
+    python -m benchmarks.swarm --rooms 10 --players 200 --seconds 30 --server-pid $!
+
+or let the swarm start the server itself::
+
+    python -m benchmarks.swarm --spawn --rooms 50 --players 2000 --protocol bin1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.config import settings
+from app.game.wire import PROTOCOL_BIN1, PROTOCOL_JSON, Quantizer, decode_snapshot, encode_input_move, encode_state_ack
+from benchmarks._common import emit, percentiles_us
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover - installed with uvicorn[standard]
+    websockets = None
+
+
+@dataclass(slots=True)
+class SwarmStats:
+    connected: int = 0
+    failed: int = 0
+    redirects: int = 0
+    snapshots: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    inputs: int = 0
+    places: int = 0
+    chats: int = 0
+    gaps: list[float] = field(default_factory=list)
+    ack_latency: list[float] = field(default_factory=list)
+
+
+def _cpu_seconds(pid: int) -> float | None:
+    """User + system CPU time of ``pid`` from /proc, or None where unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Bot:
+    def __init__(self, n: int, url: str, room_id: str, args: argparse.Namespace, stats: SwarmStats) -> None:
+        self.name = f"bot{n}"
+        self.url = url
+        self.room_id = room_id
+        self.args = args
+        self.stats = stats
+        self.rng = random.Random(n)
+        self.player_id = ""
+        self.protocol = PROTOCOL_JSON
+        self.quantizer: Quantizer | None = None
+        self.handles: dict[int, str] = {}
+        self.x = 0.0
+        self.z = 0.0
+        self.seq = 0
+        self.sent_at: dict[int, float] = {}
+        self.acked = 0
+        self.last_snapshot = 0.0
+
+    async def run(self, deadline: float) -> None:
+        for _ in range(3):
+            try:
+                url = await self._session(deadline)
+            except Exception:
+                self.stats.failed += 1
+                return
+            if url is None:
+                return
+            self.stats.redirects += 1
+            self.url = url
+
+    async def _session(self, deadline: float) -> str | None:
+        """One connection; returns a redirect URL or None when done."""
+        async with websockets.connect(self.url, max_size=None) as ws:
+            await self._send(ws, {"type": "hello", "payload": {"name": self.name, "room_id": self.room_id, "protocol": self.args.protocol}})
+            while True:
+                data = await ws.recv()
+                if isinstance(data, bytes):
+                    # No decoder before the welcome; a server that queued a
+                    # snapshot ahead of it must not count as a failed bot.
+                    continue
+                msg = json.loads(data)
+                if msg.get("type") == "event.redirect":
+                    return msg["payload"]["url"]
+                if msg.get("type") == "welcome":
+                    break
+                if msg.get("type") == "event.error":
+                    raise RuntimeError(msg)
+            welcome = msg["payload"]
+            self.player_id = welcome["player_id"]
+            self.protocol = welcome.get("protocol", PROTOCOL_JSON)
+            if self.protocol == PROTOCOL_BIN1:
+                self.quantizer = Quantizer(**welcome["wire"])
+            self.stats.connected += 1
+            tasks = [asyncio.create_task(self._reader(ws)), asyncio.create_task(self._writer(ws, deadline))]
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    result = t.result()
+                    if isinstance(result, str):
+                        return result
+            finally:
+                for t in tasks:
+                    t.cancel()
+                self.stats.connected -= 1
+        return None
+
+    async def _send(self, ws: Any, message: dict[str, Any] | bytes) -> None:
+        data = message if isinstance(message, bytes) else json.dumps(message)
+        self.stats.bytes_out += len(data)
+        await ws.send(data)
+
+    async def _writer(self, ws: Any, deadline: float) -> None:
+        period = 1.0 / max(1.0, self.args.input_hz)
+        next_place = time.monotonic() + self.rng.expovariate(1.0 / self.args.place_every) if self.args.place_every > 0 else math.inf
+        next_chat = time.monotonic() + self.rng.expovariate(1.0 / self.args.chat_every) if self.args.chat_every > 0 else math.inf
+        await asyncio.sleep(self.rng.uniform(0.0, period))
+        while (now := time.monotonic()) < deadline:
+            # Wander around the tree so placements are in reach.
+            ax = (settings.tree_center_x - self.x) / 10.0 + self.rng.uniform(-0.8, 0.8)
+            az = (settings.tree_center_z - self.z) / 10.0 + self.rng.uniform(-0.8, 0.8)
+            self.seq += 1
+            client_ms = int(now * 1000) & 0xFFFFFFFF
+            self.sent_at[self.seq] = now
+            if self.protocol == PROTOCOL_BIN1:
+                await self._send(ws, encode_input_move(self.seq, ax, az, client_ms))
+            else:
+                await self._send(ws, {"type": "input.move", "payload": {"seq": self.seq, "ax": ax, "az": az, "client_time_ms": client_ms}})
+            self.stats.inputs += 1
+            if now >= next_place:
+                slot = {"angle": self.rng.uniform(0, 2 * math.pi), "height": self.rng.uniform(0.2, 1.2)}
+                await self._send(ws, {"type": "tree.place", "payload": {"type": "bell", "slot": slot}})
+                self.stats.places += 1
+                next_place = now + self.rng.expovariate(1.0 / self.args.place_every)
+            if now >= next_chat:
+                await self._send(ws, {"type": "chat.send", "payload": {"text": f"hi from {self.name}"}})
+                self.stats.chats += 1
+                next_chat = now + self.rng.expovariate(1.0 / self.args.chat_every)
+            await asyncio.sleep(period)
+
+    async def _reader(self, ws: Any) -> str | None:
+        async for data in ws:
+            now = time.monotonic()
+            self.stats.bytes_in += len(data)
+            if isinstance(data, bytes):
+                payload = decode_snapshot(data, self.handles, self.quantizer)
+            else:
+                msg = json.loads(data)
+                if msg.get("type") == "event.redirect":
+                    return msg["payload"]["url"]
+                if msg.get("type") == "ping":
+                    pong = {"id": msg["payload"]["id"], "client_time_ms": int(time.time() * 1000)}
+                    await self._send(ws, {"type": "pong", "payload": pong})
+                    continue
+                if msg.get("type") != "state.snapshot":
+                    continue
+                payload = msg["payload"]
+            self._on_snapshot(payload, now)
+            seq = payload["seq"]
+            if self.protocol == PROTOCOL_BIN1:
+                await self._send(ws, encode_state_ack(seq))
+            else:
+                await self._send(ws, {"type": "state.ack", "payload": {"seq": seq}})
+        return None
+
+    def _on_snapshot(self, payload: dict[str, Any], now: float) -> None:
+        self.stats.snapshots += 1
+        if self.last_snapshot:
+            self.stats.gaps.append(now - self.last_snapshot)
+        self.last_snapshot = now
+        for p in payload["players"]:
+            if p.get("id") == self.player_id and "x" in p:
+                self.x, self.z = p["x"], p["z"]
+        acked = payload["ack"].get(self.player_id, 0)
+        if acked > self.acked:
+            sent = self.sent_at.get(acked)
+            if sent is not None:
+                self.stats.ack_latency.append(now - sent)
+            for seq in range(self.acked + 1, acked + 1):
+                self.sent_at.pop(seq, None)
+            self.acked = acked
+
+
+async def _swarm(args: argparse.Namespace) -> dict[str, Any]:
+    stats = SwarmStats()
+    start = time.monotonic()
+    deadline = start + args.ramp + args.seconds
+    cpu_start = _cpu_seconds(args.server_pid) if args.server_pid else None
+    bots = [Bot(i, args.url, f"swarm{i % args.rooms}", args, stats) for i in range(args.players)]
+    tasks = []
+    for i, bot in enumerate(bots):
+        tasks.append(asyncio.create_task(bot.run(deadline)))
+        if args.ramp > 0:
+            await asyncio.sleep(args.ramp / len(bots))
+    # Measure traffic only over the steady-state window after the ramp.
+    window_start = time.monotonic()
+    bytes_in, bytes_out = stats.bytes_in, stats.bytes_out
+    cpu_window = _cpu_seconds(args.server_pid) if args.server_pid else None
+    await asyncio.gather(*tasks)
+    elapsed = max(1e-9, time.monotonic() - window_start)
+    cpu_end = _cpu_seconds(args.server_pid) if args.server_pid else None
+
+    gaps_ms = [g * 1000.0 for g in stats.gaps]
+    result: dict[str, Any] = {
+        "failed": stats.failed,
+        "redirects": stats.redirects,
+        "snapshots": stats.snapshots,
+        "inputs": stats.inputs,
+        "places": stats.places,
+        "chats": stats.chats,
+        "bytes_in_per_s": (stats.bytes_in - bytes_in) / elapsed,
+        "bytes_out_per_s": (stats.bytes_out - bytes_out) / elapsed,
+        "snapshot_gap_mean_ms": statistics.fmean(gaps_ms) if gaps_ms else 0.0,
+        "snapshot_jitter_ms": statistics.pstdev(gaps_ms) if len(gaps_ms) > 1 else 0.0,
+    }
+    result.update({f"snapshot_gap_{k}": v for k, v in percentiles_us(stats.gaps).items()})
+    result.update({f"ack_latency_{k}": v for k, v in percentiles_us(stats.ack_latency).items()})
+    if cpu_window is not None and cpu_end is not None:
+        result["server_cpu_pct"] = 100.0 * (cpu_end - cpu_window) / elapsed
+    if cpu_start is not None and cpu_end is not None:
+        result["server_cpu_s"] = cpu_end - cpu_start
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/ws")
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--players", type=int, default=100, help="total bots, spread round-robin over the rooms")
+    parser.add_argument("--seconds", type=float, default=20.0, help="steady-state run time after the ramp")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which bots connect")
+    parser.add_argument("--input-hz", type=float, default=30.0)
+    parser.add_argument("--place-every", type=float, default=20.0, help="mean seconds between tree.place per bot; 0 disables")
+    parser.add_argument("--chat-every", type=float, default=30.0, help="mean seconds between chat.send per bot; 0 disables")
+    parser.add_argument("--protocol", choices=[PROTOCOL_JSON, PROTOCOL_BIN1], default=PROTOCOL_JSON)
+    parser.add_argument("--server-pid", type=int, default=0, help="pid to sample server CPU from")
+    parser.add_argument("--spawn", action="store_true", help="start `python -m app` on the --url port for the run")
+    args = parser.parse_args()
+    if websockets is None:
+        raise SystemExit("the websockets package is required (pip install 'uvicorn[standard]')")
+
+    server = None
+    if args.spawn:
+        port = args.url.rsplit(":", 1)[1].split("/", 1)[0]
+        env = dict(os.environ)
+        env.setdefault("MAX_PLAYERS_PER_ROOM", str(max(12, math.ceil(args.players / args.rooms))))
+        server = subprocess.Popen([sys.executable, "-m", "app", "--host", "127.0.0.1", "--port", port], env=env)
+        args.server_pid = server.pid
+        time.sleep(2.0)
+    try:
+        result = asyncio.run(_swarm(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    params = {"rooms": args.rooms, "players": args.players, "protocol": args.protocol, "input_hz": args.input_hz}
+    emit("swarm", params, result)
+
+
+if __name__ == "__main__":
+    main()
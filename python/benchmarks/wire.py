@@ -0,0 +1,101 @@
+"""Compare snapshot size and encode/decode cost of JSON and the bin1 protocol.
+
+Run from the ``python/`` directory::
+
+    python -m benchmarks.wire
+    python -m benchmarks.wire --players 12 100 500 --iterations 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from typing import Any
+
+from app.config import settings
+from app.game.encoding import encode_message
+from app.game.snapshot import SnapshotHistory, build_delta_payload, build_keyframe_payload
+from app.game.types import Decoration, PlayerRuntime
+from app.game.wire import Quantizer, decode_snapshot, encode_snapshot
+from benchmarks._common import emit, measure
+
+
+def _world(n: int, seed: int) -> tuple[list[PlayerRuntime], dict[str, Decoration]]:
+    rng = random.Random(seed)
+    players = []
+    for i in range(n):
+        rt = PlayerRuntime(player_id=f"{rng.getrandbits(128):032x}", name=f"player{i}")
+        rt.kin.x = rng.uniform(settings.world_min_x, settings.world_max_x)
+        rt.kin.z = rng.uniform(settings.world_min_z, settings.world_max_z)
+        rt.kin.vx = rng.uniform(-settings.player_max_speed, settings.player_max_speed)
+        rt.kin.vz = rng.uniform(-settings.player_max_speed, settings.player_max_speed)
+        players.append(rt)
+    decorations = {}
+    for i in range(20):
+        deco_id = f"{rng.getrandbits(128):032x}"
+        decorations[deco_id] = Decoration(
+            deco_id=deco_id,
+            deco_type="bell",
+            angle=rng.uniform(0.0, 6.28),
+            height=rng.uniform(0.0, 2.0),
+            placed_by=players[i % n].player_id,
+            placed_ms=1_700_000_000_000 + i,
+        )
+    return players, decorations
+
+
+def _payloads(n: int, moving_share: float, seed: int) -> dict[str, dict[str, Any]]:
+    """A keyframe and a delta where ``moving_share`` of the players moved since the base."""
+    players, decorations = _world(n, seed)
+    history = SnapshotHistory(size=4)
+    base = history.capture(0, players, decorations, tree_version=1)
+    rng = random.Random(seed + 1)
+    for rt in rng.sample(players, int(n * moving_share)):
+        rt.kin.x += 0.1
+        rt.kin.z -= 0.1
+    frame = history.capture(50, players, decorations, tree_version=1)
+    return {
+        "keyframe": build_keyframe_payload(frame, "bench", "lobby", decorations),
+        "delta": build_delta_payload(frame, base, "bench", "lobby", decorations),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, nargs="+", default=[12, 100, 500])
+    parser.add_argument("--moving", type=float, default=0.5, help="share of players that moved in the delta")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    q = Quantizer.from_settings()
+    for n in args.players:
+        payloads = _payloads(n, args.moving, seed=n)
+        for kind, payload in payloads.items():
+            handle_of = {p["id"]: i + 1 for i, p in enumerate(payloads["keyframe"]["players"])}
+            message = {"type": "state.snapshot", "payload": payload}
+            params = {"players": n, "snapshot": kind}
+
+            json_frame = encode_message(message)
+            result = measure(lambda: encode_message(message), args.iterations)
+            result["bytes"] = json_frame.size
+            emit("wire.encode", {**params, "protocol": "json"}, result)
+
+            text = json_frame.data
+            result = measure(lambda: json.loads(text), args.iterations)
+            result["bytes"] = json_frame.size
+            emit("wire.decode", {**params, "protocol": "json"}, result)
+
+            data = encode_snapshot(payload, handle_of, q)
+            result = measure(lambda: encode_snapshot(payload, handle_of, q), args.iterations)
+            result["bytes"] = len(data)
+            emit("wire.encode", {**params, "protocol": "bin1"}, result)
+
+            ids = {h: pid for pid, h in handle_of.items()}
+            result = measure(lambda: decode_snapshot(data, dict(ids), q), args.iterations)
+            result["bytes"] = len(data)
+            emit("wire.decode", {**params, "protocol": "bin1"}, result)
+
+
+if __name__ == "__main__":
+    main()